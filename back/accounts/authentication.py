@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+
+AUTH_CACHE_TIMEOUT = 60
+
+
+def _cache_key(key):
+    return f'auth-token:{key}'
+
+
+def invalidate_user_tokens(user_id):
+    """Drop cached authentication for every token of a user"""
+    cache.delete_many([
+        _cache_key(key) for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+    ])
+
+
+def invalidate_token(key):
+    cache.delete(_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that loads the token, its user and the user's
+    teacher or student profile in one joined query, then caches the token
+    (with user and profile attached) for a short time. Views can check
+    hasattr(request.user, 'teacher_profile') without another query.
+    """
+    
+    def authenticate_credentials(self, key):
+        token = cache.get(_cache_key(key))
+        if token is None:
+            try:
+                token = self._tokens().get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            cache.set(_cache_key(key), token, timeout=AUTH_CACHE_TIMEOUT)
+        
+        return self._credentials(token)
+    
+    async def aauthenticate(self, request):
+        """authenticate() for async views, with the same header format, cache and errors"""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        
+        token = await cache.aget(_cache_key(key))
+        if token is None:
+            try:
+                token = await self._tokens().aget(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            await cache.aset(_cache_key(key), token, timeout=AUTH_CACHE_TIMEOUT)
+        
+        return self._credentials(token)
+    
+    def _tokens(self):
+        return Token.objects.select_related('user', 'user__teacher_profile', 'user__student_profile')
+    
+    def _credentials(self, token):
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        
+        return (token.user, token)
@@ -0,0 +1,17 @@
+from rest_framework import permissions
+
+
+class IsTeacher(permissions.IsAuthenticated):
+    """Authenticated users with a teacher profile; free with CachedTokenAuthentication"""
+    message = 'User is not a teacher'
+    
+    def has_permission(self, request, view):
+        return super().has_permission(request, view) and hasattr(request.user, 'teacher_profile')
+
+
+class IsStudent(permissions.IsAuthenticated):
+    """Authenticated users with a student profile; free with CachedTokenAuthentication"""
+    message = 'User is not a student'
+    
+    def has_permission(self, request, view):
+        return super().has_permission(request, view) and hasattr(request.user, 'student_profile')
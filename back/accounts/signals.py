@@ -0,0 +1,28 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from students.models import StudentProfile
+from teachers.models import TeacherProfile
+from .authentication import invalidate_token, invalidate_user_tokens
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_authentication(sender, instance, **kwargs):
+    invalidate_user_tokens(instance.id)
+
+
+@receiver(post_save, sender=TeacherProfile)
+@receiver(post_delete, sender=TeacherProfile)
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_delete, sender=StudentProfile)
+def invalidate_profile_authentication(sender, instance, **kwargs):
+    """The cached token carries the role profile, so profile edits must reach it"""
+    invalidate_user_tokens(instance.user_id)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
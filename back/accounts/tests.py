@@ -1,3 +1,42 @@
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from back.testing import token_client
+from teachers.models import TeacherProfile
+from .models import User
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('teacher', password='pass', role='TEACHER')
+        self.teacher = TeacherProfile.objects.create(
+            user=self.user, employee_id='EMP001',
+            department='Computer Science', designation='Lecturer'
+        )
+        self.client = token_client(self.user)
+
+    def test_token_user_and_profile_resolve_in_one_query_then_from_cache(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/teachers/profile/')
+        self.assertEqual(response.data['data']['employee_id'], 'EMP001')
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/teachers/profile/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_changes_refresh_the_cached_user(self):
+        self.client.get('/api/teachers/profile/')
+
+        self.teacher.department = 'Mathematics'
+        self.teacher.save()
+
+        self.assertEqual(self.client.get('/api/teachers/profile/').data['data']['department'], 'Mathematics')
+
+    def test_logout_revokes_the_cached_token(self):
+        self.client.get('/api/teachers/profile/')
+
+        self.assertEqual(self.client.post('/api/auth/logout/').status_code, 200)
+
+        self.assertEqual(self.client.get('/api/teachers/profile/').status_code, 401)
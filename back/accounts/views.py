@@ -1,7 +1,7 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from .serializers import UserRegistrationSerializer, UserLoginSerializer
@@ -57,4 +57,19 @@ class LoginView(APIView):
                     'user_id': user.pk,
                     'role': user.role
                 })
-        return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+
+class LogoutView(APIView):
+    """Log out by deleting the user's token"""
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        try:
+            # Deleting the token also drops it from the authentication cache
+            Token.objects.filter(user=request.user).delete()
+            return Response({'message': 'Logged out'}, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response(
+                {'error': f'Error logging out: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -0,0 +1,213 @@
+from urllib.parse import quote
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Case, Value, When
+
+from attendance.archive import archived_years
+from attendance.models import (
+    AttendanceSession, AttendanceRecord, ArchivedAttendanceSession, ArchivedAttendanceRecord
+)
+from students.models import StudentProfile
+from teachers.models import Class
+
+DEFAULT_THRESHOLD = 75.0
+CACHE_TIMEOUT = 6 * 60 * 60
+
+ABSENT = 0
+PRESENT = 1
+NO_RECORD = -1
+
+
+def _version_key(department):
+    return f'analytics-version:{quote(department)}'
+
+
+def department_version(department):
+    return cache.get_or_set(_version_key(department), 1, timeout=None)
+
+
+def invalidate_department(department):
+    """Drop cached analytics for a department by moving it to a new cache version"""
+    try:
+        cache.incr(_version_key(department))
+    except ValueError:
+        cache.set(_version_key(department), 2, timeout=None)
+
+
+def build_matrix(session_ids, record_sessions, record_students, record_present):
+    """
+    Build a students x sessions matrix for one class. Cells are PRESENT,
+    ABSENT or NO_RECORD; session_ids gives the column order (by date).
+    Returns the matrix and the student id of each row.
+    """
+    student_ids, rows = np.unique(record_students, return_inverse=True)
+
+    order = np.argsort(session_ids)
+    columns = order[np.searchsorted(session_ids[order], record_sessions)]
+
+    matrix = np.full((len(student_ids), len(session_ids)), NO_RECORD, dtype=np.int8)
+    matrix[rows, columns] = record_present
+    return matrix, student_ids
+
+
+def analyse_matrix(matrix):
+    """
+    Per-student totals, percentage and absence streaks for a non-empty
+    students x sessions matrix. A cell without a record breaks a streak.
+    """
+    present = (matrix == PRESENT).sum(axis=1)
+    total = (matrix != NO_RECORD).sum(axis=1)
+    percentage = np.round(
+        np.divide(present * 100.0, total, out=np.zeros(len(total)), where=total > 0), 2
+    )
+
+    absent = matrix == ABSENT
+    positions = np.arange(matrix.shape[1])
+    breaks = np.where(absent, -1, positions)
+
+    # Length of the absence run ending at each cell, from the last non-absent column
+    last_break = np.maximum.accumulate(breaks, axis=1)
+    run_lengths = np.where(absent, positions - last_break, 0)
+
+    return {
+        'present_count': present,
+        'total_sessions': total,
+        'attendance_percentage': percentage,
+        'current_absence_streak': run_lengths[:, -1],
+        'longest_absence_streak': run_lengths.max(axis=1),
+    }
+
+
+def _session_rows(session_model, class_ids):
+    """(class id, date ordinal, session id) per session, straight from the cursor into an array"""
+    return np.fromiter(
+        (
+            (class_id, session_date.toordinal(), session_id)
+            for class_id, session_date, session_id in session_model.objects.filter(
+                class_instance_id__in=class_ids
+            ).values_list('class_instance_id', 'date', 'id').iterator(chunk_size=5000)
+        ),
+        dtype=[('class_id', '<i8'), ('date', '<i8'), ('session_id', '<i8')]
+    ).view('<i8').reshape(-1, 3)
+
+
+def _record_rows(record_model, class_ids):
+    """(class id, session id, student id, present) per record, straight from the cursor into an array"""
+    return np.fromiter(
+        record_model.objects.filter(
+            session__class_instance_id__in=class_ids
+        ).values_list(
+            'session__class_instance_id', 'session_id', 'student_id',
+            Case(When(status='PRESENT', then=Value(PRESENT)), default=Value(ABSENT))
+        ).order_by().iterator(chunk_size=5000),
+        dtype=[('class_id', '<i8'), ('session_id', '<i8'), ('student_id', '<i8'), ('present', '<i8')]
+    ).view('<i8').reshape(-1, 4)
+
+
+def _group_by_class(rows):
+    """Split rows (class id in column 0, already sorted by it) into {class id: rows of that class}"""
+    class_ids, starts = np.unique(rows[:, 0], return_index=True)
+    return dict(zip(class_ids.tolist(), np.split(rows, starts[1:])))
+
+
+def _load_department(department, academic_year=None):
+    """
+    The department's classes, plus their sessions (ordered by date) and
+    records grouped by class. Classes of archived academic years are read
+    from the archive tables as well.
+    """
+    classes = Class.objects.filter(course__department=department).select_related('course')
+    if academic_year:
+        classes = classes.filter(academic_year=academic_year)
+    classes = {class_instance.id: class_instance for class_instance in classes}
+
+    tiers = [(AttendanceSession, AttendanceRecord, list(classes))]
+    archived = archived_years()
+    archived_class_ids = [
+        class_id for class_id, class_instance in classes.items() if class_instance.academic_year in archived
+    ]
+    if archived_class_ids:
+        tiers.append((ArchivedAttendanceSession, ArchivedAttendanceRecord, archived_class_ids))
+
+    sessions = np.concatenate([_session_rows(session_model, ids) for session_model, _, ids in tiers])
+    records = np.concatenate([_record_rows(record_model, ids) for _, record_model, ids in tiers])
+
+    # One sort each instead of a scan of the whole department per class
+    sessions = sessions[np.lexsort((sessions[:, 1], sessions[:, 0]))]
+    records = records[np.argsort(records[:, 0], kind='stable')]
+    sessions_by_class = {
+        class_id: rows[:, 2] for class_id, rows in _group_by_class(sessions).items()
+    }
+    return classes, sessions_by_class, _group_by_class(records)
+
+
+def compute_department_analytics(department, threshold=DEFAULT_THRESHOLD, academic_year=None):
+    """
+    Attendance statistics for every student in every class of a department,
+    computed per class with vectorised numpy operations. Returns the students
+    below the threshold, worst first.
+    """
+    classes, sessions_by_class, records_by_class = _load_department(department, academic_year)
+
+    rows = []
+    for class_id, class_instance in classes.items():
+        class_records = records_by_class.get(class_id)
+        if class_records is None:
+            continue
+
+        session_ids = sessions_by_class[class_id]
+        matrix, student_ids = build_matrix(
+            session_ids, class_records[:, 1], class_records[:, 2], class_records[:, 3]
+        )
+        stats = analyse_matrix(matrix)
+
+        breaches = np.flatnonzero(stats['attendance_percentage'] < threshold)
+        for index in breaches:
+            rows.append({
+                'student_id': int(student_ids[index]),
+                'class_id': class_id,
+                'course_code': class_instance.course.code,
+                'course_name': class_instance.course.name,
+                'section': class_instance.section,
+                'batch': class_instance.batch,
+                'present_count': int(stats['present_count'][index]),
+                'total_sessions': int(stats['total_sessions'][index]),
+                'attendance_percentage': float(stats['attendance_percentage'][index]),
+                'current_absence_streak': int(stats['current_absence_streak'][index]),
+                'longest_absence_streak': int(stats['longest_absence_streak'][index]),
+            })
+
+    students = {
+        student['id']: student
+        for student in StudentProfile.objects.filter(
+            id__in={row['student_id'] for row in rows}
+        ).values('id', 'roll_number', 'user__username')
+    }
+    for row in rows:
+        student = students[row['student_id']]
+        row['roll_number'] = student['roll_number']
+        row['student_name'] = student['user__username']
+
+    rows.sort(key=lambda row: (row['attendance_percentage'], row['roll_number']))
+
+    return {
+        'department': department,
+        'academic_year': academic_year,
+        'threshold': threshold,
+        'classes_analysed': len(classes),
+        'total_defaulters': len(rows),
+        'defaulters': rows,
+    }
+
+
+def department_defaulters(department, threshold=DEFAULT_THRESHOLD, academic_year=None):
+    """Cached compute_department_analytics; the cache moves on when a session is added, ended or removed"""
+    key = f'defaulters:{quote(department)}:{quote(academic_year or "all")}:{threshold}'
+    version = department_version(department)
+
+    result = cache.get(key, version=version)
+    if result is None:
+        result = compute_department_analytics(department, threshold, academic_year)
+        cache.set(key, result, timeout=CACHE_TIMEOUT, version=version)
+    return result
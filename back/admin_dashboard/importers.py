@@ -0,0 +1,431 @@
+import csv
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.models import User
+from attendance.gallery import invalidate_galleries
+from attendance.models import AttendanceSession
+from students.models import StudentProfile
+from teachers.cache import invalidate_catalogue, invalidate_classes
+from teachers.models import TeacherProfile, Course, Class, ClassEnrollment
+from .models import ImportJob
+
+BATCH_SIZE = 500
+# Uploads with more data rows than this are imported on a background thread
+INLINE_IMPORT_MAX_ROWS = BATCH_SIZE
+
+STUDENT_FIELDS = ['username', 'email', 'password', 'roll_number', 'department', 'semester', 'batch']
+COURSE_FIELDS = ['code', 'name', 'department', 'semester', 'credits']
+CLASS_FIELDS = ['course_code', 'section', 'batch', 'semester', 'academic_year', 'teacher_employee_id']
+ENROLLMENT_FIELDS = ['roll_number', 'course_code', 'section', 'batch', 'academic_year']
+
+
+class ImportReport:
+    """Counts and per-row errors of one CSV import"""
+
+    def __init__(self, name):
+        self.name = name
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+
+    def error(self, row_number, message):
+        self.errors.append({'row': row_number, 'error': message})
+
+    def as_dict(self):
+        return {
+            'file': self.name,
+            'created': self.created,
+            'skipped': self.skipped,
+            'errors': self.errors,
+        }
+
+
+def _read_rows(source, required_fields):
+    """Parse a CSV file (path, bytes or file object) into (row_number, row) pairs"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, newline='', encoding='utf-8-sig') as f:
+            text = f.read()
+    elif isinstance(source, bytes):
+        text = source.decode('utf-8-sig')
+    else:
+        text = source.read()
+        if isinstance(text, bytes):
+            text = text.decode('utf-8-sig')
+
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [field for field in required_fields if field not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    # Row 1 is the header
+    return [
+        (row_number, {key: (value or '').strip() for key, value in row.items() if key})
+        for row_number, row in enumerate(reader, start=2)
+    ]
+
+
+def _batches(rows, size=BATCH_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _positive_int(value, field):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} must be a number')
+    if number < 1:
+        raise ValueError(f'{field} must be positive')
+    return number
+
+
+def _init_hash_worker():
+    # Spawned workers (non-fork platforms) start without configured settings
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'back.settings')
+    django.setup()
+
+
+def _hash_password(password):
+    return make_password(password)
+
+
+class PasswordHasher:
+    """
+    Hashes the passwords of one import in a process pool; hashing is
+    CPU-bound and dominates student imports. The pool starts on the first
+    batch that needs it and is reused by the batches after it. workers=1
+    hashes in the calling process.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def hash(self, passwords):
+        if len(passwords) < 2 or self.workers == 1:
+            return [make_password(password) for password in passwords]
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_hash_worker)
+        return list(self._executor.map(_hash_password, passwords, chunksize=16))
+
+
+def import_courses(source):
+    report = ImportReport('courses')
+    rows = _read_rows(source, COURSE_FIELDS)
+    seen = set()
+
+    for batch in _batches(rows):
+        existing = set(Course.objects.filter(
+            code__in=[row['code'] for _, row in batch]
+        ).values_list('code', flat=True))
+
+        courses = []
+        for row_number, row in batch:
+            try:
+                if not row['code'] or not row['name'] or not row['department']:
+                    raise ValueError('code, name and department are required')
+                if row['code'] in existing:
+                    report.skipped += 1
+                    continue
+                if row['code'] in seen:
+                    raise ValueError(f"Duplicate course code {row['code']} in file")
+                courses.append(Course(
+                    code=row['code'],
+                    name=row['name'],
+                    department=row['department'],
+                    semester=_positive_int(row['semester'], 'semester'),
+                    credits=_positive_int(row['credits'] or 3, 'credits')
+                ))
+                seen.add(row['code'])
+            except ValueError as e:
+                report.error(row_number, str(e))
+
+        with transaction.atomic():
+            Course.objects.bulk_create(courses)
+        # bulk_create sends no signals, so the catalogue cache is invalidated here
+        invalidate_catalogue(departments=[course.department for course in courses])
+        report.created += len(courses)
+
+    return report
+
+
+def import_classes(source):
+    report = ImportReport('classes')
+    rows = _read_rows(source, CLASS_FIELDS)
+    seen = set()
+
+    for batch in _batches(rows):
+        courses = {
+            course.code: course
+            for course in Course.objects.filter(code__in={row['course_code'] for _, row in batch})
+        }
+        teachers = {
+            teacher.employee_id: teacher
+            for teacher in TeacherProfile.objects.filter(
+                employee_id__in={row['teacher_employee_id'] for _, row in batch}
+            )
+        }
+        existing = set(Class.objects.filter(
+            course__code__in=courses.keys()
+        ).values_list('course__code', 'section', 'batch', 'academic_year'))
+
+        classes = []
+        for row_number, row in batch:
+            key = (row['course_code'], row['section'], row['batch'], row['academic_year'])
+            try:
+                course = courses.get(row['course_code'])
+                if course is None:
+                    raise ValueError(f"Course {row['course_code']} does not exist")
+                teacher = teachers.get(row['teacher_employee_id'])
+                if teacher is None:
+                    raise ValueError(f"Teacher {row['teacher_employee_id']} does not exist")
+                if course.department != teacher.department:
+                    raise ValueError('Teacher can only teach classes for their department')
+                if not row['section'] or not row['batch'] or not row['academic_year']:
+                    raise ValueError('section, batch and academic_year are required')
+                if key in existing:
+                    report.skipped += 1
+                    continue
+                if key in seen:
+                    raise ValueError('Duplicate class in file')
+                classes.append(Class(
+                    teacher=teacher,
+                    course=course,
+                    section=row['section'],
+                    batch=row['batch'],
+                    semester=_positive_int(row['semester'], 'semester'),
+                    academic_year=row['academic_year']
+                ))
+                seen.add(key)
+            except ValueError as e:
+                report.error(row_number, str(e))
+
+        with transaction.atomic():
+            Class.objects.bulk_create(classes)
+        invalidate_classes(classes)
+        report.created += len(classes)
+
+    return report
+
+
+def import_students(source, hash_workers=None):
+    with PasswordHasher(hash_workers) as hasher:
+        return _import_students(source, hasher)
+
+
+def _import_students(source, hasher):
+    report = ImportReport('students')
+    rows = _read_rows(source, STUDENT_FIELDS)
+    seen_usernames = set()
+    seen_rolls = set()
+
+    for batch in _batches(rows):
+        existing_usernames = set(User.objects.filter(
+            username__in=[row['username'] for _, row in batch]
+        ).values_list('username', flat=True))
+        existing_rolls = set(StudentProfile.objects.filter(
+            roll_number__in=[row['roll_number'] for _, row in batch]
+        ).values_list('roll_number', flat=True))
+
+        valid = []
+        for row_number, row in batch:
+            try:
+                if not row['username'] or not row['password'] or not row['roll_number']:
+                    raise ValueError('username, password and roll_number are required')
+                if row['username'] in existing_usernames and row['roll_number'] in existing_rolls:
+                    report.skipped += 1
+                    continue
+                if row['username'] in existing_usernames or row['username'] in seen_usernames:
+                    raise ValueError(f"Username {row['username']} is already taken")
+                if row['roll_number'] in existing_rolls or row['roll_number'] in seen_rolls:
+                    raise ValueError(f"A student with roll number {row['roll_number']} already exists")
+                semester = _positive_int(row['semester'], 'semester')
+                if semester > 12:
+                    raise ValueError('Semester must be between 1 and 12')
+                valid.append((row, semester))
+                seen_usernames.add(row['username'])
+                seen_rolls.add(row['roll_number'])
+            except ValueError as e:
+                report.error(row_number, str(e))
+
+        if not valid:
+            continue
+
+        passwords = hasher.hash([row['password'] for row, _ in valid])
+
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(
+                    username=row['username'],
+                    email=row['email'],
+                    password=password,
+                    role='STUDENT'
+                )
+                for (row, _), password in zip(valid, passwords)
+            ])
+            StudentProfile.objects.bulk_create([
+                StudentProfile(
+                    user=user,
+                    roll_number=row['roll_number'],
+                    department=row['department'],
+                    semester=semester,
+                    batch=row['batch']
+                )
+                for user, (row, semester) in zip(users, valid)
+            ])
+        report.created += len(valid)
+
+    return report
+
+
+def import_enrollments(source):
+    report = ImportReport('enrollments')
+    rows = _read_rows(source, ENROLLMENT_FIELDS)
+    seen = set()
+
+    for batch in _batches(rows):
+        students = {
+            student.roll_number: student
+            for student in StudentProfile.objects.filter(
+                roll_number__in={row['roll_number'] for _, row in batch}
+            )
+        }
+        classes = {
+            (class_instance.course.code, class_instance.section, class_instance.batch, class_instance.academic_year): class_instance
+            for class_instance in Class.objects.filter(
+                course__code__in={row['course_code'] for _, row in batch}
+            ).select_related('course')
+        }
+        existing = set(ClassEnrollment.objects.filter(
+            student__in=students.values(),
+            class_instance__in=classes.values()
+        ).values_list('student_id', 'class_instance_id'))
+
+        enrollments = []
+        for row_number, row in batch:
+            try:
+                student = students.get(row['roll_number'])
+                if student is None:
+                    raise ValueError(f"Student {row['roll_number']} does not exist")
+                class_instance = classes.get(
+                    (row['course_code'], row['section'], row['batch'], row['academic_year'])
+                )
+                if class_instance is None:
+                    raise ValueError('Class does not exist')
+                if class_instance.batch != student.batch:
+                    raise ValueError('Student can only enroll in classes for their batch')
+                if class_instance.semester != student.semester:
+                    raise ValueError('Student can only enroll in classes for their semester')
+                key = (student.id, class_instance.id)
+                if key in existing or key in seen:
+                    report.skipped += 1
+                    continue
+                enrollments.append(ClassEnrollment(student=student, class_instance=class_instance))
+                seen.add(key)
+            except ValueError as e:
+                report.error(row_number, str(e))
+
+        with transaction.atomic():
+            ClassEnrollment.objects.bulk_create(enrollments)
+            invalidate_galleries(class_ids={enrollment.class_instance_id for enrollment in enrollments})
+        invalidate_classes([enrollment.class_instance for enrollment in enrollments])
+        AttendanceSession.objects.filter(
+            class_instance__in={enrollment.class_instance_id for enrollment in enrollments},
+            is_active=True
+        ).touch()
+        report.created += len(enrollments)
+
+    return report
+
+
+IMPORTERS = [
+    ('courses', import_courses),
+    ('classes', import_classes),
+    ('students', import_students),
+    ('enrollments', import_enrollments),
+]
+
+
+def run_import(sources, hash_workers=None):
+    """
+    Import whichever of courses, classes, students and enrollments are given,
+    in dependency order. Returns one report per file.
+    """
+    reports = []
+    for name, importer in IMPORTERS:
+        source = sources.get(name)
+        if source is None:
+            continue
+        try:
+            if name == 'students':
+                report = importer(source, hash_workers=hash_workers)
+            else:
+                report = importer(source)
+        except ValueError as e:
+            report = ImportReport(name)
+            report.error(1, str(e))
+        reports.append(report.as_dict())
+    return reports
+
+
+def count_rows(contents):
+    """Data rows across uploaded CSV contents (bytes), header lines excluded"""
+    return sum(max(len(content.splitlines()) - 1, 0) for content in contents.values())
+
+
+def run_import_job(job_id, contents, hash_workers=None):
+    """Run a queued import of CSV contents (bytes per file) and record its reports on the job row"""
+    ImportJob.objects.filter(id=job_id).update(status='RUNNING')
+
+    try:
+        reports = run_import(contents, hash_workers=hash_workers)
+    except Exception as e:
+        ImportJob.objects.filter(id=job_id).update(
+            status='FAILED',
+            error=str(e),
+            finished_at=timezone.now()
+        )
+        raise
+
+    ImportJob.objects.filter(id=job_id).update(
+        status='COMPLETED',
+        reports=reports,
+        finished_at=timezone.now()
+    )
+
+
+def start_import_job(contents, user, hash_workers=None):
+    """Queue an import of CSV contents (bytes per file) and run it on a background thread"""
+    job = ImportJob.objects.create(
+        created_by=user,
+        files=[name for name, _ in IMPORTERS if name in contents],
+        total_rows=count_rows(contents)
+    )
+
+    def worker():
+        try:
+            run_import_job(job.id, contents, hash_workers=hash_workers)
+        except Exception:
+            pass  # The failure is recorded on the job row
+        finally:
+            connection.close()
+
+    transaction.on_commit(lambda: threading.Thread(target=worker, daemon=True).start())
+    return job
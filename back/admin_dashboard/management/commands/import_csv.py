@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_dashboard.importers import run_import
+
+
+class Command(BaseCommand):
+    help = 'Bulk import courses, classes, students and enrollments from CSV files'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', help='CSV with code,name,department,semester,credits')
+        parser.add_argument('--classes', help='CSV with course_code,section,batch,semester,academic_year,teacher_employee_id')
+        parser.add_argument('--students', help='CSV with username,email,password,roll_number,department,semester,batch')
+        parser.add_argument('--enrollments', help='CSV with roll_number,course_code,section,batch,academic_year')
+        parser.add_argument('--hash-workers', type=int, default=None, help='Processes used for password hashing')
+    
+    def handle(self, *args, **options):
+        sources = {
+            name: options[name] 
+            for name in ('courses', 'classes', 'students', 'enrollments') 
+            if options[name]
+        }
+        if not sources:
+            raise CommandError('Give at least one of --courses, --classes, --students or --enrollments')
+        
+        started = time.perf_counter()
+        reports = run_import(sources, hash_workers=options['hash_workers'])
+        elapsed = time.perf_counter() - started
+        
+        for report in reports:
+            self.stdout.write(
+                f"{report['file']}: {report['created']} created, "
+                f"{report['skipped']} skipped, {len(report['errors'])} errors"
+            )
+            for error in report['errors']:
+                self.stdout.write(self.style.WARNING(f"  row {error['row']}: {error['error']}"))
+        
+        self.stdout.write(self.style.SUCCESS(f'Import finished in {elapsed:.1f}s'))
@@ -0,0 +1,8 @@
+from rest_framework import serializers
+from .models import ImportJob
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = ['id', 'status', 'files', 'total_rows', 'reports', 'error', 'created_at', 'finished_at']
+        read_only_fields = fields
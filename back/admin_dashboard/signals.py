@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from attendance.models import AttendanceSession
+from attendance.signals import class_history_changed
+from teachers.models import Class
+from .analytics import invalidate_department
+
+
+@receiver(post_save, sender=AttendanceSession)
+@receiver(post_delete, sender=AttendanceSession)
+def invalidate_department_analytics(sender, instance, **kwargs):
+    """New, ended and deleted sessions change the department's attendance picture"""
+    invalidate_analytics_for_classes(sender, [instance.class_instance_id])
+
+
+@receiver(class_history_changed)
+def invalidate_analytics_for_classes(sender, class_ids, **kwargs):
+    """Record changes reach here once per class from the paths that send class_history_changed"""
+    departments = Class.objects.filter(id__in=class_ids).values_list('course__department', flat=True).distinct()
+    for department in departments:
+        invalidate_department(department)
@@ -1,3 +1,178 @@
-from django.test import TestCase
+import io
+from datetime import date
 
-# Create your tests here.
+import numpy as np
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import User
+from attendance.archive import archive_academic_year
+from attendance.models import AttendanceSession, AttendanceRecord
+from back.testing import token_client
+from students.models import StudentProfile
+from teachers.models import TeacherProfile, Course, Class, ClassEnrollment
+from .analytics import ABSENT, NO_RECORD, PRESENT, analyse_matrix, build_matrix, department_defaulters
+from .importers import INLINE_IMPORT_MAX_ROWS, run_import, run_import_job
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkImportTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('teacher', password='pass', role='TEACHER')
+        TeacherProfile.objects.create(
+            user=user, employee_id='EMP001',
+            department='Computer Science', designation='Lecturer'
+        )
+
+    def csv(self, text):
+        return io.StringIO(text.strip() + '\n')
+
+    def test_imports_everything_and_reports_row_errors(self):
+        reports = run_import({
+            'courses': self.csv('''
+code,name,department,semester,credits
+CSE301,Database Systems,Computer Science,5,3
+'''),
+            'classes': self.csv('''
+course_code,section,batch,semester,academic_year,teacher_employee_id
+CSE301,A,2021,5,2024-25,EMP001
+CSE999,A,2021,5,2024-25,EMP001
+'''),
+            'students': self.csv('''
+username,email,password,roll_number,department,semester,batch
+alice,alice@example.com,secret1,CSE2021001,Computer Science,5,2021
+bob,bob@example.com,secret2,CSE2021002,Computer Science,5,2021
+carol,carol@example.com,secret3,CSE2021001,Computer Science,5,2021
+'''),
+            'enrollments': self.csv('''
+roll_number,course_code,section,batch,academic_year
+CSE2021001,CSE301,A,2021,2024-25
+CSE2021002,CSE301,A,2021,2024-25
+CSE2021002,CSE301,A,2021,2024-25
+'''),
+        }, hash_workers=1)
+
+        by_file = {report['file']: report for report in reports}
+        self.assertEqual(by_file['courses']['created'], 1)
+        self.assertEqual(by_file['classes']['created'], 1)
+        self.assertEqual(by_file['classes']['errors'], [{'row': 3, 'error': 'Course CSE999 does not exist'}])
+        self.assertEqual(by_file['students']['created'], 2)
+        self.assertEqual(by_file['students']['errors'][0]['row'], 4)
+        self.assertEqual(by_file['enrollments']['created'], 2)
+        self.assertEqual(by_file['enrollments']['skipped'], 1)
+
+        alice = StudentProfile.objects.get(roll_number='CSE2021001')
+        self.assertTrue(alice.user.check_password('secret1'))
+        self.assertEqual(ClassEnrollment.objects.filter(class_instance=Class.objects.get()).count(), 2)
+
+    def test_missing_columns_are_reported(self):
+        reports = run_import({'courses': self.csv('code,name\nCSE301,Database Systems')})
+
+        self.assertEqual(reports[0]['errors'], [{'row': 1, 'error': 'Missing columns: department, semester, credits'}])
+
+    def test_large_uploads_are_imported_by_a_background_job(self):
+        client = token_client(User.objects.create_user('admin', password='pass', role='ADMIN'))
+        rows = ''.join(f'C{number},Course {number},Computer Science,1,3\n' for number in range(INLINE_IMPORT_MAX_ROWS + 1))
+        content = f'code,name,department,semester,credits\n{rows}'.encode()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = client.post(
+                '/api/admin-dashboard/import/', {'courses': SimpleUploadedFile('courses.csv', content)}, format='multipart'
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(Course.objects.exists())
+
+        job_id = response.data['job']['id']
+        run_import_job(job_id, {'courses': content}, hash_workers=1)
+
+        job = client.get(f'/api/admin-dashboard/import-jobs/{job_id}/').data['job']
+        self.assertEqual(job['status'], 'COMPLETED')
+        self.assertEqual(job['reports'][0]['created'], INLINE_IMPORT_MAX_ROWS + 1)
+
+
+class DefaulterAnalyticsTests(TestCase):
+
+    def test_analyse_matrix_percentages_and_streaks(self):
+        matrix = np.array([
+            [PRESENT, ABSENT, ABSENT, PRESENT, ABSENT],
+            [ABSENT, ABSENT, ABSENT, PRESENT, PRESENT],
+            [NO_RECORD, PRESENT, ABSENT, ABSENT, ABSENT],
+        ], dtype=np.int8)
+
+        stats = analyse_matrix(matrix)
+
+        self.assertEqual(stats['total_sessions'].tolist(), [5, 5, 4])
+        self.assertEqual(stats['attendance_percentage'].tolist(), [40.0, 40.0, 25.0])
+        self.assertEqual(stats['current_absence_streak'].tolist(), [1, 0, 3])
+        self.assertEqual(stats['longest_absence_streak'].tolist(), [2, 3, 3])
+
+    def test_build_matrix_orders_columns_by_session_date(self):
+        matrix, student_ids = build_matrix(
+            np.array([30, 10, 20]),
+            np.array([10, 20, 30, 30]),
+            np.array([7, 7, 7, 5]),
+            np.array([1, 0, 1, 0])
+        )
+
+        self.assertEqual(student_ids.tolist(), [5, 7])
+        self.assertEqual(matrix.tolist(), [[0, -1, -1], [1, 1, 0]])
+
+    def test_defaulters_are_cached_until_a_session_changes(self):
+        teacher_user = User.objects.create_user('teacher', password='pass', role='TEACHER')
+        teacher = TeacherProfile.objects.create(
+            user=teacher_user, employee_id='EMP001',
+            department='Computer Science', designation='Lecturer'
+        )
+        course = Course.objects.create(code='CSE301', name='Database Systems', department='Computer Science', semester=5)
+        class_instance = Class.objects.create(
+            teacher=teacher, course=course, section='A', batch='2021', semester=5, academic_year='2024-25'
+        )
+        student_user = User.objects.create_user('student', password='pass', role='STUDENT')
+        student = StudentProfile.objects.create(
+            user=student_user, roll_number='CSE2021001', department='Computer Science', semester=5, batch='2021'
+        )
+        session = AttendanceSession.objects.create(class_instance=class_instance, date=date(2024, 1, 1))
+        AttendanceRecord.objects.create(session=session, student=student, status='ABSENT')
+
+        result = department_defaulters('Computer Science')
+        self.assertEqual(result['defaulters'][0]['roll_number'], 'CSE2021001')
+
+        with self.assertNumQueries(0):
+            department_defaulters('Computer Science')
+
+        session.is_active = False
+        session.save()
+        with CaptureQueriesContext(connection) as context:
+            department_defaulters('Computer Science')
+        self.assertGreater(len(context.captured_queries), 0)
+
+    def test_defaulters_of_an_archived_year_are_read_from_the_archive(self):
+        teacher_user = User.objects.create_user('teacher', password='pass', role='TEACHER')
+        teacher = TeacherProfile.objects.create(
+            user=teacher_user, employee_id='EMP001',
+            department='Computer Science', designation='Lecturer'
+        )
+        course = Course.objects.create(code='CSE301', name='Database Systems', department='Computer Science', semester=5)
+        class_instance = Class.objects.create(
+            teacher=teacher, course=course, section='A', batch='2021', semester=5, academic_year='2024-25'
+        )
+        student_user = User.objects.create_user('student', password='pass', role='STUDENT')
+        student = StudentProfile.objects.create(
+            user=student_user, roll_number='CSE2021001', department='Computer Science', semester=5, batch='2021'
+        )
+        for day in (1, 2, 3):
+            session = AttendanceSession.objects.create(
+                class_instance=class_instance, date=date(2024, 1, day), is_active=False
+            )
+            AttendanceRecord.objects.create(session=session, student=student, status='PRESENT' if day == 1 else 'ABSENT')
+
+        archive_academic_year('2024-25')
+        result = department_defaulters('Computer Science', academic_year='2024-25')
+
+        defaulter = result['defaulters'][0]
+        self.assertEqual(defaulter['roll_number'], 'CSE2021001')
+        self.assertEqual((defaulter['present_count'], defaulter['total_sessions']), (1, 3))
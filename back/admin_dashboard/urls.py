@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import BulkImportView, ImportJobView, DefaulterAnalyticsView
+
+urlpatterns = [
+    path('import/', BulkImportView.as_view(), name='bulk-import'),
+    path('import-jobs/<int:job_id>/', ImportJobView.as_view(), name='import-job'),
+    path('defaulters/', DefaulterAnalyticsView.as_view(), name='defaulter-analytics'),
+]
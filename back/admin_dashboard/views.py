@@ -1,3 +1,128 @@
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404
+from rest_framework import status, permissions
+from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from .analytics import DEFAULT_THRESHOLD, department_defaulters
+from .importers import INLINE_IMPORT_MAX_ROWS, count_rows, run_import, start_import_job
+from .models import ImportJob
+from .serializers import ImportJobSerializer
+
+
+def is_admin(user):
+    return user.is_staff or user.role == 'ADMIN'
+
+class BulkImportView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    
+    def post(self, request):
+        """Bulk import courses, classes, students and enrollments from uploaded CSV files"""
+        try:
+            if not is_admin(request.user):
+                return Response(
+                    {'error': 'User is not an admin'}, 
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            
+            contents = {
+                name: request.FILES[name].read() 
+                for name in ('courses', 'classes', 'students', 'enrollments') 
+                if name in request.FILES
+            }
+            if not contents:
+                return Response(
+                    {'error': 'Upload at least one of courses, classes, students or enrollments'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # Large imports, and any asked to, run in the background instead of holding this worker
+            background = request.query_params.get('background') in ('1', 'true')
+            if background or count_rows(contents) > INLINE_IMPORT_MAX_ROWS:
+                job = start_import_job(contents, request.user)
+                return Response({
+                    'message': 'Import started',
+                    'job': ImportJobSerializer(job).data
+                }, status=status.HTTP_202_ACCEPTED)
+            
+            # Small enough that starting a hashing pool would cost more than it saves
+            reports = run_import(contents, hash_workers=1)
+            
+            return Response({
+                'message': 'Import finished',
+                'reports': reports
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            return Response(
+                {'error': f'Error importing data: {str(e)}'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class ImportJobView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, job_id):
+        """Get the status and reports of a background import"""
+        try:
+            if not is_admin(request.user):
+                return Response(
+                    {'error': 'User is not an admin'}, 
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            
+            job = get_object_or_404(ImportJob, id=job_id)
+            
+            return Response({
+                'job': ImportJobSerializer(job).data
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            return Response(
+                {'error': f'Error retrieving import job: {str(e)}'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class DefaulterAnalyticsView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        """List students below the attendance threshold across a department"""
+        try:
+            if is_admin(request.user):
+                department = request.query_params.get('department')
+                if not department:
+                    return Response(
+                        {'error': 'department is required'}, 
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+            elif hasattr(request.user, 'teacher_profile'):
+                department = request.user.teacher_profile.department
+            else:
+                return Response(
+                    {'error': 'User is not an admin or teacher'}, 
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            
+            try:
+                threshold = float(request.query_params.get('threshold', DEFAULT_THRESHOLD))
+            except ValueError:
+                return Response(
+                    {'error': 'threshold must be a number'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            result = department_defaulters(
+                department, 
+                threshold=threshold, 
+                academic_year=request.query_params.get('academic_year')
+            )
+            
+            return Response(result, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            return Response(
+                {'error': f'Error computing defaulters: {str(e)}'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
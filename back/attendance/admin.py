@@ -1,5 +1,13 @@
 from django.contrib import admin
-from .models import AttendanceSession, AttendanceRecord
+from .models import (
+    AttendanceSession, AttendanceRecord, AttendanceSummary, AttendancePurgeJob,
+    AttendanceArchive, ArchivedAttendanceSession, ArchivedAttendanceRecord
+)
 
 admin.site.register(AttendanceSession)
 admin.site.register(AttendanceRecord)
+admin.site.register(AttendanceSummary)
+admin.site.register(AttendancePurgeJob)
+admin.site.register(AttendanceArchive)
+admin.site.register(ArchivedAttendanceSession)
+admin.site.register(ArchivedAttendanceRecord)
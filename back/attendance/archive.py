@@ -0,0 +1,98 @@
+from django.db import connection, transaction
+
+from .models import (
+    AttendanceSession, AttendanceRecord, AttendanceArchive,
+    ArchivedAttendanceSession, ArchivedAttendanceRecord
+)
+from .signals import class_history_changed
+
+DEFAULT_BATCH_SIZE = 200  # Sessions moved per transaction
+
+
+def is_archived_year(academic_year):
+    return AttendanceArchive.objects.filter(academic_year=academic_year).exists()
+
+
+def archived_years():
+    return set(AttendanceArchive.objects.values_list('academic_year', flat=True))
+
+
+def _delete_by_ids(model, column, ids):
+    """Raw set-based delete that bypasses the collector and record signals"""
+    table = connection.ops.quote_name(model._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({placeholders})', ids)
+
+
+def archive_academic_year(academic_year, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Move the sessions and records of a closed academic year into the archive
+    tables, batch_size sessions per transaction.
+
+    Summary rows are left untouched: archiving changes where the history is
+    stored, not what it says. progress, if given, is called as
+    progress(sessions_archived, records_archived) after every batch.
+    """
+    sessions = AttendanceSession.objects.filter(class_instance__academic_year=academic_year)
+    if sessions.filter(is_active=True).exists():
+        raise ValueError(f'Academic year {academic_year} still has active attendance sessions')
+
+    sessions_archived = 0
+    records_archived = 0
+    class_ids = set()
+
+    while True:
+        with transaction.atomic():
+            batch = list(sessions.order_by('id')[:batch_size])
+            if not batch:
+                break
+            session_ids = [session.id for session in batch]
+            class_ids.update(session.class_instance_id for session in batch)
+
+            ArchivedAttendanceSession.objects.bulk_create([
+                ArchivedAttendanceSession(
+                    id=session.id,
+                    class_instance_id=session.class_instance_id,
+                    date=session.date,
+                    is_active=session.is_active,
+                    created_at=session.created_at
+                )
+                for session in batch
+            ])
+
+            records = ArchivedAttendanceRecord.objects.bulk_create([
+                ArchivedAttendanceRecord(**record)
+                for record in AttendanceRecord.objects.filter(session_id__in=session_ids).values(
+                    'id', 'session_id', 'student_id', 'status', 'marked_at', 'confidence_score'
+                ).iterator(chunk_size=2000)
+            ], batch_size=1000)
+
+            _delete_by_ids(AttendanceRecord, 'session_id', session_ids)
+            _delete_by_ids(AttendanceSession, 'id', session_ids)
+
+        sessions_archived += len(batch)
+        records_archived += len(records)
+        if progress:
+            progress(sessions_archived, records_archived)
+
+    archive, _ = AttendanceArchive.objects.get_or_create(academic_year=academic_year)
+    archive.sessions_archived += sessions_archived
+    archive.records_archived += records_archived
+    archive.save()
+
+    if class_ids:
+        class_history_changed.send(sender=AttendanceSession, class_ids=sorted(class_ids))
+
+    return sessions_archived, records_archived
+
+
+def records_for_class(class_instance):
+    """
+    Record querysets that hold the history of a class: the live table, plus
+    the archive table when the class belongs to an archived academic year.
+    """
+    querysets = [AttendanceRecord.objects.filter(session__class_instance=class_instance)]
+    if is_archived_year(class_instance.academic_year):
+        querysets.append(ArchivedAttendanceRecord.objects.filter(session__class_instance=class_instance))
+    return querysets
@@ -0,0 +1,113 @@
+"""
+Async variants of the live-session endpoints for ASGI deployments. They
+share their queries and payloads with the APIViews in views.py through
+payloads.py.
+"""
+
+import asyncio
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404
+from rest_framework import status, permissions
+
+from accounts.permissions import IsTeacher
+from back.asyncapi import AsyncAPIView, json_response, request_data
+from .conditional import session_validators, anot_modified_response, add_validators
+from .models import AttendanceSession
+from .gallery import class_gallery
+from .payloads import todays_session, session_data, session_records, recognition_data
+from .recognition import recognize, mark_present, recognition_executor
+from .serializers import FaceRecognitionDataSerializer
+
+
+class AsyncAttendanceSessionView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    
+    async def get(self, request, class_id):
+        """Get today's attendance session"""
+        try:
+            teacher = request.user.teacher_profile
+            today = date.today()
+            
+            not_modified = await anot_modified_response(request, AttendanceSession.objects.filter(
+                class_instance_id=class_id,
+                class_instance__teacher=teacher,
+                date=today
+            ))
+            if not_modified is not None:
+                return not_modified
+            
+            session = await sync_to_async(todays_session)(teacher, class_id)
+            if not session:
+                return json_response({
+                    'message': 'No attendance session found for today'
+                }, status=status.HTTP_404_NOT_FOUND)
+            
+            return add_validators(json_response(session_data(session)), session_validators(session))
+        
+        except Exception as e:
+            return json_response(
+                {'error': f'Error retrieving session: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class AsyncAttendanceRecordsView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    
+    async def get(self, request, session_id):
+        """Get attendance records for a session"""
+        try:
+            teacher = request.user.teacher_profile
+            
+            not_modified = await anot_modified_response(request, AttendanceSession.objects.filter(
+                id=session_id,
+                class_instance__teacher=teacher
+            ))
+            if not_modified is not None:
+                return not_modified
+            
+            session, data = await sync_to_async(session_records)(teacher, session_id)
+            
+            return add_validators(json_response(data), session_validators(session))
+        
+        except Exception as e:
+            return json_response(
+                {'error': f'Error retrieving records: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class AsyncFaceRecognitionAttendanceView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    
+    async def post(self, request, session_id):
+        """Process face recognition for attendance; detection and matching run on the recognition pool"""
+        try:
+            teacher = request.user.teacher_profile
+            session = await aget_object_or_404(
+                AttendanceSession,
+                id=session_id,
+                class_instance__teacher=teacher,
+                is_active=True
+            )
+            
+            data = request_data(request)
+            if data is None:
+                return json_response({'detail': 'JSON parse error'}, status=status.HTTP_400_BAD_REQUEST)
+            serializer = FaceRecognitionDataSerializer(data=data)
+            if not serializer.is_valid():
+                return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            
+            gallery = await sync_to_async(class_gallery)(session.class_instance_id)
+            face_count, matches = await asyncio.get_running_loop().run_in_executor(
+                recognition_executor(), recognize, serializer.validated_data['image_data'], gallery
+            )
+            recognized_students = await sync_to_async(mark_present)(session, matches) if face_count else []
+            
+            return json_response(recognition_data(face_count, recognized_students))
+        
+        except Exception as e:
+            return json_response(
+                {'error': f'Error processing faces: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -0,0 +1,194 @@
+import numpy as np
+from django.db import transaction
+
+from .models import (
+    AttendanceSession, AttendanceRecord, ArchivedAttendanceSession, ArchivedAttendanceRecord,
+    ClassAttendanceBitmap, SessionAttendanceBitmap
+)
+
+
+def pack_bits(bits):
+    return np.packbits(np.asarray(bits, dtype=bool), bitorder='little').tobytes()
+
+
+def unpack_bits(data, length):
+    return np.unpackbits(np.frombuffer(bytes(data), dtype=np.uint8), count=length, bitorder='little').astype(bool)
+
+
+def popcount(data):
+    return int.from_bytes(bytes(data), 'little').bit_count()
+
+
+def roster_ids(bitmap):
+    return np.frombuffer(bytes(bitmap.roster), dtype=np.int64)
+
+
+def _roster_positions(class_id, student_ids):
+    """Roster positions for student_ids, appending unseen students to the class roster"""
+    bitmap, _ = ClassAttendanceBitmap.objects.select_for_update().get_or_create(class_instance_id=class_id)
+    roster = roster_ids(bitmap)
+    positions = {int(student_id): index for index, student_id in enumerate(roster)}
+
+    missing = sorted(set(student_ids) - positions.keys())
+    if missing:
+        for student_id in missing:
+            positions[student_id] = len(positions)
+        bitmap.roster = np.concatenate([roster, np.array(missing, dtype=np.int64)]).tobytes()
+        bitmap.save(update_fields=['roster', 'updated_at'])
+    return positions
+
+
+def _session_bitmap_fields(positions, records):
+    present = np.zeros(len(positions), dtype=bool)
+    recorded = np.zeros(len(positions), dtype=bool)
+    for student_id, record_status in records:
+        recorded[positions[student_id]] = True
+        present[positions[student_id]] = record_status == 'PRESENT'
+    return {'present': pack_bits(present), 'recorded': pack_bits(recorded)}
+
+
+def refresh_session_bitmap(session_id):
+    """Recompute the bitmap of one live session from its records"""
+    session = AttendanceSession.objects.filter(id=session_id).values('class_instance_id', 'date').first()
+    if session is None:
+        SessionAttendanceBitmap.objects.filter(session_id=session_id).delete()
+        return None
+
+    with transaction.atomic():
+        records = list(AttendanceRecord.objects.filter(session_id=session_id).values_list('student_id', 'status'))
+        positions = _roster_positions(session['class_instance_id'], [student_id for student_id, _ in records])
+        bitmap, _ = SessionAttendanceBitmap.objects.update_or_create(
+            session_id=session_id,
+            defaults={
+                'class_instance_id': session['class_instance_id'],
+                'date': session['date'],
+                **_session_bitmap_fields(positions, records)
+            }
+        )
+    return bitmap
+
+
+def set_session_bit(session_id, student_id, record_status):
+    """
+    Set one student's bits in a live session's bitmap to record_status, None
+    clearing them. Falls back to refresh_session_bitmap when the session has
+    no bitmap yet or the student no roster position.
+    """
+    with transaction.atomic(savepoint=False):
+        bitmap = SessionAttendanceBitmap.objects.select_for_update().filter(
+            session_id=session_id
+        ).values('id', 'class_instance_id', 'present', 'recorded').first()
+        roster = ClassAttendanceBitmap.objects.filter(
+            class_instance_id=bitmap['class_instance_id']
+        ).values_list('roster', flat=True).first() if bitmap else None
+        positions = np.flatnonzero(np.frombuffer(bytes(roster), dtype=np.int64) == student_id) if roster else []
+        if not len(positions):
+            refresh_session_bitmap(session_id)
+            return
+
+        # Students appended to the roster after the bitmap was written have no byte yet
+        byte, bit = divmod(int(positions[0]), 8)
+        present = bytearray(bitmap['present']).ljust(byte + 1, b'\0')
+        recorded = bytearray(bitmap['recorded']).ljust(byte + 1, b'\0')
+        for bits, value in ((present, record_status == 'PRESENT'), (recorded, record_status is not None)):
+            if value:
+                bits[byte] |= 1 << bit
+            else:
+                bits[byte] &= ~(1 << bit)
+        SessionAttendanceBitmap.objects.filter(id=bitmap['id']).update(
+            present=bytes(present), recorded=bytes(recorded)
+        )
+
+
+def rebuild_class_bitmaps(class_id):
+    """Rebuild the roster and every session bitmap of a class, archived sessions included"""
+    sessions = {}
+    records_by_session = {}
+    for session_model, record_model in (
+        (AttendanceSession, AttendanceRecord),
+        (ArchivedAttendanceSession, ArchivedAttendanceRecord),
+    ):
+        tier_sessions = dict(session_model.objects.filter(class_instance_id=class_id).values_list('id', 'date'))
+        sessions.update(tier_sessions)
+        for session_id in tier_sessions:
+            records_by_session[session_id] = []
+        for session_id, student_id, record_status in record_model.objects.filter(
+            session__class_instance_id=class_id
+        ).values_list('session_id', 'student_id', 'status').iterator(chunk_size=5000):
+            records_by_session[session_id].append((student_id, record_status))
+
+    student_ids = sorted({
+        student_id for records in records_by_session.values() for student_id, _ in records
+    })
+    positions = {student_id: index for index, student_id in enumerate(student_ids)}
+
+    with transaction.atomic():
+        SessionAttendanceBitmap.objects.filter(class_instance_id=class_id).delete()
+        ClassAttendanceBitmap.objects.update_or_create(
+            class_instance_id=class_id,
+            defaults={'roster': np.array(student_ids, dtype=np.int64).tobytes()}
+        )
+        SessionAttendanceBitmap.objects.bulk_create([
+            SessionAttendanceBitmap(
+                session_id=session_id,
+                class_instance_id=class_id,
+                date=sessions[session_id],
+                **_session_bitmap_fields(positions, records)
+            )
+            for session_id, records in records_by_session.items()
+        ], batch_size=500)
+    return len(records_by_session)
+
+
+def class_matrix(class_id, last=None):
+    """
+    Unpack the bitmaps of a class into (student_ids, dates, present, recorded),
+    where present/recorded are sessions x roster boolean matrices ordered by
+    date. last limits the result to the most recent sessions.
+    """
+    bitmap = ClassAttendanceBitmap.objects.filter(class_instance_id=class_id).first()
+    student_ids = roster_ids(bitmap) if bitmap else np.array([], dtype=np.int64)
+
+    sessions = SessionAttendanceBitmap.objects.filter(class_instance_id=class_id).order_by('-date')
+    if last is not None:
+        sessions = sessions[:last]
+    rows = list(sessions.values_list('date', 'present', 'recorded'))[::-1]
+
+    width = len(student_ids)
+    present = np.array([unpack_bits(row[1], width) for row in rows], dtype=bool).reshape(len(rows), width)
+    recorded = np.array([unpack_bits(row[2], width) for row in rows], dtype=bool).reshape(len(rows), width)
+    return student_ids, [row[0] for row in rows], present, recorded
+
+
+def session_heatmap(class_id):
+    """Present count and ratio per session date, from popcounts of the bitmaps"""
+    heatmap = []
+    for session_date, present, recorded in SessionAttendanceBitmap.objects.filter(
+        class_instance_id=class_id
+    ).order_by('date').values_list('date', 'present', 'recorded'):
+        present_count = popcount(present)
+        recorded_count = popcount(recorded)
+        heatmap.append({
+            'date': session_date,
+            'present_count': present_count,
+            'total_students': recorded_count,
+            'present_ratio': round(present_count / recorded_count, 4) if recorded_count else 0,
+        })
+    return heatmap
+
+
+def attended_recent(class_id, n, k):
+    """Per-student attendance over the last n sessions, flagging who attended at least k of them"""
+    student_ids, dates, present, recorded = class_matrix(class_id, last=n)
+    attended = present.sum(axis=0)
+    recorded_sessions = recorded.sum(axis=0)
+    return [
+        {
+            'student_id': int(student_id),
+            'attended': int(attended[index]),
+            'sessions': int(recorded_sessions[index]),
+            'meets_target': bool(attended[index] >= k),
+        }
+        for index, student_id in enumerate(student_ids)
+        if recorded_sessions[index]
+    ]
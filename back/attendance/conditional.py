@@ -0,0 +1,56 @@
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+def _validators(session_id, version, changed_at):
+    # changed_at joins the version so a stale save() of a loaded session still changes the tag
+    return {
+        'etag': f'"{session_id}.{version}.{int(changed_at.timestamp() * 1000000)}"',
+        'last_modified': int(changed_at.timestamp()),
+    }
+
+
+def session_validators(session):
+    """ETag and Last-Modified of a loaded AttendanceSession"""
+    return _validators(session.id, session.version, session.changed_at)
+
+
+def _is_conditional(request):
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+
+def not_modified_response(request, sessions):
+    """
+    A 304 response if the request is conditional and the client's copy of
+    the single session in sessions is still current, else None. Costs one
+    narrow query, and only for conditional requests.
+    """
+    if not _is_conditional(request):
+        return None
+    return _not_modified(request, sessions.values('id', 'version', 'changed_at').first())
+
+
+async def anot_modified_response(request, sessions):
+    """not_modified_response() for async views"""
+    if not _is_conditional(request):
+        return None
+    return _not_modified(request, await sessions.values('id', 'version', 'changed_at').afirst())
+
+
+def _not_modified(request, session):
+    if session is None:
+        return None
+
+    validators = _validators(session['id'], session['version'], session['changed_at'])
+    response = get_conditional_response(request, **validators)
+    if response is not None:
+        add_validators(response, validators)
+    return response
+
+
+def add_validators(response, validators):
+    response['ETag'] = validators['etag']
+    response['Last-Modified'] = http_date(validators['last_modified'])
+    # Clients may keep the payload but must revalidate on every poll
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,110 @@
+import csv
+import heapq
+import tempfile
+from itertools import groupby
+
+from .archive import is_archived_year
+from .models import (
+    AttendanceSession, AttendanceRecord,
+    ArchivedAttendanceSession, ArchivedAttendanceRecord
+)
+
+EXPORT_CHUNK_SIZE = 2000
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class Echo:
+    """File-like object whose write() hands the value back, for streaming csv.writer output"""
+
+    def write(self, value):
+        return value
+
+
+def _class_tiers(class_instance):
+    tiers = [(AttendanceSession, AttendanceRecord)]
+    if is_archived_year(class_instance.academic_year):
+        tiers.append((ArchivedAttendanceSession, ArchivedAttendanceRecord))
+    return tiers
+
+
+def class_register_rows(class_instance, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield the attendance register of a class as rows: one header row with the
+    session dates, then one row per student with P/A per session.
+
+    Records are read with a server-side iterator ordered by student, so only
+    one student's row is held in memory at a time.
+    """
+    tiers = _class_tiers(class_instance)
+
+    sessions = []
+    for session_model, _ in tiers:
+        sessions += session_model.objects.filter(
+            class_instance=class_instance
+        ).values_list('id', 'date')
+    sessions.sort(key=lambda session: session[1])
+    columns = {session_id: index for index, (session_id, _) in enumerate(sessions)}
+
+    yield (
+        ['Roll Number', 'Student']
+        + [session_date.isoformat() for _, session_date in sessions]
+        + ['Present', 'Total', 'Percentage']
+    )
+
+    streams = [
+        record_model.objects.filter(
+            session__class_instance=class_instance
+        ).order_by('student__roll_number', 'student_id').values_list(
+            'student__roll_number', 'student_id', 'student__user__username', 'session_id', 'status'
+        ).iterator(chunk_size=chunk_size)
+        for _, record_model in tiers
+    ]
+    records = heapq.merge(*streams, key=lambda record: (record[0], record[1]))
+
+    for (roll_number, _, username), student_records in groupby(records, key=lambda record: record[:3]):
+        marks = [''] * len(sessions)
+        present = total = 0
+        for *_, session_id, record_status in student_records:
+            marks[columns[session_id]] = 'P' if record_status == 'PRESENT' else 'A'
+            total += 1
+            present += record_status == 'PRESENT'
+
+        percentage = round((present / total) * 100, 2) if total > 0 else 0
+        yield [roll_number, username] + marks + [present, total, percentage]
+
+
+def department_register_rows(classes, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the registers of several classes one after another, each under a title row"""
+    for index, class_instance in enumerate(classes):
+        if index > 0:
+            yield []
+        yield [f'{class_instance.course.code} - {class_instance.course.name}',
+               f'Section {class_instance.section}', f'Batch {class_instance.batch}',
+               class_instance.academic_year]
+        yield from class_register_rows(class_instance, chunk_size=chunk_size)
+
+
+def stream_csv(rows):
+    """Encode rows as CSV lines one at a time"""
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_xlsx(rows):
+    """
+    Write rows to a temporary XLSX file using openpyxl's write-only mode,
+    which keeps memory flat. The workbook is a zip archive, so it can only be
+    sent once it is complete.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Attendance')
+    for row in rows:
+        sheet.append(row)
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
@@ -0,0 +1,159 @@
+"""
+Class galleries (stored face encodings of a class's actively enrolled
+students) as snapshot files that recognition maps instead of querying.
+
+A snapshot holds a class's gallery version, its student-id index and its
+encodings matrix, laid out so both arrays are views straight into the
+mapped file:
+
+    header    64 bytes: MAGIC, row count and encoding size (<u8 each),
+              gallery version (32 ASCII bytes), zero padding
+    index     row count x <i8 student ids
+    encodings row count x encoding size <f8, C order
+
+Workers map snapshots read-only, so their pages sit once in the OS page
+cache however many processes match against them, and opening one is an
+mmap plus two array views, without any query or base64 decoding.
+
+Snapshot names carry the class's gallery_version, which every enrolment or
+face image change replaces in the same transaction; the new snapshot is
+written once that transaction commits. A worker asking for a version whose
+file is not there yet (the writer failed, or the class is new) writes it.
+"""
+
+import base64
+import glob
+import mmap
+import os
+import struct
+import uuid
+from collections import namedtuple
+from functools import partial
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from students.models import StudentFaceImage
+from teachers.models import Class, new_gallery_version
+
+ENCODING_SIZE = 128
+MAGIC = b'FGALLRY1'
+HEADER = struct.Struct('<8sQQ32s')
+HEADER_SIZE = 64
+
+Gallery = namedtuple('Gallery', ['version', 'student_ids', 'encodings'])
+
+# class id -> mapped Gallery for this process
+_mapped = {}
+
+
+def snapshot_path(class_instance_id, version):
+    return os.path.join(settings.FACE_GALLERY_DIR, f'class-{class_instance_id}-{version}.gallery')
+
+
+def build_gallery(class_instance_id, version):
+    """The gallery of a class read from the database"""
+    rows = list(StudentFaceImage.objects.filter(
+        student__enrollments__class_instance_id=class_instance_id,
+        student__enrollments__is_active=True,
+        face_encoding__isnull=False
+    ).exclude(face_encoding='').order_by('student_id', 'id').values_list('student_id', 'face_encoding'))
+
+    student_ids = np.array([student_id for student_id, _ in rows], dtype='<i8')
+    encodings = np.frombuffer(
+        b''.join(base64.b64decode(face_encoding.encode('utf-8')) for _, face_encoding in rows), dtype='<f8'
+    ).reshape(len(rows), ENCODING_SIZE)
+    return Gallery(version, student_ids, encodings)
+
+
+def write_snapshot(path, gallery):
+    """Write gallery to path atomically; readers see the old file or the whole new one"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    header = HEADER.pack(MAGIC, len(gallery.student_ids), ENCODING_SIZE, gallery.version.encode('ascii'))
+    temporary = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(header.ljust(HEADER_SIZE, b'\0'))
+        file.write(np.ascontiguousarray(gallery.student_ids, dtype='<i8').tobytes())
+        file.write(np.ascontiguousarray(gallery.encodings, dtype='<f8').tobytes())
+    os.replace(temporary, path)
+
+
+def open_snapshot(path):
+    """Map a snapshot read-only; the returned arrays are views into the mapping"""
+    with open(path, 'rb') as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, count, encoding_size, version = HEADER.unpack_from(mapping)
+    if magic != MAGIC or encoding_size != ENCODING_SIZE:
+        raise ValueError(f'{path} is not a gallery snapshot')
+    student_ids = np.frombuffer(mapping, dtype='<i8', count=count, offset=HEADER_SIZE)
+    encodings = np.frombuffer(
+        mapping, dtype='<f8', count=count * ENCODING_SIZE, offset=HEADER_SIZE + student_ids.nbytes
+    ).reshape(count, ENCODING_SIZE)
+    return Gallery(version.rstrip(b'\0').decode('ascii'), student_ids, encodings)
+
+
+def delete_snapshots(class_instance_id, keep=None):
+    """Remove a class's snapshot files other than keep; workers that mapped them keep their mapping"""
+    for path in glob.glob(os.path.join(settings.FACE_GALLERY_DIR, f'class-{class_instance_id}-*.gallery')):
+        if path != keep:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def publish_snapshot(class_instance_id, version):
+    path = snapshot_path(class_instance_id, version)
+    write_snapshot(path, build_gallery(class_instance_id, version))
+    delete_snapshots(class_instance_id, keep=path)
+    return path
+
+
+def class_gallery(class_instance_id):
+    """The class's current gallery, mapped from its snapshot"""
+    version = Class.objects.values_list('gallery_version', flat=True).get(id=class_instance_id)
+    gallery = _mapped.get(class_instance_id)
+    if gallery is not None and gallery.version == version:
+        return gallery
+
+    path = snapshot_path(class_instance_id, version)
+    try:
+        gallery = open_snapshot(path)
+    except FileNotFoundError:
+        gallery = open_snapshot(publish_snapshot(class_instance_id, version))
+    _mapped[class_instance_id] = gallery
+    return gallery
+
+
+def refresh_snapshots(class_ids):
+    """Write the current-version snapshot of each class that has none; returns how many were written"""
+    written = 0
+    for class_instance_id, version in Class.objects.filter(id__in=class_ids).values_list('id', 'gallery_version'):
+        if not os.path.exists(snapshot_path(class_instance_id, version)):
+            publish_snapshot(class_instance_id, version)
+            written += 1
+    return written
+
+
+def invalidate_galleries(class_ids=(), student_ids=()):
+    """
+    Give the classes, and the classes the students are actively enrolled
+    in, a new gallery version, and write their snapshots once the current
+    transaction commits. Call inside the transaction that changes their
+    enrolments or face images.
+    """
+    condition = Q(id__in=set(class_ids))
+    if student_ids:
+        condition |= Q(enrollments__student_id__in=set(student_ids), enrollments__is_active=True)
+    class_ids = list(Class.objects.filter(condition).values_list('id', flat=True).distinct())
+    Class.objects.filter(id__in=class_ids).update(gallery_version=new_gallery_version())
+    # robust: a failed write only means the first recognition writes it instead
+    transaction.on_commit(partial(refresh_snapshots, class_ids), robust=True)
+
+
+def publish_galleries():
+    """Write the current snapshot of every class that has none; returns how many were written"""
+    return refresh_snapshots(Class.objects.values('id'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.archive import DEFAULT_BATCH_SIZE, archive_academic_year
+
+
+class Command(BaseCommand):
+    help = 'Move the attendance sessions and records of a closed academic year into the archive tables'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('academic_year', help='Academic year to archive, e.g. "2023-24"')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Sessions moved per transaction')
+    
+    def handle(self, *args, **options):
+        academic_year = options['academic_year']
+        
+        def progress(sessions_archived, records_archived):
+            self.stdout.write(f'  {sessions_archived} sessions, {records_archived} records archived')
+        
+        try:
+            sessions_archived, records_archived = archive_academic_year(
+                academic_year, batch_size=options['batch_size'], progress=progress
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {sessions_archived} sessions and {records_archived} records from {academic_year}'
+        ))
@@ -0,0 +1,237 @@
+import asyncio
+import base64
+import io
+import itertools
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from unittest import mock
+
+import numpy as np
+from PIL import Image
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, AsyncClient, override_settings
+from rest_framework.authtoken.models import Token
+
+from accounts.models import User
+from attendance.models import AttendanceSession, AttendanceRecord
+from attendance.purge import purge_class_attendance
+from attendance.recognition import recognition_workers
+from attendance.summary import rebuild_class_summaries
+from students.models import StudentProfile, StudentFaceImage
+from teachers.models import TeacherProfile, Course, Class, ClassEnrollment
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare how the sync API views handle concurrent requests on a pool of worker threads '
+        '(as under WSGI) with how their async variants handle them on one event loop (as under ASGI). '
+        'Requests go through Django\'s test clients in this process, not through a server over HTTP, '
+        'against the configured database, on a throwaway class removed afterwards. A share of the '
+        'requests are face recognitions whose engine is replaced by a fixed delay.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400, help='Requests per deployment')
+        parser.add_argument('--threads', type=int, default=4, help='WSGI worker threads')
+        parser.add_argument('--clients', type=int, default=16, help='Concurrent clients, each sending its requests in turn')
+        parser.add_argument('--students', type=int, default=40, help='Students in the benchmark class')
+        parser.add_argument('--recognition-every', type=int, default=5, help='Every nth request is a recognition (0 for none)')
+        parser.add_argument('--recognition-delay', type=float, default=0.2, help='Seconds the fake face engine takes per frame')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        self.stdout.write(
+            f"Database: {connection.vendor} {connection.settings_dict['NAME']}, "
+            f"{options['clients']} clients, {options['threads']} WSGI threads, "
+            f"{recognition_workers()} recognition workers"
+        )
+
+        fixture = self._create_fixture(tag, options['students'])
+        try:
+            # The test clients address the app as "testserver"
+            with override_settings(ALLOWED_HOSTS=['testserver']), \
+                    self._fake_engine(fixture['encodings'], options['recognition_delay']):
+                for name, run in (('wsgi', self._run_wsgi), ('asgi', self._run_asgi)):
+                    plan = self._request_plan(fixture, name, options['requests'], options['recognition_every'])
+                    shares = [plan[index::options['clients']] for index in range(options['clients'])]
+                    latencies = {'read': [], 'recognition': []}
+                    errors = []
+                    started = time.perf_counter()
+                    run(shares, latencies, errors, options)
+                    self._report(name, time.perf_counter() - started, latencies, errors)
+        finally:
+            self._delete_fixture(tag, fixture['class_instance'])
+
+    def _request_plan(self, fixture, deployment, count, recognition_every):
+        """(kind, url, token, body) for count requests, the same mix for both deployments"""
+        prefix = {'attendance': '/api/attendance/', 'teachers': '/api/teachers/', 'students': '/api/students/'}
+        if deployment == 'asgi':
+            prefix = {app: f'{path}async/' for app, path in prefix.items()}
+
+        session_id = fixture['session'].id
+        class_id = fixture['class_instance'].id
+        teacher, student = fixture['teacher_token'], fixture['student_token']
+        reads = [
+            ('read', f"{prefix['attendance']}sessions/class/{class_id}/", teacher, None),
+            ('read', f"{prefix['attendance']}sessions/{session_id}/records/", teacher, None),
+            ('read', f"{prefix['teachers']}classes/{class_id}/enrollments/", teacher, None),
+            ('read', f"{prefix['students']}enrollments/", student, None),
+            ('read', f"{prefix['students']}attendance/", student, None),
+            ('read', f"{prefix['students']}attendance/class/{class_id}/", student, None),
+        ]
+        recognition = ('recognition', f"{prefix['attendance']}sessions/{session_id}/recognize/", teacher, fixture['frame'])
+
+        plan = []
+        for index in range(count):
+            if recognition_every and index % recognition_every == recognition_every - 1:
+                plan.append(recognition)
+            else:
+                plan.append(reads[index % len(reads)])
+        return plan
+
+    def _run_wsgi(self, shares, latencies, errors, options):
+        """Every client is a thread; a request waits for one of the server's worker threads"""
+        workers = threading.Semaphore(options['threads'])
+        lock = threading.Lock()
+
+        def run_client(share):
+            client = Client()
+            try:
+                for kind, url, token, body in share:
+                    headers = {'Authorization': f'Token {token}'}
+                    started = time.perf_counter()
+                    with workers:
+                        if body:
+                            response = client.post(url, data=body, content_type='application/json', headers=headers)
+                        else:
+                            response = client.get(url, headers=headers)
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        latencies[kind].append(elapsed)
+                        if response.status_code >= 400:
+                            errors.append(response.status_code)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(shares)) as pool:
+            list(pool.map(run_client, shares))
+
+    def _run_asgi(self, shares, latencies, errors, options):
+        """Every client is a task on one event loop"""
+
+        async def run_client(share):
+            client = AsyncClient()
+            for kind, url, token, body in share:
+                headers = {'Authorization': f'Token {token}'}
+                started = time.perf_counter()
+                if body:
+                    response = await client.post(url, data=body, content_type='application/json', headers=headers)
+                else:
+                    response = await client.get(url, headers=headers)
+                latencies[kind].append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors.append(response.status_code)
+
+        async def run():
+            await asyncio.gather(*(run_client(share) for share in shares))
+
+        asyncio.run(run())
+
+    def _report(self, name, elapsed, latencies, errors):
+        count = sum(len(values) for values in latencies.values())
+        self.stdout.write(f'{name}: {count} requests in {elapsed:.2f}s ({count / elapsed:.1f}/s), errors {len(errors)}')
+        for kind, values in latencies.items():
+            if not values:
+                continue
+            values.sort()
+            self.stdout.write(
+                f'  {kind}: {len(values)}, p50 {values[len(values) // 2] * 1000:.1f}ms, '
+                f'p95 {values[int(len(values) * 0.95)] * 1000:.1f}ms, max {values[-1] * 1000:.1f}ms'
+            )
+
+    def _fake_engine(self, encodings, delay):
+        """Stand in for the face engine: every frame takes delay seconds and shows one enrolled face"""
+        calls = itertools.count()
+
+        def face_locations(image_array):
+            time.sleep(delay)
+            return [(0, 8, 8, 0)]
+
+        def face_encodings(image_array, face_locations):
+            return [encodings[next(calls) % len(encodings)]]
+
+        return mock.patch.multiple(
+            'back.face_engine',
+            face_locations=face_locations, face_encodings=face_encodings
+        )
+
+    def _create_fixture(self, tag, student_count):
+        password = make_password(None)
+        teacher_user = User.objects.create(username=f'bench-teacher-{tag}', password=password, role='TEACHER')
+        teacher = TeacherProfile.objects.create(
+            user=teacher_user, employee_id=f'BENCH-{tag}',
+            department='Benchmark', designation='Benchmark'
+        )
+        course = Course.objects.create(
+            code=f'BENCH-{tag}', name='Async benchmark', department='Benchmark', semester=1
+        )
+        class_instance = Class.objects.create(
+            teacher=teacher, course=course, section='A',
+            batch='bench', semester=1, academic_year='bench'
+        )
+
+        users = User.objects.bulk_create([
+            User(username=f'bench-{tag}-{index}', password=password, role='STUDENT')
+            for index in range(student_count)
+        ])
+        students = StudentProfile.objects.bulk_create([
+            StudentProfile(
+                user=user, roll_number=f'BENCH-{tag}-{index:05d}',
+                department='Benchmark', semester=1, batch='bench'
+            )
+            for index, user in enumerate(users)
+        ])
+        ClassEnrollment.objects.bulk_create([
+            ClassEnrollment(student=student, class_instance=class_instance) for student in students
+        ])
+
+        # Far-apart synthetic encodings, so each fake frame matches exactly one student
+        encodings = [np.eye(128)[index % 128] * (1 + index // 128) for index in range(student_count)]
+        StudentFaceImage.objects.bulk_create([
+            StudentFaceImage(
+                student=student, image=f'student_faces/bench-{tag}-{student.id}.jpg', is_primary=True,
+                face_encoding=base64.b64encode(encoding.tobytes()).decode('utf-8')
+            )
+            for student, encoding in zip(students, encodings)
+        ])
+
+        session = AttendanceSession.objects.create(class_instance=class_instance, date=date.today())
+        AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(session=session, student=student, status='ABSENT') for student in students
+        ])
+        rebuild_class_summaries(class_instance.id)
+
+        frame = io.BytesIO()
+        Image.new('RGB', (8, 8)).save(frame, format='PNG')
+        return {
+            'class_instance': class_instance,
+            'session': session,
+            'encodings': encodings,
+            'frame': {'image_data': base64.b64encode(frame.getvalue()).decode('ascii')},
+            'teacher_token': Token.objects.create(user=teacher_user).key,
+            'student_token': Token.objects.create(user=users[0]).key,
+        }
+
+    def _delete_fixture(self, tag, class_instance):
+        purge_class_attendance(class_instance.id)
+        course = class_instance.course
+        teacher_user = class_instance.teacher.user
+        class_instance.delete()
+        course.delete()
+        User.objects.filter(username__startswith=f'bench-{tag}-').delete()
+        teacher_user.delete()
@@ -0,0 +1,139 @@
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, OperationalError
+from django.utils import timezone
+
+from accounts.models import User
+from attendance.models import AttendanceSession, AttendanceRecord
+from attendance.purge import purge_class_attendance
+from students.models import StudentProfile
+from teachers.models import TeacherProfile, Course, Class, ClassEnrollment
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure attendance write throughput with parallel recognition writers against the '
+        'configured database. Creates a throwaway class and removes it afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Number of concurrent writer threads')
+        parser.add_argument('--students', type=int, default=200, help='Students in the benchmark class')
+        parser.add_argument('--sessions', type=int, default=3, help='Sessions marked by every writer')
+
+    def handle(self, *args, **options):
+        writers = options['writers']
+        tag = uuid.uuid4().hex[:8]
+
+        self.stdout.write(
+            f"Database: {connection.vendor} {connection.settings_dict['NAME']} "
+            f"({connection.settings_dict.get('OPTIONS') or 'default options'})"
+        )
+
+        class_instance, students, sessions = self._create_fixture(tag, options['students'], options['sessions'])
+        try:
+            results = {'writes': 0, 'locked': 0, 'errors': 0}
+            latencies = []
+            lock = threading.Lock()
+
+            def writer(index):
+                # Each writer plays a recognition request marking its share of the roster present
+                local = {'writes': 0, 'locked': 0, 'errors': 0}
+                local_latencies = []
+                try:
+                    for session in sessions:
+                        for student in students[index::writers]:
+                            started = time.perf_counter()
+                            try:
+                                record = AttendanceRecord.objects.get(session=session, student=student)
+                                record.status = 'PRESENT'
+                                record.confidence_score = 0.9
+                                record.marked_at = timezone.now()
+                                record.save()
+                                local['writes'] += 1
+                            except OperationalError as e:
+                                local['locked' if 'locked' in str(e) else 'errors'] += 1
+                            local_latencies.append(time.perf_counter() - started)
+                finally:
+                    connection.close()
+                with lock:
+                    for key, value in local.items():
+                        results[key] += value
+                    latencies.extend(local_latencies)
+
+            threads = [threading.Thread(target=writer, args=(index,)) for index in range(writers)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            self._delete_fixture(tag, class_instance)
+
+        latencies.sort()
+        attempts = len(latencies)
+        self.stdout.write(f'Writers: {writers}, attempts: {attempts}, elapsed: {elapsed:.2f}s')
+        self.stdout.write(f"Successful writes: {results['writes']} ({results['writes'] / elapsed:.1f}/s)")
+        self.stdout.write(f"Lock errors: {results['locked']}, other errors: {results['errors']}")
+        if latencies:
+            self.stdout.write(
+                f'Latency p50: {latencies[attempts // 2] * 1000:.1f}ms, '
+                f'p95: {latencies[int(attempts * 0.95)] * 1000:.1f}ms, '
+                f'max: {latencies[-1] * 1000:.1f}ms'
+            )
+
+    def _create_fixture(self, tag, student_count, session_count):
+        password = make_password(None)
+        teacher_user = User.objects.create(username=f'bench-teacher-{tag}', password=password, role='TEACHER')
+        teacher = TeacherProfile.objects.create(
+            user=teacher_user, employee_id=f'BENCH-{tag}',
+            department='Benchmark', designation='Benchmark'
+        )
+        course = Course.objects.create(
+            code=f'BENCH-{tag}', name='Write benchmark', department='Benchmark', semester=1
+        )
+        class_instance = Class.objects.create(
+            teacher=teacher, course=course, section='A',
+            batch='bench', semester=1, academic_year='bench'
+        )
+
+        users = User.objects.bulk_create([
+            User(username=f'bench-{tag}-{index}', password=password, role='STUDENT')
+            for index in range(student_count)
+        ])
+        students = StudentProfile.objects.bulk_create([
+            StudentProfile(
+                user=user, roll_number=f'BENCH-{tag}-{index:05d}',
+                department='Benchmark', semester=1, batch='bench'
+            )
+            for index, user in enumerate(users)
+        ])
+        ClassEnrollment.objects.bulk_create([
+            ClassEnrollment(student=student, class_instance=class_instance) for student in students
+        ])
+
+        sessions = AttendanceSession.objects.bulk_create([
+            AttendanceSession(class_instance=class_instance, date=date(2000, 1, 1) + timedelta(days=offset))
+            for offset in range(session_count)
+        ])
+        AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(session=session, student=student, status='ABSENT')
+            for session in sessions
+            for student in students
+        ])
+        return class_instance, students, sessions
+
+    def _delete_fixture(self, tag, class_instance):
+        purge_class_attendance(class_instance.id)
+        course = class_instance.course
+        teacher_user = class_instance.teacher.user
+        class_instance.delete()
+        course.delete()
+        User.objects.filter(username__startswith=f'bench-{tag}-').delete()
+        teacher_user.delete()
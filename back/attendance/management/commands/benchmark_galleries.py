@@ -0,0 +1,96 @@
+import base64
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+
+from accounts.models import User
+from attendance.gallery import build_gallery, class_gallery, open_snapshot, publish_snapshot
+from students.models import StudentProfile, StudentFaceImage
+from teachers.models import TeacherProfile, Course, Class, ClassEnrollment
+
+
+def timed(function, repeat):
+    """Median seconds of function over repeat calls"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = (
+        'Time loading one class gallery: rebuilt from the database (query plus base64 decoding of '
+        'every encoding), opened cold from its snapshot file, and through class_gallery with the '
+        'snapshot already mapped. The class is created in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=200, help='Students in the class')
+        parser.add_argument('--images', type=int, default=2, help='Face images per student')
+        parser.add_argument('--repeat', type=int, default=50, help='Timed runs of each load')
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp(prefix='galleries-')
+        try:
+            with override_settings(FACE_GALLERY_DIR=directory), transaction.atomic():
+                class_instance = self._create_class(options['students'], options['images'])
+                version = class_instance.gallery_version
+                path = publish_snapshot(class_instance.id, version)
+                repeat = options['repeat']
+
+                rebuild = timed(lambda: build_gallery(class_instance.id, version), repeat)
+                cold = timed(lambda: open_snapshot(path), repeat)
+                class_gallery(class_instance.id)
+                mapped = timed(lambda: class_gallery(class_instance.id), repeat)
+                transaction.set_rollback(True)
+        finally:
+            shutil.rmtree(directory)
+
+        self.stdout.write(
+            f"Gallery of {options['students'] * options['images']} encodings on {connection.vendor}, "
+            f"median of {options['repeat']}:\n"
+            f'  rebuilt from the database: {rebuild * 1e6:.0f} us\n'
+            f'  snapshot opened cold:      {cold * 1e6:.0f} us\n'
+            f'  class_gallery, mapped:     {mapped * 1e6:.0f} us (the version query)'
+        )
+
+    def _create_class(self, students, images):
+        password = make_password(None)
+        teacher_user = User.objects.create(username='gallery-bench-teacher', password=password, role='TEACHER')
+        teacher = TeacherProfile.objects.create(
+            user=teacher_user, employee_id='GALLERYBENCH', department='Benchmark', designation='Lecturer'
+        )
+        course = Course.objects.create(code='GALLERYBENCH', name='Gallery benchmark', department='Benchmark', semester=1)
+        class_instance = Class.objects.create(
+            teacher=teacher, course=course, section='A', batch='bench', semester=1, academic_year='bench'
+        )
+
+        users = User.objects.bulk_create([
+            User(username=f'gallery-bench-{index}', password=password, role='STUDENT') for index in range(students)
+        ])
+        profiles = StudentProfile.objects.bulk_create([
+            StudentProfile(user=user, roll_number=f'GB{index:08d}', department='Benchmark', semester=1, batch='bench')
+            for index, user in enumerate(users)
+        ])
+        ClassEnrollment.objects.bulk_create([
+            ClassEnrollment(student=student, class_instance=class_instance) for student in profiles
+        ])
+        rng = np.random.default_rng(0)
+        StudentFaceImage.objects.bulk_create([
+            StudentFaceImage(
+                student=student, image=f'student_faces/gallery-bench-{student.id}-{index}.jpg',
+                face_encoding=base64.b64encode(rng.normal(0, 0.1, 128).tobytes()).decode('utf-8')
+            )
+            for student in profiles
+            for index in range(images)
+        ], batch_size=1000)
+        return class_instance
@@ -0,0 +1,64 @@
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Run in a fresh interpreter: set Django up, import every view through the
+# URLconf as a worker does on boot, then optionally warm the face engine
+PROBE = '''
+import os, sys, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'back.settings')
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+booted = time.perf_counter()
+if sys.argv[1] == 'warm':
+    from back import face_engine
+    face_engine.warm_up()
+print(booted - started, time.perf_counter() - booted, 'face_recognition' in sys.modules)
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure process startup: wall time and peak RSS of fresh interpreters that set Django up '
+        'and import every view, as a management command or server worker does, and whether that '
+        'loaded face_recognition. With --warm each process then also loads the face models.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Processes to start')
+        parser.add_argument('--warm', action='store_true', help='Also warm the face engine after startup')
+
+    def handle(self, *args, **options):
+        boot_times, warm_times, peak_rss = [], [], []
+        for _ in range(options['runs']):
+            process = subprocess.Popen(
+                [sys.executable, '-c', PROBE, 'warm' if options['warm'] else 'cold'],
+                cwd=settings.BASE_DIR, stdout=subprocess.PIPE, text=True
+            )
+            output = process.stdout.read()
+            # wait4 gives this child's own peak RSS in KiB
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            if process.returncode:
+                self.stderr.write(f'Probe exited with {process.returncode}')
+                return
+
+            boot, warm, engine_loaded = output.split()
+            boot_times.append(float(boot))
+            warm_times.append(float(warm))
+            peak_rss.append(usage.ru_maxrss)
+
+        self.stdout.write(
+            f"Startup over {options['runs']} runs: median {statistics.median(boot_times) * 1000:.0f} ms, "
+            f"peak RSS median {statistics.median(peak_rss) / 1024:.0f} MiB, "
+            f"face_recognition loaded: {engine_loaded}"
+        )
+        if options['warm']:
+            self.stdout.write(f'Face engine warm-up: median {statistics.median(warm_times) * 1000:.0f} ms')
@@ -0,0 +1,116 @@
+import gc
+import os
+import shutil
+import statistics
+import tempfile
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from attendance.gallery import ENCODING_SIZE, Gallery, open_snapshot, write_snapshot
+from back import face_engine
+
+
+def memory():
+    """Rss, Pss and private memory of this process in KiB"""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields['Rss'], fields['Pss'], fields['Private_Clean'] + fields['Private_Dirty']
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure memory per server worker as workers and classes grow. Forks worker processes that '
+        'each run face detection and match a frame against every class gallery, then report RSS, '
+        'PSS and private memory per worker while all are alive. "per-worker" loads the face models '
+        'after fork and holds private gallery copies (as when every worker builds its own); '
+        '"preload" loads the models before fork and maps the gallery snapshots read-only.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Worker processes to fork')
+        parser.add_argument('--classes', type=int, default=50, help='Class galleries to match against')
+        parser.add_argument('--students', type=int, default=200, help='Encodings per class gallery')
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp(prefix='galleries-')
+        try:
+            paths = self._write_galleries(directory, options['classes'], options['students'])
+            self.stdout.write(
+                f"{options['workers']} workers, {options['classes']} classes of {options['students']} "
+                f"encodings ({sum(os.path.getsize(path) for path in paths) / 2 ** 20:.1f} MiB of snapshots)"
+            )
+            # per-worker first: once the models are loaded here, every later fork inherits them
+            for mode in ('per-worker', 'preload'):
+                if mode == 'preload':
+                    face_engine.warm_up()
+                    gc.freeze()
+                results = self._run_workers(mode, paths, options['workers'])
+                rss, pss, private = zip(*results)
+                self.stdout.write(
+                    f'  {mode}: per worker RSS {statistics.median(rss) / 1024:.0f} MiB, '
+                    f'PSS {statistics.median(pss) / 1024:.0f} MiB, private {statistics.median(private) / 1024:.0f} MiB; '
+                    f'all workers PSS {sum(pss) / 1024:.0f} MiB'
+                )
+        finally:
+            shutil.rmtree(directory)
+
+    def _write_galleries(self, directory, classes, students):
+        rng = np.random.default_rng(0)
+        paths = []
+        for class_index in range(classes):
+            gallery = Gallery(
+                'benchmark', np.arange(students) + class_index * students, rng.normal(0, 0.1, (students, ENCODING_SIZE))
+            )
+            path = os.path.join(directory, f'class-{class_index}.gallery')
+            write_snapshot(path, gallery)
+            paths.append(path)
+        return paths
+
+    def _run_workers(self, mode, paths, workers):
+        release_read, release_write = os.pipe()
+        children = []
+        for _ in range(workers):
+            result_read, result_write = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(release_write)
+                os.close(result_read)
+                self._worker(mode, paths, result_write, release_read)
+            os.close(result_write)
+            children.append((pid, result_read))
+
+        results = []
+        for pid, result_read in children:
+            with os.fdopen(result_read) as file:
+                results.append(tuple(int(value) for value in file.read().split()))
+        # Workers exit once every one of them has reported, so PSS shares are measured together
+        os.close(release_write)
+        os.close(release_read)
+        for pid, _ in children:
+            os.waitpid(pid, 0)
+        return results
+
+    def _worker(self, mode, paths, result_write, release_read):
+        try:
+            if mode == 'preload':
+                galleries = [open_snapshot(path).encodings for path in paths]
+            else:
+                face_engine.warm_up()
+                galleries = [np.array(open_snapshot(path).encodings) for path in paths]
+
+            frame = np.zeros((240, 320, 3), dtype=np.uint8)
+            face_engine.face_locations(frame)
+            probe = np.full(ENCODING_SIZE, 0.05)
+            for encodings in galleries:
+                face_engine.face_distance(encodings, probe)
+
+            os.write(result_write, ' '.join(str(value) for value in memory()).encode())
+            os.close(result_write)
+            os.read(release_read, 1)
+        finally:
+            os._exit(0)
@@ -0,0 +1,384 @@
+import base64
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.gallery import build_gallery
+from attendance.models import AttendanceSession
+from back.fake_face_engine import encode_frame
+from students.models import StudentProfile
+from teachers.models import Class
+
+# Concurrent logins and session starts while a stage sets up
+SETUP_THREADS = 16
+
+
+def percentile(values, fraction):
+    """The fraction-th value of sorted values"""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Stats:
+    """Latencies and outcomes per endpoint, recorded from every actor thread"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(Counter)
+        self.tallies = Counter()
+        self.started = time.perf_counter()
+        self.elapsed = None
+
+    def record(self, endpoint, seconds, status):
+        with self.lock:
+            self.latencies[endpoint].append(seconds)
+            if status is None or status >= 400:
+                self.errors[endpoint][status or 'no response'] += 1
+
+    def tally(self, name, count):
+        with self.lock:
+            self.tallies[name] += count
+
+    def stop(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def requests(self):
+        return sum(len(values) for values in self.latencies.values())
+
+    def error_rate(self):
+        requests = self.requests()
+        return sum(sum(errors.values()) for errors in self.errors.values()) / requests if requests else 0
+
+
+def call(stats, endpoint, method, url, token=None, body=None, etag=None, timeout=30):
+    """Send one request and record it; returns (status, etag, decoded JSON), status None if no response came"""
+    request = urllib.request.Request(
+        url, method=method, data=json.dumps(body).encode('utf-8') if body is not None else None,
+        headers={'Content-Type': 'application/json', 'Accept': 'application/json'}
+    )
+    if token:
+        request.add_header('Authorization', f'Token {token}')
+    if etag:
+        request.add_header('If-None-Match', etag)
+
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status, headers, payload = response.status, response.headers, response.read()
+    except urllib.error.HTTPError as error:
+        # Includes 304 Not Modified
+        status, headers, payload = error.code, error.headers, error.read()
+    except OSError:
+        # Refused, reset or timed out
+        stats.record(endpoint, time.perf_counter() - started, None)
+        return None, None, {}
+    stats.record(endpoint, time.perf_counter() - started, status)
+
+    try:
+        data = json.loads(payload) if payload else {}
+    except ValueError:
+        data = {}
+    return status, headers.get('ETag'), data
+
+
+def every(interval, stop, action, rng):
+    """Run action every interval seconds until stop is set, starting at a random offset"""
+    next_at = time.monotonic() + rng.uniform(0, interval)
+    while not stop.wait(max(0, next_at - time.monotonic())):
+        action()
+        # A late action is not followed by a burst catching up
+        next_at = max(next_at + interval, time.monotonic())
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test a running server through its HTTP API with simulated classrooms. Every '
+        'classroom is a teacher who starts today\'s session of a class, a camera posting '
+        'recognition frames of enrolled students and a screen polling the records; students of '
+        'the classrooms poll their dashboards in the background. Reports throughput, latency '
+        'percentiles and errors per endpoint. The server must run with FACE_ENGINE=fake, and this '
+        'command must use its database: classes, rosters and encodings are read from it. Seed it '
+        'with seed_scale first. With --ramp-step the classrooms grow stage by stage until the '
+        'error rate or p95 latency goes over its limit.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server')
+        parser.add_argument('--classrooms', type=int, default=10, help='Concurrent classrooms (the last stage when ramping)')
+        parser.add_argument('--ramp-step', type=int, default=0, help='Add this many classrooms per stage (default: one stage)')
+        parser.add_argument('--duration', type=float, default=60, help='Seconds of load per stage')
+        parser.add_argument('--frame-interval', type=float, default=2, help='Seconds between frames of a camera')
+        parser.add_argument('--faces', type=int, default=3, help='Enrolled students shown per frame')
+        parser.add_argument('--poll-interval', type=float, default=3, help='Seconds between records polls of a classroom')
+        parser.add_argument('--students-per-classroom', type=int, default=5, help='Students polling their dashboards')
+        parser.add_argument('--student-interval', type=float, default=10, help='Seconds between dashboard checks')
+        parser.add_argument(
+            '--async-views', action='store_true',
+            help='Use the async variants of the endpoints that have one (sessions still start on the sync view)'
+        )
+        parser.add_argument('--end-sessions', action='store_true', help='End the sessions afterwards')
+        parser.add_argument('--max-error-rate', type=float, default=0.01, help='Stage error rate that stops a ramp')
+        parser.add_argument('--max-p95', type=float, default=0, help='Endpoint p95 seconds that stops a ramp (default: unchecked)')
+        parser.add_argument('--timeout', type=float, default=30, help='Seconds before a request counts as failed')
+        parser.add_argument('--prefix', default='scale', help='seed_scale prefix of the users to act as')
+        parser.add_argument('--password', default='password', help='Password of those users')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+
+    def handle(self, *args, **options):
+        self.options = options
+        api = options['url'].rstrip('/') + '/api/'
+        version = 'async/' if options['async_views'] else ''
+        self.attendance_api = f'{api}attendance/{version}'
+        self.students_api = f'{api}students/{version}'
+        self.api = api
+        self.tokens = {}
+        self.tokens_lock = threading.Lock()
+
+        classrooms = self._classrooms(options['classrooms'])
+        step = options['ramp_step'] or len(classrooms)
+        stages = list(range(step, len(classrooms), step)) + [len(classrooms)]
+        self.stdout.write(
+            f"{len(classrooms)} classrooms of {options['prefix']} classes against {api}, "
+            f"{len(stages)} stage(s) of {options['duration']:.0f}s"
+        )
+
+        students = []
+        broken = None
+        passed = 0
+        try:
+            for size in stages:
+                setup = Stats()
+                self._setup(setup, classrooms[:size], students)
+                setup.stop()
+                active = [classroom for classroom in classrooms[:size] if classroom.get('session_id')]
+                if not active:
+                    self._report('setup', setup)
+                    raise CommandError(
+                        f'No classroom could start a session; is the server running at {options["url"]} on this database?'
+                    )
+
+                polling = [student for student in students if student.get('token')]
+                load = Stats()
+                self._run(load, active, polling)
+                load.stop()
+
+                self.stdout.write(f'\nStage: {len(active)} classrooms, {len(polling)} students')
+                self._report('setup', setup)
+                self._report('load', load)
+                reason = self._over_limit(load)
+                if reason:
+                    broken = (len(active), reason)
+                    break
+                passed = len(active)
+        finally:
+            if options['end_sessions']:
+                teardown = Stats()
+                self._end_sessions(teardown, classrooms)
+                teardown.stop()
+                self._report('teardown', teardown)
+
+        if len(stages) > 1:
+            if broken:
+                self.stdout.write(self.style.WARNING(
+                    f'\nBreaking point: {broken[0]} classrooms ({broken[1]}); the last stage within limits had {passed}'
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'\nNo breaking point up to {passed} classrooms'))
+
+    def _classrooms(self, count):
+        """Classes of the prefix's teachers with active enrolments and no session ended today"""
+        ended_today = AttendanceSession.objects.filter(date=date.today(), is_active=False).values('class_instance_id')
+        classes = list(Class.objects.filter(
+            teacher__user__username__startswith=f"{self.options['prefix']}-teacher-",
+            enrollments__is_active=True
+        ).exclude(id__in=ended_today).select_related('teacher__user').distinct().order_by('id')[:count])
+        if not classes:
+            raise CommandError(
+                f"No classes of {self.options['prefix']}-teacher-* users left to use today; run seed_scale first"
+            )
+
+        rng = random.Random(self.options['seed'])
+        classrooms = []
+        for class_instance in classes:
+            gallery = build_gallery(class_instance.id, '')
+            if not len(gallery.student_ids):
+                continue
+            usernames = list(StudentProfile.objects.filter(
+                id__in=set(gallery.student_ids.tolist())
+            ).values_list('user__username', flat=True))
+            classrooms.append({
+                'class_id': class_instance.id,
+                'teacher': class_instance.teacher.user.username,
+                'encodings': gallery.encodings,
+                'students': rng.sample(usernames, min(self.options['students_per_classroom'], len(usernames))),
+                'rng': random.Random(rng.random()),
+            })
+        return classrooms
+
+    def _login(self, stats, username):
+        with self.tokens_lock:
+            if username in self.tokens:
+                return self.tokens[username]
+        status, _, data = call(
+            stats, 'login', 'POST', f'{self.api}auth/login/',
+            body={'username': username, 'password': self.options['password']}, timeout=self.options['timeout']
+        )
+        token = data.get('token') if status == 200 else None
+        with self.tokens_lock:
+            self.tokens[username] = token
+        return token
+
+    def _setup(self, stats, classrooms, students):
+        """Log in and start sessions of classrooms new in this stage, and log in their students"""
+        known = {student['username'] for student in students}
+        for classroom in classrooms:
+            for username in classroom['students']:
+                if username not in known:
+                    known.add(username)
+                    students.append({'username': username, 'rng': random.Random(classroom['rng'].random())})
+
+        def start(classroom):
+            if 'session_id' in classroom:
+                return
+            token = self._login(stats, classroom['teacher'])
+            if not token:
+                classroom['session_id'] = None
+                return
+            status, _, data = call(
+                stats, 'start session', 'POST', f"{self.api}attendance/sessions/class/{classroom['class_id']}/",
+                token=token, body={}, timeout=self.options['timeout']
+            )
+            session = (data.get('session') or {}) if status in (200, 201) else {}
+            # An existing session ended today cannot take recognitions
+            classroom['session_id'] = session.get('id') if session.get('is_active', True) else None
+            classroom['token'] = token
+
+        def log_in(student):
+            if 'token' not in student:
+                student['token'] = self._login(stats, student['username'])
+
+        with ThreadPoolExecutor(max_workers=SETUP_THREADS) as pool:
+            list(pool.map(start, classrooms))
+            list(pool.map(log_in, students))
+
+    def _run(self, stats, classrooms, students):
+        """Run every classroom's camera and screen and every student for --duration seconds"""
+        options = self.options
+        stop = threading.Event()
+        timeout = options['timeout']
+
+        def camera(classroom):
+            rng = random.Random(classroom['rng'].random())
+            encodings = classroom['encodings']
+            url = f"{self.attendance_api}sessions/{classroom['session_id']}/recognize/"
+
+            def post_frame():
+                rows = rng.sample(range(len(encodings)), min(options['faces'], len(encodings)))
+                frame = base64.b64encode(encode_frame(encodings[rows])).decode('ascii')
+                status, _, data = call(
+                    stats, 'recognize', 'POST', url, token=classroom['token'],
+                    body={'image_data': frame}, timeout=timeout
+                )
+                stats.tally('faces sent', len(rows))
+                if status == 200:
+                    stats.tally('faces recognized', len(data.get('recognized_students', [])))
+            every(options['frame_interval'], stop, post_frame, rng)
+
+        def screen(classroom):
+            url = f"{self.attendance_api}sessions/{classroom['session_id']}/records/"
+            etags = {}
+
+            def poll():
+                status, etag, _ = call(
+                    stats, 'records', 'GET', url, token=classroom['token'], etag=etags.get(url), timeout=timeout
+                )
+                if status == 200 and etag:
+                    etags[url] = etag
+            every(options['poll_interval'], stop, poll, random.Random(classroom['rng'].random()))
+
+        def dashboard(student):
+            pages = (('student attendance', f'{self.students_api}attendance/'),
+                     ('student enrollments', f'{self.students_api}enrollments/'))
+            etags = {}
+
+            def check():
+                for endpoint, url in pages:
+                    status, etag, _ = call(
+                        stats, endpoint, 'GET', url, token=student['token'], etag=etags.get(url), timeout=timeout
+                    )
+                    if status == 200 and etag:
+                        etags[url] = etag
+            every(options['student_interval'], stop, check, student['rng'])
+
+        threads = [threading.Thread(target=camera, args=(classroom,)) for classroom in classrooms]
+        threads += [threading.Thread(target=screen, args=(classroom,)) for classroom in classrooms]
+        threads += [threading.Thread(target=dashboard, args=(student,)) for student in students]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    def _end_sessions(self, stats, classrooms):
+        def end(classroom):
+            if classroom.get('session_id'):
+                call(
+                    stats, 'end session', 'PATCH', f"{self.api}attendance/sessions/{classroom['session_id']}/end/",
+                    token=classroom['token'], body={}, timeout=self.options['timeout']
+                )
+
+        with ThreadPoolExecutor(max_workers=SETUP_THREADS) as pool:
+            list(pool.map(end, classrooms))
+
+    def _over_limit(self, stats):
+        """Why stats breaks the ramp's limits, or None"""
+        if stats.error_rate() > self.options['max_error_rate']:
+            return f'error rate {stats.error_rate():.1%}'
+        if self.options['max_p95']:
+            for endpoint, latencies in sorted(stats.latencies.items()):
+                p95 = percentile(sorted(latencies), 0.95)
+                if p95 > self.options['max_p95']:
+                    return f'{endpoint} p95 {p95 * 1000:.0f}ms'
+        return None
+
+    def _report(self, phase, stats):
+        if not stats.requests():
+            return
+        self.stdout.write(
+            f'  {phase}: {stats.requests()} requests in {stats.elapsed:.1f}s '
+            f'({stats.requests() / stats.elapsed:.1f}/s), error rate {stats.error_rate():.1%}'
+        )
+        self.stdout.write(
+            f"    {'endpoint':<20} {'requests':>8} {'req/s':>7} {'errors':>7} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+        )
+        for endpoint, latencies in sorted(stats.latencies.items()):
+            latencies = sorted(latencies)
+            errors = stats.errors[endpoint]
+            self.stdout.write(
+                f'    {endpoint:<20} {len(latencies):>8} {len(latencies) / stats.elapsed:>7.1f} '
+                f'{sum(errors.values()):>7} {percentile(latencies, 0.5) * 1000:>8.1f} '
+                f'{percentile(latencies, 0.95) * 1000:>8.1f} {percentile(latencies, 0.99) * 1000:>8.1f} '
+                f'{latencies[-1] * 1000:>8.1f}'
+            )
+            if errors:
+                self.stdout.write('      ' + ', '.join(f'{status}: {count}' for status, count in errors.most_common()))
+
+        sent = stats.tallies['faces sent']
+        if sent:
+            recognized = stats.tallies['faces recognized']
+            self.stdout.write(f'    recognized {recognized} of {sent} faces sent')
+            if not recognized:
+                self.stdout.write(self.style.WARNING(
+                    '    No face was recognized: is the server running with FACE_ENGINE=fake on this database?'
+                ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from attendance.gallery import publish_galleries
+
+
+class Command(BaseCommand):
+    help = (
+        'Write the face gallery snapshot of every class whose current version has none, so that '
+        'workers map it instead of building it on their first recognition. Run before starting '
+        'workers; gunicorn.conf.py does this in the master.'
+    )
+
+    def handle(self, *args, **options):
+        written = publish_galleries()
+        self.stdout.write(self.style.SUCCESS(f'Published {written} gallery snapshots'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.purge import DEFAULT_BATCH_SIZE, purge_class_attendance
+from teachers.models import Class
+
+
+class Command(BaseCommand):
+    help = 'Delete all attendance sessions and records of a class in bounded batches'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('class_id', type=int)
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    
+    def handle(self, *args, **options):
+        class_id = options['class_id']
+        if not Class.objects.filter(id=class_id).exists():
+            raise CommandError(f'Class {class_id} does not exist')
+        
+        def progress(sessions_deleted, records_deleted):
+            self.stdout.write(f'  {records_deleted} records, {sessions_deleted} sessions deleted')
+        
+        sessions_deleted, records_deleted = purge_class_attendance(
+            class_id, batch_size=options['batch_size'], progress=progress
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged {sessions_deleted} sessions and {records_deleted} records from class {class_id}'
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from attendance.bitmaps import rebuild_class_bitmaps
+from teachers.models import Class
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-session attendance bitmaps of one or every class from attendance records'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--class-id', type=int, help='Only rebuild bitmaps for this class')
+    
+    def handle(self, *args, **options):
+        class_ids = [options['class_id']] if options.get('class_id') else Class.objects.values_list('id', flat=True)
+        
+        total = 0
+        for class_id in class_ids:
+            total += rebuild_class_bitmaps(class_id)
+        
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} session bitmaps'))
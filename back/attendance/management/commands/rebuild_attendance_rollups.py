@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from attendance.rollups import rebuild_class_rollups
+from teachers.models import Class
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily and weekly attendance rollups of one or every class from attendance records'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--class-id', type=int, help='Only rebuild rollups for this class')
+    
+    def handle(self, *args, **options):
+        class_ids = [options['class_id']] if options.get('class_id') else Class.objects.values_list('id', flat=True)
+        
+        total = 0
+        for class_id in class_ids:
+            total += rebuild_class_rollups(class_id)
+        
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rollups for {total} attendance days'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from attendance.summary import rebuild_class_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-student per-class attendance summary table from attendance records'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--class-id', type=int, help='Only rebuild summaries for this class')
+    
+    def handle(self, *args, **options):
+        class_id = options.get('class_id')
+        count = rebuild_class_summaries(class_id)
+        
+        scope = f'class {class_id}' if class_id is not None else 'all classes'
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} attendance summaries for {scope}'))
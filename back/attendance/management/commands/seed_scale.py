@@ -0,0 +1,216 @@
+import base64
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import User
+from attendance.bitmaps import rebuild_class_bitmaps
+from attendance.models import AttendanceSession, AttendanceRecord
+from attendance.rollups import rebuild_class_rollups
+from attendance.summary import rebuild_class_summaries
+from students.models import StudentProfile, StudentFaceImage
+from teachers.models import TeacherProfile, Course, Class, ClassEnrollment
+
+DEPARTMENTS = ['Computer Science', 'Electrical', 'Mechanical', 'Civil', 'Electronics']
+# Batch -> the semester it is in during the seeded academic year
+BATCHES = {'2021': 7, '2022': 5, '2023': 3, '2024': 1}
+ACADEMIC_YEAR = '2024-25'
+SECTIONS = 'ABCDEFGH'
+# Classes whose sessions and records are written per transaction
+CLASSES_PER_TRANSACTION = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a large synthetic dataset for profiling: teachers, courses, classes, students in '
+        'department/batch cohorts enrolled in classes of their cohort, face image rows with random '
+        'encodings (no files), ended sessions and attendance records, with the summary, bitmap and '
+        'rollup tables rebuilt. Everything is written with bulk_create. Every seeded user has the '
+        'password given by --password. Use an empty database, e.g. DB_NAME=scale.sqlite3.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000, help='Students (default: 2000)')
+        parser.add_argument('--classes', type=int, default=200, help='Classes (default: 200)')
+        parser.add_argument('--class-size', type=int, default=40, help='Students enrolled per class (default: 40)')
+        parser.add_argument('--sessions', type=int, default=30, help='Ended sessions per class (default: 30)')
+        parser.add_argument('--sections', type=int, default=2, help='Classes (sections) per course (default: 2)')
+        parser.add_argument('--classes-per-teacher', type=int, default=4, help='Classes taught by each teacher (default: 4)')
+        parser.add_argument('--images', type=int, default=1, help='Face images per student (default: 1)')
+        parser.add_argument('--prefix', default='scale', help='Prefix of usernames, roll numbers and codes (default: scale)')
+        parser.add_argument('--password', default='password', help='Password of every seeded user (default: password)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['sections'] <= len(SECTIONS):
+            raise CommandError(f'--sections must be between 1 and {len(SECTIONS)}')
+        prefix = options['prefix']
+        self.code_prefix = prefix.upper()[:4]
+        if User.objects.filter(username__startswith=f'{prefix}-').exists() or \
+                Course.objects.filter(code__startswith=self.code_prefix).exists():
+            raise CommandError(f'Data seeded with prefix "{prefix}" already exists; pass another --prefix')
+
+        self.options = options
+        self.prefix = prefix
+        self.rng = np.random.default_rng(options['seed'])
+        self.password = make_password(options['password'])
+        self.started = time.perf_counter()
+
+        cohorts = [(department, batch) for department in DEPARTMENTS for batch in BATCHES]
+        with transaction.atomic():
+            students_by_cohort = self._create_students(cohorts)
+            classes = self._create_classes(cohorts)
+            rosters = self._enroll(classes, students_by_cohort)
+
+        # Per-student attendance rate: most attend well, a tail of defaulters
+        rates = dict(zip(
+            (student.id for students in students_by_cohort.values() for student in students),
+            self.rng.beta(8, 2, options['students'])
+        ))
+        records = 0
+        for start in range(0, len(classes), CLASSES_PER_TRANSACTION):
+            with transaction.atomic():
+                for class_instance in classes[start:start + CLASSES_PER_TRANSACTION]:
+                    records += self._create_attendance(class_instance, rosters[class_instance.id], rates)
+            self._progress(f'attendance for {min(start + CLASSES_PER_TRANSACTION, len(classes))}/{len(classes)} classes')
+
+        for index, class_instance in enumerate(classes, 1):
+            rebuild_class_summaries(class_instance.id)
+            rebuild_class_bitmaps(class_instance.id)
+            rebuild_class_rollups(class_instance.id)
+            if index % 100 == 0 or index == len(classes):
+                self._progress(f'derived tables for {index}/{len(classes)} classes')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['students']} students, {len(classes)} classes, "
+            f"{sum(len(roster) for roster in rosters.values())} enrolments, "
+            f"{len(classes) * options['sessions']} sessions and {records} records "
+            f'in {time.perf_counter() - self.started:.0f}s. Users log in as {prefix}-student-<n> or '
+            f"{prefix}-teacher-<n> with the password '{options['password']}'."
+        ))
+
+    def _progress(self, message):
+        self.stdout.write(f'[{time.perf_counter() - self.started:6.1f}s] {message}')
+
+    def _create_students(self, cohorts):
+        count = self.options['students']
+        users = User.objects.bulk_create([
+            User(username=f'{self.prefix}-student-{index}', password=self.password, role='STUDENT')
+            for index in range(count)
+        ], batch_size=2000)
+
+        profiles = []
+        for index, user in enumerate(users):
+            department, batch = cohorts[index % len(cohorts)]
+            profiles.append(StudentProfile(
+                user=user, roll_number=f'{self.code_prefix}{index:08d}',
+                department=department, semester=BATCHES[batch], batch=batch
+            ))
+        profiles = StudentProfile.objects.bulk_create(profiles, batch_size=2000)
+
+        # dlib encodings are 128 floats with a norm of about 1
+        encodings = self.rng.normal(0, 0.09, (count * self.options['images'], 128))
+        StudentFaceImage.objects.bulk_create([
+            StudentFaceImage(
+                student=student, image=f'student_faces/{self.prefix}-{student.id}-{image}.jpg', is_primary=image == 0,
+                face_encoding=base64.b64encode(encodings[index * self.options['images'] + image].tobytes()).decode('utf-8')
+            )
+            for index, student in enumerate(profiles)
+            for image in range(self.options['images'])
+        ], batch_size=2000)
+        self._progress(f'{count} students with {count * self.options["images"]} face images')
+
+        students_by_cohort = {cohort: [] for cohort in cohorts}
+        for student in profiles:
+            students_by_cohort[(student.department, student.batch)].append(student)
+        return students_by_cohort
+
+    def _create_classes(self, cohorts):
+        sections = self.options['sections']
+        class_count = self.options['classes']
+        course_count = -(-class_count // sections)
+        teacher_count = -(-class_count // self.options['classes_per_teacher'])
+
+        teacher_users = User.objects.bulk_create([
+            User(username=f'{self.prefix}-teacher-{index}', password=self.password, role='TEACHER')
+            for index in range(teacher_count)
+        ], batch_size=2000)
+        teachers = TeacherProfile.objects.bulk_create([
+            TeacherProfile(
+                user=user, employee_id=f'{self.code_prefix}-T{index:06d}',
+                department=DEPARTMENTS[index % len(DEPARTMENTS)], designation='Lecturer'
+            )
+            for index, user in enumerate(teacher_users)
+        ], batch_size=2000)
+
+        # All sections of a course belong to the same cohort
+        course_cohorts = [cohorts[index % len(cohorts)] for index in range(course_count)]
+        courses = Course.objects.bulk_create([
+            Course(
+                code=f'{self.code_prefix}{index:05d}', name=f'{department} course {index}',
+                department=department, semester=BATCHES[batch]
+            )
+            for index, (department, batch) in enumerate(course_cohorts)
+        ], batch_size=2000)
+
+        classes = Class.objects.bulk_create([
+            Class(
+                teacher=teachers[index // self.options['classes_per_teacher']],
+                course=courses[index // sections],
+                section=SECTIONS[index % sections],
+                batch=course_cohorts[index // sections][1],
+                semester=BATCHES[course_cohorts[index // sections][1]],
+                academic_year=ACADEMIC_YEAR
+            )
+            for index in range(class_count)
+        ], batch_size=2000)
+        self._progress(f'{teacher_count} teachers, {course_count} courses, {class_count} classes')
+        return classes
+
+    def _enroll(self, classes, students_by_cohort):
+        rosters = {}
+        enrollments = []
+        for class_instance in classes:
+            cohort = students_by_cohort[(class_instance.course.department, class_instance.batch)]
+            size = min(self.options['class_size'], len(cohort))
+            roster = [cohort[index] for index in sorted(self.rng.choice(len(cohort), size, replace=False))]
+            rosters[class_instance.id] = roster
+            enrollments += [ClassEnrollment(student=student, class_instance=class_instance) for student in roster]
+        ClassEnrollment.objects.bulk_create(enrollments, batch_size=5000)
+        self._progress(f'{len(enrollments)} enrolments')
+        return rosters
+
+    def _create_attendance(self, class_instance, roster, rates):
+        sessions = AttendanceSession.objects.bulk_create([
+            AttendanceSession(class_instance=class_instance, date=day, is_active=False)
+            for day in weekdays(date(2024, 7, 1), self.options['sessions'])
+        ])
+        if not roster:
+            return 0
+
+        present = self.rng.random((len(sessions), len(roster))) < np.array([rates[student.id] for student in roster])
+        confidence = self.rng.uniform(0.55, 0.95, present.shape)
+        records = []
+        for row, session in enumerate(sessions):
+            for column, student in enumerate(roster):
+                attended = bool(present[row, column])
+                records.append(AttendanceRecord(
+                    session=session, student=student, status='PRESENT' if attended else 'ABSENT',
+                    confidence_score=float(confidence[row, column]) if attended else None
+                ))
+        AttendanceRecord.objects.bulk_create(records, batch_size=5000)
+        return len(records)
+
+
+def weekdays(start, count):
+    day = start
+    days = []
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
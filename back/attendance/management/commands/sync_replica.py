@@ -0,0 +1,49 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, DEFAULT_DB_ALIAS
+
+from back.replica import REPLICA
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the SQLite primary into the replica file (DB_REPLICA_NAME) and stamp the copy time, '
+        'so that replica routing and its lag guard can be tried locally. With --interval, keep copying.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', help='Replica file to write (defaults to the replica alias)')
+        parser.add_argument('--interval', type=float, help='Copy again every this many seconds until interrupted')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('sync_replica only copies SQLite databases; use database replication for postgres')
+
+        target = options.get('target') or settings.DATABASES.get(REPLICA, {}).get('NAME')
+        if not target:
+            raise CommandError('No replica configured; set DB_REPLICA_NAME or pass --target')
+
+        while True:
+            synced_at = self.sync(primary, target)
+            self.stdout.write(self.style.SUCCESS(f'Copied primary to {target} at {time.ctime(synced_at)}'))
+            if not options.get('interval'):
+                break
+            time.sleep(options['interval'])
+
+    def sync(self, primary, target):
+        """Back up the primary into target; the copy records when its snapshot was taken"""
+        primary.ensure_connection()
+        synced_at = int(time.time())
+
+        replica = sqlite3.connect(target, timeout=20)
+        try:
+            primary.connection.backup(replica)
+            replica.execute(f'PRAGMA user_version = {synced_at}')
+            replica.commit()
+        finally:
+            replica.close()
+        return synced_at
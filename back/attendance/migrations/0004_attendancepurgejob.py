@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_attendancesummary'),
+        ('teachers', '0002_course_class_classenrollment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendancePurgeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('total_sessions', models.PositiveIntegerField(default=0)),
+                ('total_records', models.PositiveIntegerField(default=0)),
+                ('sessions_deleted', models.PositiveIntegerField(default=0)),
+                ('records_deleted', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('class_instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_purge_jobs', to='teachers.class')),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_attendance_archive'),
+        ('teachers', '0002_course_class_classenrollment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassAttendanceBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('roster', models.BinaryField(default=b'')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('class_instance', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_bitmap', to='teachers.class')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SessionAttendanceBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_id', models.BigIntegerField(unique=True)),
+                ('date', models.DateField()),
+                ('present', models.BinaryField(default=b'')),
+                ('recorded', models.BinaryField(default=b'')),
+                ('class_instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_attendance_bitmaps', to='teachers.class')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['class_instance', 'date'], name='attendance__class_i_bc1e6e_idx')],
+            },
+        ),
+    ]
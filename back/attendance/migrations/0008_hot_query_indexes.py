@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0007_attendance_rollups'),
+        ('students', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        # Add the composite index before dropping the single-column one it replaces
+        migrations.AddIndex(
+            model_name='attendancerecord',
+            index=models.Index(fields=['student', 'session'], name='attendance_student_session_idx'),
+        ),
+        migrations.AlterField(
+            model_name='attendancerecord',
+            name='student',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_records', to='students.studentprofile'),
+        ),
+    ]
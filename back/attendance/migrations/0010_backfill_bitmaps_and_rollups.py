@@ -0,0 +1,129 @@
+from datetime import timedelta
+
+import numpy as np
+from django.db import migrations
+from django.db.models import Count, Q
+
+
+def pack_bits(bits):
+    return np.packbits(np.asarray(bits, dtype=bool), bitorder='little').tobytes()
+
+
+def class_records(apps, class_id):
+    """{session id: (date, [(student id, status)])} of a class, archived sessions included"""
+    sessions = {}
+    for session_name, record_name in (
+        ('AttendanceSession', 'AttendanceRecord'),
+        ('ArchivedAttendanceSession', 'ArchivedAttendanceRecord'),
+    ):
+        session_model = apps.get_model('attendance', session_name)
+        record_model = apps.get_model('attendance', record_name)
+        for session_id, session_date in session_model.objects.filter(
+            class_instance_id=class_id
+        ).values_list('id', 'date'):
+            sessions[session_id] = (session_date, [])
+        for session_id, student_id, status in record_model.objects.filter(
+            session__class_instance_id=class_id
+        ).values_list('session_id', 'student_id', 'status').iterator(chunk_size=5000):
+            sessions[session_id][1].append((student_id, status))
+    return sessions
+
+
+def populate_bitmaps(apps, class_id, sessions):
+    ClassAttendanceBitmap = apps.get_model('attendance', 'ClassAttendanceBitmap')
+    SessionAttendanceBitmap = apps.get_model('attendance', 'SessionAttendanceBitmap')
+
+    student_ids = sorted({student_id for _, records in sessions.values() for student_id, _ in records})
+    positions = {student_id: index for index, student_id in enumerate(student_ids)}
+
+    ClassAttendanceBitmap.objects.update_or_create(
+        class_instance_id=class_id,
+        defaults={'roster': np.array(student_ids, dtype=np.int64).tobytes()}
+    )
+
+    bitmaps = []
+    for session_id, (session_date, records) in sessions.items():
+        present = np.zeros(len(positions), dtype=bool)
+        recorded = np.zeros(len(positions), dtype=bool)
+        for student_id, status in records:
+            recorded[positions[student_id]] = True
+            present[positions[student_id]] = status == 'PRESENT'
+        bitmaps.append(SessionAttendanceBitmap(
+            session_id=session_id,
+            class_instance_id=class_id,
+            date=session_date,
+            present=pack_bits(present),
+            recorded=pack_bits(recorded)
+        ))
+    SessionAttendanceBitmap.objects.filter(class_instance_id=class_id).delete()
+    SessionAttendanceBitmap.objects.bulk_create(bitmaps, batch_size=500)
+
+
+def populate_rollups(apps, class_id):
+    AttendanceDailyRollup = apps.get_model('attendance', 'AttendanceDailyRollup')
+    AttendanceWeeklyRollup = apps.get_model('attendance', 'AttendanceWeeklyRollup')
+
+    days = {}
+    weeks = {}
+    for record_name in ('AttendanceRecord', 'ArchivedAttendanceRecord'):
+        rows = apps.get_model('attendance', record_name).objects.filter(
+            session__class_instance_id=class_id
+        ).values('session__date', 'student_id').annotate(
+            present=Count('id', filter=Q(status='PRESENT')),
+            total=Count('id')
+        ).order_by()
+        for row in rows:
+            session_date = row['session__date']
+            week_start = session_date - timedelta(days=session_date.weekday())
+            for counts in (
+                days.setdefault(session_date, {'present': 0, 'total': 0}),
+                weeks.setdefault((week_start, row['student_id']), {'present': 0, 'total': 0}),
+            ):
+                counts['present'] += row['present']
+                counts['total'] += row['total']
+
+    AttendanceDailyRollup.objects.filter(class_instance_id=class_id).delete()
+    AttendanceWeeklyRollup.objects.filter(class_instance_id=class_id).delete()
+    AttendanceDailyRollup.objects.bulk_create([
+        AttendanceDailyRollup(
+            class_instance_id=class_id,
+            date=session_date,
+            present_count=counts['present'],
+            total_count=counts['total']
+        )
+        for session_date, counts in days.items()
+    ], batch_size=500)
+    AttendanceWeeklyRollup.objects.bulk_create([
+        AttendanceWeeklyRollup(
+            class_instance_id=class_id,
+            student_id=student_id,
+            week_start=week_start,
+            present_count=counts['present'],
+            total_count=counts['total']
+        )
+        for (week_start, student_id), counts in weeks.items()
+    ], batch_size=500)
+
+
+def populate_bitmaps_and_rollups(apps, schema_editor):
+    """0006 and 0007 created the bitmap and rollup tables empty"""
+    class_ids = set()
+    for session_name in ('AttendanceSession', 'ArchivedAttendanceSession'):
+        class_ids.update(
+            apps.get_model('attendance', session_name).objects.values_list('class_instance_id', flat=True).distinct()
+        )
+
+    for class_id in sorted(class_ids):
+        populate_bitmaps(apps, class_id, class_records(apps, class_id))
+        populate_rollups(apps, class_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0009_attendancesession_change_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_bitmaps_and_rollups, migrations.RunPython.noop),
+    ]
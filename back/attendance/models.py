@@ -1,12 +1,38 @@
-from django.db import models
-from teachers.models import Class
+from django.db import models, transaction
+from django.db.models import Count, F, FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+from django.utils import timezone
+from teachers.models import Class, ClassEnrollment
 from students.models import StudentProfile
 
+class AttendanceSessionQuerySet(models.QuerySet):
+    
+    def with_totals(self):
+        """Annotate enrolled/present/absent counts so serializing a list costs one query"""
+        enrolled = ClassEnrollment.objects.filter(
+            class_instance=OuterRef('class_instance'), 
+            is_active=True
+        ).order_by().values('class_instance').annotate(count=Count('id')).values('count')
+        return self.select_related('class_instance__course').annotate(
+            enrolled_count=Coalesce(Subquery(enrolled), 0),
+            present_count=Count('attendance_records', filter=Q(attendance_records__status='PRESENT')),
+            absent_count=Count('attendance_records', filter=Q(attendance_records__status='ABSENT')),
+        )
+    
+    def touch(self):
+        """Record a change to these sessions' payload (records, totals) for conditional GETs"""
+        return self.update(version=F('version') + 1, changed_at=timezone.now())
+
 class AttendanceSession(models.Model):
     class_instance = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='attendance_sessions')
     date = models.DateField()
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Change validators for ETag/Last-Modified, moved on by touch() and save()
+    version = models.PositiveIntegerField(default=1)
+    changed_at = models.DateTimeField(auto_now=True)
+    
+    objects = AttendanceSessionQuerySet.as_manager()
     
     class Meta:
         unique_together = ['class_instance', 'date']
@@ -14,18 +40,61 @@ class AttendanceSession(models.Model):
     def __str__(self):
         return f"{self.class_instance} - {self.date}"
     
+    # The totals use the with_totals() annotations when present
     @property
     def total_enrolled(self):
+        if hasattr(self, 'enrolled_count'):
+            return self.enrolled_count
         return self.class_instance.enrollments.filter(is_active=True).count()
     
     @property
     def total_present(self):
+        if hasattr(self, 'present_count'):
+            return self.present_count
         return self.attendance_records.filter(status='PRESENT').count()
     
     @property
     def total_absent(self):
+        if hasattr(self, 'absent_count'):
+            return self.absent_count
         return self.attendance_records.filter(status='ABSENT').count()
 
+class AttendanceRecordQuerySet(models.QuerySet):
+    """Report helpers that aggregate attendance in SQL, one query per report"""
+    
+    def report(self, *fields, **expressions):
+        """Group by the given fields and annotate attendance counters and percentage"""
+        return self.values(*fields, **expressions).annotate(
+            total_sessions=Count('id'),
+            present_count=Count('id', filter=Q(status='PRESENT')),
+        ).annotate(
+            absent_count=F('total_sessions') - F('present_count'),
+            attendance_percentage=Coalesce(
+                Round(
+                    Cast('present_count', FloatField()) * 100.0 / NullIf('total_sessions', 0),
+                    2
+                ),
+                Value(0.0)
+            ),
+        ).order_by()
+    
+    def by_class(self):
+        """Attendance counters per class, e.g. for one student's dashboard"""
+        return self.report(
+            class_id=F('session__class_instance_id'),
+            class_name=F('session__class_instance__course__name'),
+            course_code=F('session__class_instance__course__code'),
+            section=F('session__class_instance__section'),
+        ).order_by('course_code', 'section')
+    
+    def by_student(self):
+        """Attendance counters per student, e.g. for one class's register"""
+        return self.report(
+            'student_id',
+            student_name=F('student__user__username'),
+            student_roll=F('student__roll_number'),
+        ).order_by('student_roll')
+
 class AttendanceRecord(models.Model):
     STATUS_CHOICES = [
         ('PRESENT', 'Present'),
@@ -33,16 +102,178 @@ class AttendanceRecord(models.Model):
     ]
     
     session = models.ForeignKey(AttendanceSession, on_delete=models.CASCADE, related_name='attendance_records')
-    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='attendance_records')
+    # Indexed through attendance_student_session_idx
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='attendance_records', db_index=False)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='ABSENT')
     marked_at = models.DateTimeField(auto_now_add=True)
     confidence_score = models.FloatField(null=True, blank=True)  # Face recognition confidence
     
+    objects = AttendanceRecordQuerySet.as_manager()
+    
     class Meta:
         unique_together = ['session', 'student']
+        indexes = [
+            # A student's history across sessions (dashboards, per-class attendance)
+            models.Index(fields=['student', 'session'], name='attendance_student_session_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.user.username} - {self.session.date} - {self.status}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        record = super().from_db(db, field_names, values)
+        # Status as stored, so the summary can move by the change alone
+        if 'status' in record.__dict__:
+            record._stored_status = record.status
+        return record
+    
+    def save(self, *args, **kwargs):
+        # The post_save summary and bitmap updates run inside this transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._stored_status = self.status
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+class AttendanceSummary(models.Model):
+    """Per-student per-class attendance counters, kept in sync with AttendanceRecord"""
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='attendance_summaries')
+    class_instance = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='attendance_summaries')
+    total_sessions = models.PositiveIntegerField(default=0)
+    present_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    attendance_percentage = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['student', 'class_instance']
+    
     def __str__(self):
-        return f"{self.student.user.username} - {self.session.date} - {self.status}"
+        return f"{self.student.user.username} - {self.class_instance} - {self.attendance_percentage}%"
+
+class AttendancePurgeJob(models.Model):
+    """Progress of a batched deletion of a class's attendance history"""
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    class_instance = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='attendance_purge_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    total_sessions = models.PositiveIntegerField(default=0)
+    total_records = models.PositiveIntegerField(default=0)
+    sessions_deleted = models.PositiveIntegerField(default=0)
+    records_deleted = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Purge {self.class_instance} - {self.status}"
+    
+    @property
+    def progress_percentage(self):
+        total = self.total_sessions + self.total_records
+        if total == 0:
+            return 100.0 if self.status == 'COMPLETED' else 0.0
+        return round(((self.sessions_deleted + self.records_deleted) / total) * 100, 2)
+
+class AttendanceArchive(models.Model):
+    """An academic year whose sessions and records were moved to the archive tables"""
+    academic_year = models.CharField(max_length=10, unique=True)
+    sessions_archived = models.PositiveIntegerField(default=0)
+    records_archived = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Archive {self.academic_year}"
+
+class ArchivedAttendanceSession(models.Model):
+    """Cold copy of an AttendanceSession from a closed academic year, keeping its original id"""
+    id = models.BigIntegerField(primary_key=True)
+    class_instance = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='archived_attendance_sessions')
+    date = models.DateField()
+    is_active = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ['class_instance', 'date']
+    
+    def __str__(self):
+        return f"{self.class_instance} - {self.date} (archived)"
+
+class ArchivedAttendanceRecord(models.Model):
+    """Cold copy of an AttendanceRecord from a closed academic year, keeping its original id"""
+    id = models.BigIntegerField(primary_key=True)
+    session = models.ForeignKey(ArchivedAttendanceSession, on_delete=models.CASCADE, related_name='attendance_records')
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='archived_attendance_records')
+    status = models.CharField(max_length=10, choices=AttendanceRecord.STATUS_CHOICES, default='ABSENT')
+    marked_at = models.DateTimeField()
+    confidence_score = models.FloatField(null=True, blank=True)
+    
+    objects = AttendanceRecordQuerySet.as_manager()
+    
+    class Meta:
+        unique_together = ['session', 'student']
+    
+    def __str__(self):
+        return f"{self.student.user.username} - {self.session.date} - {self.status} (archived)"
+
+class ClassAttendanceBitmap(models.Model):
+    """Roster of a class for the attendance bitmaps: student id per bit position"""
+    class_instance = models.OneToOneField(Class, on_delete=models.CASCADE, related_name='attendance_bitmap')
+    roster = models.BinaryField(default=b'')  # int64 student ids, append-only
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Bitmap roster {self.class_instance}"
+
+class SessionAttendanceBitmap(models.Model):
+    """
+    Compact copy of one session's attendance: bit i of `present` and
+    `recorded` belongs to roster position i of the class. session_id is not a
+    foreign key so the bitmap outlives archiving of the session.
+    """
+    session_id = models.BigIntegerField(unique=True)
+    class_instance = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='session_attendance_bitmaps')
+    date = models.DateField()
+    present = models.BinaryField(default=b'')
+    recorded = models.BinaryField(default=b'')
+    
+    class Meta:
+        indexes = [models.Index(fields=['class_instance', 'date'])]
+    
+    def __str__(self):
+        return f"Bitmap {self.class_instance} - {self.date}"
+
+class AttendanceDailyRollup(models.Model):
+    """Present and recorded counts of a class on one date, refreshed when its session ends"""
+    class_instance = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='attendance_daily_rollups')
+    date = models.DateField()
+    present_count = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['class_instance', 'date']
+    
+    def __str__(self):
+        return f"{self.class_instance} - {self.date}: {self.present_count}/{self.total_count}"
+
+class AttendanceWeeklyRollup(models.Model):
+    """Present and recorded counts of one student in a class for the week starting on week_start (Monday)"""
+    class_instance = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='attendance_weekly_rollups')
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='attendance_weekly_rollups')
+    week_start = models.DateField()
+    present_count = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['class_instance', 'week_start', 'student']
+    
+    def __str__(self):
+        return f"{self.student.user.username} - {self.class_instance} - week of {self.week_start}"
@@ -0,0 +1,55 @@
+"""
+Queries and response bodies of the live-session endpoints, shared by the
+APIViews in views.py and their async variants in async_views.py (which run
+them through sync_to_async).
+"""
+
+from datetime import date
+
+from django.shortcuts import get_object_or_404
+
+from teachers.models import Class
+from .models import AttendanceSession, AttendanceRecord
+from .serializers import AttendanceSessionSerializer, AttendanceRecordSerializer
+
+
+def todays_session(teacher, class_id):
+    """Today's session of one of the teacher's classes, with its totals; None if not started"""
+    class_instance = get_object_or_404(Class, id=class_id, teacher=teacher)
+    return AttendanceSession.objects.with_totals().filter(
+        class_instance=class_instance,
+        date=date.today()
+    ).first()
+
+
+def session_data(session):
+    return {'session': AttendanceSessionSerializer(session).data}
+
+
+def session_records(teacher, session_id):
+    """The session and the body listing its records, ordered by roll number"""
+    session = get_object_or_404(
+        AttendanceSession.objects.with_totals(),
+        id=session_id,
+        class_instance__teacher=teacher
+    )
+    records = AttendanceRecord.objects.filter(
+        session=session
+    ).select_related('student__user').order_by('student__roll_number')
+
+    return session, {
+        'session': AttendanceSessionSerializer(session).data,
+        'records': AttendanceRecordSerializer(records, many=True).data
+    }
+
+
+def recognition_data(face_count, recognized_students):
+    if not face_count:
+        return {
+            'message': 'No faces detected in the image',
+            'recognized_students': []
+        }
+    return {
+        'message': f'Processed {face_count} faces, recognized {len(recognized_students)} students',
+        'recognized_students': recognized_students
+    }
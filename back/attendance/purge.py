@@ -0,0 +1,136 @@
+import threading
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import (
+    AttendanceSession, AttendanceRecord, AttendanceSummary, AttendancePurgeJob,
+    ArchivedAttendanceSession, ArchivedAttendanceRecord,
+    ClassAttendanceBitmap, SessionAttendanceBitmap
+)
+from .rollups import delete_class_rollups
+from .signals import class_history_changed
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def _delete_batch(table, where_sql, params, batch_size):
+    """Delete up to batch_size rows matching where_sql with one set-based statement"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE id IN ('
+            f'SELECT id FROM {table} WHERE {where_sql} LIMIT %s)',
+            [*params, batch_size]
+        )
+        return cursor.rowcount
+
+
+def purge_class_attendance(class_id, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Delete every attendance session and record of a class in bounded batches,
+    including any history already moved to the archive tables.
+
+    Rows are removed with raw DELETE statements instead of QuerySet.delete(),
+    so nothing is loaded into memory and each batch holds the write lock only
+    briefly. Summary rows for the class are cleared before and after the
+    purge; its attendance bitmaps and rollups are cleared at the end.
+
+    progress, if given, is called as progress(sessions_deleted,
+    records_deleted) after every batch.
+    """
+    AttendanceSummary.objects.filter(class_instance_id=class_id).delete()
+
+    sessions_deleted = 0
+    records_deleted = 0
+
+    # Live tables first, then any archived history of the class
+    for session_model, record_model in (
+        (AttendanceSession, AttendanceRecord),
+        (ArchivedAttendanceSession, ArchivedAttendanceRecord),
+    ):
+        record_table = connection.ops.quote_name(record_model._meta.db_table)
+        session_table = connection.ops.quote_name(session_model._meta.db_table)
+        class_sessions = f'SELECT id FROM {session_table} WHERE class_instance_id = %s'
+
+        while True:
+            deleted = _delete_batch(record_table, f'session_id IN ({class_sessions})', [class_id], batch_size)
+            if not deleted:
+                break
+            records_deleted += deleted
+            if progress:
+                progress(sessions_deleted, records_deleted)
+
+        while True:
+            deleted = _delete_batch(session_table, 'class_instance_id = %s', [class_id], batch_size)
+            if not deleted:
+                break
+            sessions_deleted += deleted
+            if progress:
+                progress(sessions_deleted, records_deleted)
+
+    # Records marked while the purge was running would leave stale rows behind
+    AttendanceSummary.objects.filter(class_instance_id=class_id).delete()
+    SessionAttendanceBitmap.objects.filter(class_instance_id=class_id).delete()
+    ClassAttendanceBitmap.objects.filter(class_instance_id=class_id).delete()
+    delete_class_rollups(class_id)
+    class_history_changed.send(sender=AttendanceSession, class_ids=[class_id])
+
+    return sessions_deleted, records_deleted
+
+
+def run_purge_job(job_id, batch_size=DEFAULT_BATCH_SIZE):
+    """Run a queued purge job and record its progress on the job row"""
+    job = AttendancePurgeJob.objects.get(id=job_id)
+    job.status = 'RUNNING'
+    job.save(update_fields=['status'])
+
+    def report(sessions_deleted, records_deleted):
+        AttendancePurgeJob.objects.filter(id=job_id).update(
+            sessions_deleted=sessions_deleted,
+            records_deleted=records_deleted
+        )
+
+    try:
+        sessions_deleted, records_deleted = purge_class_attendance(
+            job.class_instance_id, batch_size=batch_size, progress=report
+        )
+    except Exception as e:
+        AttendancePurgeJob.objects.filter(id=job_id).update(
+            status='FAILED',
+            error=str(e),
+            finished_at=timezone.now()
+        )
+        raise
+
+    AttendancePurgeJob.objects.filter(id=job_id).update(
+        status='COMPLETED',
+        sessions_deleted=sessions_deleted,
+        records_deleted=records_deleted,
+        finished_at=timezone.now()
+    )
+
+
+def start_purge_job(class_instance, batch_size=DEFAULT_BATCH_SIZE):
+    """Queue a purge for a class and run it on a background thread"""
+    job = AttendancePurgeJob.objects.create(
+        class_instance=class_instance,
+        total_sessions=(
+            AttendanceSession.objects.filter(class_instance=class_instance).count()
+            + ArchivedAttendanceSession.objects.filter(class_instance=class_instance).count()
+        ),
+        total_records=(
+            AttendanceRecord.objects.filter(session__class_instance=class_instance).count()
+            + ArchivedAttendanceRecord.objects.filter(session__class_instance=class_instance).count()
+        )
+    )
+
+    def worker():
+        try:
+            run_purge_job(job.id, batch_size=batch_size)
+        except Exception:
+            pass  # The failure is recorded on the job row
+        finally:
+            connection.close()
+
+    transaction.on_commit(lambda: threading.Thread(target=worker, daemon=True).start())
+    return job
@@ -0,0 +1,110 @@
+"""
+Face matching for attendance sessions, split so that the CPU-bound part
+(decode, detect, encode, compare) can run off the request thread while the
+database reads and writes around it stay in the view.
+"""
+
+import base64
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+from django.db import transaction
+from django.utils import timezone
+
+from back import face_engine
+
+from .bitmaps import refresh_session_bitmap
+from .models import AttendanceSession, AttendanceRecord
+from .signals import class_history_changed
+from .summary import apply_status_changes
+
+# Largest face distance still accepted as a match
+MATCH_THRESHOLD = 0.5
+
+_executor = None
+
+
+def recognition_workers():
+    return int(os.environ.get('RECOGNITION_WORKERS', os.cpu_count() or 1))
+
+
+def recognition_executor():
+    """Shared pool for recognition work from async views, RECOGNITION_WORKERS threads (default: CPU count)"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=recognition_workers(), thread_name_prefix='recognition')
+    return _executor
+
+
+def recognize(image_data, gallery):
+    """
+    Detect the faces in a base64 image and match each one against a class
+    gallery (see gallery.class_gallery). Returns (faces detected, matches),
+    where every match is (student_id, distance) of the closest stored
+    encoding within MATCH_THRESHOLD. No database access.
+    """
+    image = Image.open(io.BytesIO(base64.b64decode(image_data)))
+    image_array = np.array(image)
+
+    face_locations = face_engine.face_locations(image_array)
+    face_encodings = face_engine.face_encodings(image_array, face_locations)
+    if not face_encodings or not len(gallery.student_ids):
+        return len(face_encodings), []
+
+    matches = []
+    for face_encoding in face_encodings:
+        distances = face_engine.face_distance(gallery.encodings, face_encoding)
+        best = int(np.argmin(distances))
+        if distances[best] < MATCH_THRESHOLD:
+            matches.append((int(gallery.student_ids[best]), float(distances[best])))
+    return len(face_encodings), matches
+
+
+def mark_present(session, matches):
+    """
+    Mark matched students present in session with one bulk_update; the
+    summaries move by the known ABSENT to PRESENT deltas and the session
+    bitmap is refreshed once per frame rather than once per face. Returns
+    the recognized_students payload.
+    """
+    records = {
+        record.student_id: record
+        for record in AttendanceRecord.objects.select_related('student__user').filter(
+            session=session, student_id__in={student_id for student_id, _ in matches}
+        )
+    }
+
+    now = timezone.now()
+    marked = []
+    changes = []
+    recognized_students = []
+    for student_id, distance in matches:
+        attendance_record = records.pop(student_id, None)
+        # Students enrolled after the session started have no record in it;
+        # a student matched by two faces is marked once
+        if attendance_record is None:
+            continue
+        marked.append(attendance_record)
+        changes.append((student_id, attendance_record.status, 'PRESENT'))
+        attendance_record.status = 'PRESENT'
+        attendance_record.confidence_score = 1 - distance
+        attendance_record.marked_at = now
+
+        recognized_students.append({
+            'student_id': student_id,
+            'student_name': attendance_record.student.user.username,
+            'roll_number': attendance_record.student.roll_number,
+            'confidence': 1 - distance
+        })
+
+    if marked:
+        with transaction.atomic():
+            AttendanceRecord.objects.bulk_update(marked, ['status', 'confidence_score', 'marked_at'])
+            apply_status_changes(session.class_instance_id, changes)
+            refresh_session_bitmap(session.id)
+            AttendanceSession.objects.filter(id=session.id).touch()
+        class_history_changed.send(sender=AttendanceRecord, class_ids=[session.class_instance_id])
+    return recognized_students
@@ -0,0 +1,155 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import (
+    AttendanceRecord, ArchivedAttendanceRecord,
+    AttendanceDailyRollup, AttendanceWeeklyRollup
+)
+
+RECORD_MODELS = (AttendanceRecord, ArchivedAttendanceRecord)
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _counts(records, *fields):
+    return records.values(*fields).annotate(
+        present=Count('id', filter=Q(status='PRESENT')),
+        total=Count('id')
+    ).order_by()
+
+
+def refresh_rollups(class_id, session_date):
+    """Recompute the daily rollup of session_date and the weekly rollups of its week"""
+    start = week_start(session_date)
+    end = start + timedelta(days=6)
+
+    with transaction.atomic():
+        day = {'present': 0, 'total': 0}
+        weeks = {}
+        for model in RECORD_MODELS:
+            records = model.objects.filter(
+                session__class_instance_id=class_id,
+                session__date__range=(start, end)
+            )
+            for row in _counts(records.filter(session__date=session_date)):
+                day['present'] += row['present']
+                day['total'] += row['total']
+            for row in _counts(records, 'student_id'):
+                week = weeks.setdefault(row['student_id'], {'present': 0, 'total': 0})
+                week['present'] += row['present']
+                week['total'] += row['total']
+
+        if day['total']:
+            AttendanceDailyRollup.objects.update_or_create(
+                class_instance_id=class_id,
+                date=session_date,
+                defaults={'present_count': day['present'], 'total_count': day['total']}
+            )
+        else:
+            AttendanceDailyRollup.objects.filter(class_instance_id=class_id, date=session_date).delete()
+
+        AttendanceWeeklyRollup.objects.filter(class_instance_id=class_id, week_start=start).delete()
+        AttendanceWeeklyRollup.objects.bulk_create([
+            AttendanceWeeklyRollup(
+                class_instance_id=class_id,
+                student_id=student_id,
+                week_start=start,
+                present_count=counts['present'],
+                total_count=counts['total']
+            )
+            for student_id, counts in weeks.items()
+        ])
+
+
+def delete_class_rollups(class_id):
+    AttendanceDailyRollup.objects.filter(class_instance_id=class_id).delete()
+    AttendanceWeeklyRollup.objects.filter(class_instance_id=class_id).delete()
+
+
+def rebuild_class_rollups(class_id):
+    """Rebuild every daily and weekly rollup of a class from live and archived records"""
+    days = {}
+    weeks = {}
+    for model in RECORD_MODELS:
+        records = model.objects.filter(session__class_instance_id=class_id)
+        for row in _counts(records, 'session__date', 'student_id'):
+            day = days.setdefault(row['session__date'], {'present': 0, 'total': 0})
+            day['present'] += row['present']
+            day['total'] += row['total']
+            week = weeks.setdefault((week_start(row['session__date']), row['student_id']), {'present': 0, 'total': 0})
+            week['present'] += row['present']
+            week['total'] += row['total']
+
+    with transaction.atomic():
+        delete_class_rollups(class_id)
+        AttendanceDailyRollup.objects.bulk_create([
+            AttendanceDailyRollup(
+                class_instance_id=class_id,
+                date=session_date,
+                present_count=counts['present'],
+                total_count=counts['total']
+            )
+            for session_date, counts in days.items()
+        ], batch_size=500)
+        AttendanceWeeklyRollup.objects.bulk_create([
+            AttendanceWeeklyRollup(
+                class_instance_id=class_id,
+                student_id=student_id,
+                week_start=start,
+                present_count=counts['present'],
+                total_count=counts['total']
+            )
+            for (start, student_id), counts in weeks.items()
+        ], batch_size=500)
+    return len(days)
+
+
+def _ratio(present, total):
+    return round(present / total, 4) if total else None
+
+
+def class_timeline(class_id, weeks=None):
+    """
+    Per-date present ratio and a per-student week-by-week grid for a class,
+    read from the rollup tables. weeks limits the grid to the most recent weeks.
+    """
+    daily = [
+        {
+            'date': row.date,
+            'present_count': row.present_count,
+            'total_count': row.total_count,
+            'present_ratio': _ratio(row.present_count, row.total_count),
+        }
+        for row in AttendanceDailyRollup.objects.filter(class_instance_id=class_id).order_by('date')
+    ]
+
+    weekly = AttendanceWeeklyRollup.objects.filter(class_instance_id=class_id)
+    if weeks and daily:
+        weekly = weekly.filter(week_start__gt=week_start(daily[-1]['date']) - timedelta(weeks=weeks))
+    weekly = list(weekly.values(
+        'week_start', 'student_id', 'student__roll_number', 'student__user__username',
+        'present_count', 'total_count'
+    ).order_by('student__roll_number', 'week_start'))
+
+    week_starts = sorted({row['week_start'] for row in weekly})
+    columns = {start: index for index, start in enumerate(week_starts)}
+
+    students = {}
+    for row in weekly:
+        student = students.setdefault(row['student_id'], {
+            'student_id': row['student_id'],
+            'student_roll': row['student__roll_number'],
+            'student_name': row['student__user__username'],
+            'weeks': [None] * len(week_starts),
+        })
+        student['weeks'][columns[row['week_start']]] = _ratio(row['present_count'], row['total_count'])
+
+    return {
+        'daily': daily,
+        'weeks': week_starts,
+        'students': list(students.values()),
+    }
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import AttendanceSession, AttendanceRecord
+from .models import AttendanceSession, AttendanceRecord, AttendancePurgeJob
 from teachers.models import Class
 
 class AttendanceSessionSerializer(serializers.ModelSerializer):
@@ -41,4 +41,28 @@ class FaceRecognitionDataSerializer(serializers.Serializer):
         except Exception:
             raise serializers.ValidationError("Invalid image data format")
         return value
+
+class AttendanceOverrideSerializer(serializers.Serializer):
+    student_id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=AttendanceRecord.STATUS_CHOICES)
+
+class BulkAttendanceOverrideSerializer(serializers.Serializer):
+    changes = AttendanceOverrideSerializer(many=True, allow_empty=False)
+    
+    def validate_changes(self, value):
+        student_ids = [change['student_id'] for change in value]
+        if len(student_ids) != len(set(student_ids)):
+            raise serializers.ValidationError("Each student can only appear once per request")
         return value
+
+class AttendancePurgeJobSerializer(serializers.ModelSerializer):
+    progress_percentage = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = AttendancePurgeJob
+        fields = [
+            'id', 'class_instance', 'status', 'total_sessions', 'total_records',
+            'sessions_deleted', 'records_deleted', 'progress_percentage',
+            'error', 'created_at', 'finished_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,74 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver, Signal
+
+from students.models import StudentFaceImage
+from teachers.models import Class, ClassEnrollment
+from .bitmaps import set_session_bit
+from .gallery import invalidate_galleries, delete_snapshots
+from .models import AttendanceSession, AttendanceRecord, SessionAttendanceBitmap
+from .summary import UNKNOWN, apply_record_change, summary_updates_suspended, mark_session_touched
+
+# Sent with class_ids after bulk paths (purge, archive, overrides) that bypass model signals
+class_history_changed = Signal()
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def update_attendance_summary(sender, instance, created=False, **kwargs):
+    """
+    Keep the (student, class) summary row and the session bitmap in step with
+    every record change. AttendanceRecord.save() and delete() run these
+    receivers inside their own transaction.
+    """
+    if summary_updates_suspended():
+        mark_session_touched(instance.session_id)
+        return
+    
+    old_status = None if created else getattr(instance, '_stored_status', UNKNOWN)
+    record_changed(instance, old_status, instance.status)
+
+
+@receiver(post_delete, sender=AttendanceRecord)
+def remove_from_attendance_summary(sender, instance, **kwargs):
+    if summary_updates_suspended():
+        mark_session_touched(instance.session_id)
+        return
+    
+    record_changed(instance, getattr(instance, '_stored_status', UNKNOWN), None)
+
+
+def record_changed(instance, old_status, new_status):
+    """Runs inside the transaction of the record's save() or delete()"""
+    apply_record_change(instance.student_id, instance.session_id, old_status, new_status)
+    if old_status != new_status:
+        set_session_bit(instance.session_id, instance.student_id, new_status)
+    AttendanceSession.objects.filter(id=instance.session_id).touch()
+
+
+@receiver(post_delete, sender=AttendanceSession)
+def delete_session_bitmap(sender, instance, **kwargs):
+    SessionAttendanceBitmap.objects.filter(session_id=instance.id).delete()
+
+
+@receiver(post_save, sender=ClassEnrollment)
+@receiver(post_delete, sender=ClassEnrollment)
+def touch_active_sessions(sender, instance, **kwargs):
+    """Enrolment changes move total_enrolled of the class's live sessions"""
+    AttendanceSession.objects.filter(class_instance_id=instance.class_instance_id, is_active=True).touch()
+
+
+@receiver(post_save, sender=ClassEnrollment)
+@receiver(post_delete, sender=ClassEnrollment)
+def invalidate_class_gallery(sender, instance, **kwargs):
+    invalidate_galleries(class_ids=[instance.class_instance_id])
+
+
+@receiver(post_save, sender=StudentFaceImage)
+@receiver(post_delete, sender=StudentFaceImage)
+def invalidate_student_galleries(sender, instance, **kwargs):
+    """A face image is in the gallery of every class its student is actively enrolled in"""
+    invalidate_galleries(student_ids=[instance.student_id])
+
+
+@receiver(post_delete, sender=Class)
+def delete_gallery_snapshots(sender, instance, **kwargs):
+    delete_snapshots(instance.id)
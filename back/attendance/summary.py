@@ -0,0 +1,216 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+from django.utils import timezone
+
+from .bitmaps import refresh_session_bitmap
+from .models import AttendanceSession, AttendanceRecord, AttendanceSummary, ArchivedAttendanceRecord
+
+_state = threading.local()
+
+# Old status of a record whose stored status is not known
+UNKNOWN = object()
+
+
+def refresh_summary(student_id, class_id):
+    """Recompute the summary row for one (student, class) pair, archived history included"""
+    rows = combine_report_rows(
+        ('student_id',),
+        *(
+            model.objects.filter(
+                student_id=student_id,
+                session__class_instance_id=class_id
+            ).report('student_id')
+            for model in (AttendanceRecord, ArchivedAttendanceRecord)
+        )
+    )
+
+    if not rows:
+        AttendanceSummary.objects.filter(student_id=student_id, class_instance_id=class_id).delete()
+        return None
+
+    summary, _ = AttendanceSummary.objects.update_or_create(
+        student_id=student_id,
+        class_instance_id=class_id,
+        defaults=_summary_fields(rows[0])
+    )
+    return summary
+
+
+def apply_record_change(student_id, session_id, old_status, new_status):
+    """
+    Move the (student, class) summary row by one record's change of status,
+    None standing for a record that did not exist before or exists no more.
+    The row is recounted instead when old_status is UNKNOWN or the row does
+    not exist yet (the student's first record in the class).
+    """
+    if old_status == new_status:
+        return
+
+    total, present, absent = _deltas(old_status, new_status)
+    summary = AttendanceSummary.objects.filter(
+        student_id=student_id, class_instance__attendance_sessions=session_id
+    )
+
+    updated = 0
+    if old_status is not UNKNOWN:
+        updated = _move(summary, total, present, absent)
+    if not updated:
+        class_id = AttendanceSession.objects.filter(id=session_id).values_list('class_instance_id', flat=True).first()
+        if class_id is not None:
+            refresh_summary(student_id, class_id)
+    elif total < 0:
+        summary.filter(total_sessions=0).delete()
+
+
+def apply_status_changes(class_id, changes):
+    """
+    Move a class's summary rows by many records' changes at once, changes
+    holding (student_id, old_status, new_status) as apply_record_change
+    takes them. Costs one UPDATE per distinct change; students without a
+    row yet (their first record in the class) are rebuilt together.
+    """
+    students_by_delta = {}
+    for student_id, old_status, new_status in changes:
+        if old_status != new_status:
+            students_by_delta.setdefault(_deltas(old_status, new_status), set()).add(student_id)
+
+    missing = set()
+    for (total, present, absent), student_ids in students_by_delta.items():
+        summaries = AttendanceSummary.objects.filter(class_instance_id=class_id, student_id__in=student_ids)
+        if _move(summaries, total, present, absent) < len(student_ids):
+            missing |= student_ids - set(summaries.values_list('student_id', flat=True))
+        if total < 0:
+            summaries.filter(total_sessions=0).delete()
+
+    if missing:
+        rebuild_class_summaries(class_id, student_ids=sorted(missing))
+
+
+def _deltas(old_status, new_status):
+    """(total, present, absent) change of one record going from old_status to new_status"""
+    return (
+        (new_status is not None) - (old_status is not None),
+        (new_status == 'PRESENT') - (old_status == 'PRESENT'),
+        (new_status == 'ABSENT') - (old_status == 'ABSENT'),
+    )
+
+
+def _move(summaries, total, present, absent):
+    return summaries.update(
+        total_sessions=F('total_sessions') + total,
+        present_count=F('present_count') + present,
+        absent_count=F('absent_count') + absent,
+        attendance_percentage=_percentage(F('present_count') + present, F('total_sessions') + total),
+        updated_at=timezone.now()
+    )
+
+
+def _percentage(present_count, total_sessions):
+    """SQL expression of the attendance percentage, as report() computes it"""
+    return Coalesce(
+        Round(Cast(present_count, FloatField()) * 100.0 / NullIf(total_sessions, 0), 2),
+        Value(0.0)
+    )
+
+
+def rebuild_class_summaries(class_id=None, student_ids=None):
+    """
+    Rebuild summary rows from scratch for one class, or for every class when
+    class_id is None. student_ids narrows the rebuild to those students.
+    """
+    summaries = AttendanceSummary.objects.all()
+    if class_id is not None:
+        summaries = summaries.filter(class_instance_id=class_id)
+    if student_ids is not None:
+        summaries = summaries.filter(student_id__in=student_ids)
+
+    row_lists = []
+    for model in (AttendanceRecord, ArchivedAttendanceRecord):
+        records = model.objects.all()
+        if class_id is not None:
+            records = records.filter(session__class_instance_id=class_id)
+        if student_ids is not None:
+            records = records.filter(student_id__in=student_ids)
+        row_lists.append(records.report('student_id', class_id=F('session__class_instance_id')))
+
+    rows = combine_report_rows(('student_id', 'class_id'), *row_lists)
+
+    with transaction.atomic():
+        summaries.delete()
+        created = AttendanceSummary.objects.bulk_create([
+            AttendanceSummary(
+                student_id=row['student_id'],
+                class_instance_id=row['class_id'],
+                **_summary_fields(row)
+            )
+            for row in rows
+        ], batch_size=500)
+    return len(created)
+
+
+def combine_report_rows(keys, *row_lists):
+    """Merge report rows from the live and archive tables that share the same key fields"""
+    combined = {}
+    for rows in row_lists:
+        for row in rows:
+            key = tuple(row[field] for field in keys)
+            existing = combined.get(key)
+            if existing is None:
+                combined[key] = dict(row)
+                continue
+            existing['total_sessions'] += row['total_sessions']
+            existing['present_count'] += row['present_count']
+            existing['absent_count'] += row['absent_count']
+
+    for row in combined.values():
+        row['attendance_percentage'] = (
+            round((row['present_count'] / row['total_sessions']) * 100, 2)
+            if row['total_sessions'] > 0 else 0
+        )
+    return list(combined.values())
+
+
+def _summary_fields(row):
+    return {
+        'total_sessions': row['total_sessions'],
+        'present_count': row['present_count'],
+        'absent_count': row['absent_count'],
+        'attendance_percentage': row['attendance_percentage'],
+    }
+
+
+def summary_updates_suspended():
+    return getattr(_state, 'suspended', 0) > 0
+
+
+def mark_session_touched(session_id):
+    """Remember a session changed during a bulk update so its bitmap is refreshed on exit"""
+    _state.touched_sessions.add(session_id)
+
+
+@contextmanager
+def bulk_summary_update(class_id, student_ids=None):
+    """
+    Suspend per-record maintenance of the summary and bitmap tables for bulk
+    changes to a class, then rebuild that class's summaries and the bitmaps of
+    the touched sessions once, inside the same transaction. student_ids
+    narrows the summary rebuild to the students whose records change.
+    """
+    with transaction.atomic():
+        if not summary_updates_suspended():
+            _state.touched_sessions = set()
+        _state.suspended = getattr(_state, 'suspended', 0) + 1
+        try:
+            yield
+        finally:
+            _state.suspended -= 1
+        if summary_updates_suspended():
+            return
+        rebuild_class_summaries(class_id, student_ids=student_ids)
+        for session_id in _state.touched_sessions:
+            refresh_session_bitmap(session_id)
+        AttendanceSession.objects.filter(id__in=_state.touched_sessions).touch()
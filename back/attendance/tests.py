@@ -1,3 +1,941 @@
-from django.test import TestCase
+import base64
+import io
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.core.management import call_command, CommandError
+from django.core.servers.basehttp import WSGIServer
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, LiveServerTestCase, RequestFactory, override_settings
+from django.test.testcases import LiveServerThread, QuietWSGIRequestHandler
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from back import face_engine, replica
+from back.fake_face_engine import encode_frame
+from back.testing import QueryBudgetMixin, seed_dataset, token_client
+from students.models import StudentProfile, StudentFaceImage
+from teachers.models import TeacherProfile, Course, Class, ClassEnrollment
+from .models import (
+    AttendanceSession, AttendanceRecord, AttendanceSummary, AttendancePurgeJob,
+    ArchivedAttendanceRecord, SessionAttendanceBitmap, AttendanceDailyRollup
+)
+from .archive import archive_academic_year
+from .gallery import Gallery, class_gallery, invalidate_galleries, publish_galleries, snapshot_path
+from .bitmaps import rebuild_class_bitmaps, session_heatmap
+from .purge import purge_class_attendance, run_purge_job
+from .recognition import recognize, mark_present
+from .rollups import rebuild_class_rollups, class_timeline
+from .summary import rebuild_class_summaries
+
+
+class AttendanceTestMixin:
+    """Builds one class with a small roster for the attendance tests"""
+
+    def setUp(self):
+        gallery_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, gallery_dir)
+        override = override_settings(FACE_GALLERY_DIR=gallery_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        teacher_user = User.objects.create_user('teacher', password='pass', role='TEACHER')
+        self.teacher = TeacherProfile.objects.create(
+            user=teacher_user, employee_id='EMP001',
+            department='Computer Science', designation='Lecturer'
+        )
+        self.course = Course.objects.create(
+            code='CSE301', name='Database Systems',
+            department='Computer Science', semester=5
+        )
+        self.class_instance = Class.objects.create(
+            teacher=self.teacher, course=self.course, section='A',
+            batch='2021', semester=5, academic_year='2024-25'
+        )
+
+        self.students = []
+        for i in range(3):
+            user = User.objects.create_user(f'student{i}', password='pass', role='STUDENT')
+            student = StudentProfile.objects.create(
+                user=user, roll_number=f'CSE2021{i:03d}',
+                department='Computer Science', semester=5, batch='2021'
+            )
+            ClassEnrollment.objects.create(student=student, class_instance=self.class_instance)
+            self.students.append(student)
+
+        self.teacher_client = APIClient()
+        self.teacher_client.force_authenticate(teacher_user)
+        self.student_client = APIClient()
+        self.student_client.force_authenticate(self.students[0].user)
+
+    def add_sessions(self, count, start=date(2024, 1, 1)):
+        """Add sessions where only the first student is marked present"""
+        for offset in range(count):
+            session = AttendanceSession.objects.create(
+                class_instance=self.class_instance,
+                date=start + timedelta(days=offset),
+                is_active=False
+            )
+            for index, student in enumerate(self.students):
+                AttendanceRecord.objects.create(
+                    session=session,
+                    student=student,
+                    status='PRESENT' if index == 0 else 'ABSENT'
+                )
+
+    def count_queries(self, func):
+        with CaptureQueriesContext(connection) as context:
+            func()
+        return len(context.captured_queries)
+
+
+class AttendanceSummaryTests(AttendanceTestMixin, TestCase):
+
+    def summary(self, student):
+        return AttendanceSummary.objects.values(
+            'total_sessions', 'present_count', 'absent_count', 'attendance_percentage'
+        ).get(student=student, class_instance=self.class_instance)
+
+    def test_record_changes_move_the_summary_without_recounting(self):
+        self.add_sessions(3)
+        record = AttendanceRecord.objects.filter(student=self.students[2]).order_by('session__date').last()
+
+        with CaptureQueriesContext(connection) as context:
+            record.status = 'PRESENT'
+            record.save()
+        self.assertFalse([query for query in context.captured_queries if 'COUNT(' in query['sql']])
+        self.assertEqual(self.summary(self.students[2]), {
+            'total_sessions': 3, 'present_count': 1, 'absent_count': 2, 'attendance_percentage': 33.33
+        })
+
+        AttendanceRecord.objects.filter(student=self.students[0]).first().delete()
+        record.delete()
+        expected = [self.summary(student) for student in self.students]
+        rebuild_class_summaries(self.class_instance.id)
+        self.assertEqual([self.summary(student) for student in self.students], expected)
+        self.assertEqual(expected[2]['present_count'], 0)
+
+    def test_session_start_and_recognition_move_summaries_without_recounting(self):
+        self.add_sessions(2)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.teacher_client.post(f'/api/attendance/sessions/class/{self.class_instance.id}/')
+            session = AttendanceSession.objects.get(id=response.data['session']['id'])
+            mark_present(session, [(self.students[0].id, 0.2), (self.students[1].id, 0.3)])
+        # Summary recounts aggregate records per student
+        self.assertFalse([query for query in context.captured_queries if 'GROUP BY' in query['sql']])
+
+        expected = [self.summary(student) for student in self.students]
+        self.assertEqual(expected[0]['total_sessions'], 3)
+        rebuild_class_summaries(self.class_instance.id)
+        self.assertEqual([self.summary(student) for student in self.students], expected)
+
+    def test_failed_summary_update_rolls_back_the_record(self):
+        self.add_sessions(1)
+        record = AttendanceRecord.objects.get(student=self.students[1])
+
+        with mock.patch('attendance.signals.set_session_bit', side_effect=RuntimeError('boom')):
+            record.status = 'PRESENT'
+            with self.assertRaises(RuntimeError):
+                record.save()
+
+        self.assertEqual(AttendanceRecord.objects.get(id=record.id).status, 'ABSENT')
+        self.assertEqual(self.summary(self.students[1])['present_count'], 0)
+
+
+class AttendanceReportQuerySetTests(AttendanceTestMixin, TestCase):
+
+    def test_by_student_aggregates_counts_and_percentage(self):
+        self.add_sessions(4)
+        record = AttendanceRecord.objects.filter(student=self.students[1]).first()
+        record.status = 'PRESENT'
+        record.save()
+
+        rows = list(AttendanceRecord.objects.filter(
+            session__class_instance=self.class_instance
+        ).by_student())
+
+        self.assertEqual([row['student_roll'] for row in rows], ['CSE2021000', 'CSE2021001', 'CSE2021002'])
+        self.assertEqual(rows[0]['present_count'], 4)
+        self.assertEqual(rows[0]['attendance_percentage'], 100.0)
+        self.assertEqual(rows[1]['present_count'], 1)
+        self.assertEqual(rows[1]['absent_count'], 3)
+        self.assertEqual(rows[1]['attendance_percentage'], 25.0)
+        self.assertEqual(rows[2]['attendance_percentage'], 0.0)
+
+    def test_by_class_aggregates_for_one_student(self):
+        self.add_sessions(3)
+
+        rows = list(AttendanceRecord.objects.filter(student=self.students[0]).by_class())
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['class_id'], self.class_instance.id)
+        self.assertEqual(rows[0]['course_code'], 'CSE301')
+        self.assertEqual(rows[0]['total_sessions'], 3)
+        self.assertEqual(rows[0]['attendance_percentage'], 100.0)
+
+    def test_reports_run_in_one_query_regardless_of_history(self):
+        self.add_sessions(30)
+
+        with self.assertNumQueries(1):
+            list(AttendanceRecord.objects.filter(session__class_instance=self.class_instance).by_student())
+        with self.assertNumQueries(1):
+            list(AttendanceRecord.objects.filter(student=self.students[0]).by_class())
+
+
+class AttendanceReportEndpointQueryTests(AttendanceTestMixin, TestCase):
+
+    def assert_constant_queries(self, client, url):
+        self.add_sessions(2)
+        short_history = self.count_queries(lambda: client.get(url))
+
+        self.add_sessions(25, start=date(2024, 3, 1))
+        long_history = self.count_queries(lambda: client.get(url))
+
+        self.assertEqual(short_history, long_history)
+
+    def test_class_report_endpoint(self):
+        url = f'/api/attendance/reports/class/{self.class_instance.id}/'
+        self.assert_constant_queries(self.teacher_client, url)
+
+        response = self.teacher_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_sessions'], 27)
+        self.assertEqual(response.data['students'][0]['attendance_percentage'], 100.0)
+
+    def test_student_attendance_endpoint(self):
+        url = '/api/students/attendance/'
+        self.assert_constant_queries(self.student_client, url)
+
+        response = self.student_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['attendance_by_class'][0]['total_sessions'], 27)
+        self.assertEqual(response.data['attendance_by_class'][0]['attendance_percentage'], 100.0)
+
+    def test_student_class_attendance_endpoint(self):
+        url = f'/api/students/attendance/class/{self.class_instance.id}/'
+        self.assert_constant_queries(self.student_client, url)
+
+        response = self.student_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['attendance_summary']['present_count'], 27)
+
+
+class BulkAttendanceOverrideTests(AttendanceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.add_sessions(1)
+        self.session = AttendanceSession.objects.get()
+        self.url = f'/api/attendance/sessions/{self.session.id}/records/bulk/'
+
+    def test_applies_changes_and_refreshes_counters(self):
+        response = self.teacher_client.patch(self.url, {'changes': [
+            {'student_id': self.students[0].id, 'status': 'ABSENT'},
+            {'student_id': self.students[1].id, 'status': 'PRESENT'},
+            {'student_id': self.students[2].id, 'status': 'PRESENT'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated_count'], 3)
+        self.assertEqual(response.data['session']['total_present'], 2)
+        self.assertEqual(
+            self.students[1].attendance_summaries.get().attendance_percentage, 100.0
+        )
+        self.assertEqual(
+            self.students[0].attendance_summaries.get().attendance_percentage, 0.0
+        )
+
+    def test_rejects_students_outside_the_session(self):
+        outsider_user = User.objects.create_user('outsider', password='pass', role='STUDENT')
+        outsider = StudentProfile.objects.create(
+            user=outsider_user, roll_number='CSE2021999',
+            department='Computer Science', semester=5, batch='2021'
+        )
+
+        response = self.teacher_client.patch(self.url, {'changes': [
+            {'student_id': self.students[1].id, 'status': 'PRESENT'},
+            {'student_id': outsider.id, 'status': 'PRESENT'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['student_ids'], [outsider.id])
+        self.assertEqual(AttendanceRecord.objects.filter(status='PRESENT').count(), 1)
+
+
+class PurgeClassAttendanceTests(AttendanceTestMixin, TestCase):
+
+    def test_purge_mode_deletes_history_in_batches(self):
+        self.add_sessions(5)
+        progress = []
+
+        sessions_deleted, records_deleted = purge_class_attendance(
+            self.class_instance.id, batch_size=4,
+            progress=lambda *counts: progress.append(counts)
+        )
+
+        self.assertEqual((sessions_deleted, records_deleted), (5, 15))
+        self.assertEqual(progress[-1], (5, 15))
+        self.assertGreater(len(progress), 4)
+        self.assertFalse(AttendanceRecord.objects.exists())
+        self.assertFalse(AttendanceSummary.objects.exists())
+
+    def test_purge_job_records_progress(self):
+        self.add_sessions(3)
+        job = AttendancePurgeJob.objects.create(
+            class_instance=self.class_instance, total_sessions=3, total_records=9
+        )
+
+        run_purge_job(job.id, batch_size=2)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'COMPLETED')
+        self.assertEqual(job.records_deleted, 9)
+        self.assertEqual(job.progress_percentage, 100.0)
+
+    def test_delete_all_endpoint_purge_mode(self):
+        self.add_sessions(2)
+
+        response = self.teacher_client.delete(
+            f'/api/attendance/sessions/class/{self.class_instance.id}/delete-all/?mode=purge'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['records_deleted'], 6)
+        self.assertFalse(AttendanceSession.objects.exists())
+
+
+class ArchiveAcademicYearTests(AttendanceTestMixin, TestCase):
+
+    def test_archive_moves_history_and_keeps_reports(self):
+        self.add_sessions(4)
+
+        sessions_archived, records_archived = archive_academic_year('2024-25', batch_size=3)
+
+        self.assertEqual((sessions_archived, records_archived), (4, 12))
+        self.assertFalse(AttendanceRecord.objects.exists())
+        self.assertEqual(ArchivedAttendanceRecord.objects.count(), 12)
+        self.assertEqual(self.students[0].attendance_summaries.get().present_count, 4)
+
+        response = self.teacher_client.get(f'/api/attendance/reports/class/{self.class_instance.id}/')
+        self.assertEqual(response.data['total_sessions'], 4)
+        self.assertEqual(response.data['students'][0]['attendance_percentage'], 100.0)
+
+        response = self.student_client.get(f'/api/students/attendance/class/{self.class_instance.id}/')
+        self.assertEqual(len(response.data['records']), 4)
+
+    def test_rebuild_includes_archived_history(self):
+        self.add_sessions(2)
+        archive_academic_year('2024-25')
+        self.add_sessions(1, start=date(2024, 6, 1))
+
+        rebuild_class_summaries(self.class_instance.id)
+
+        self.assertEqual(self.students[0].attendance_summaries.get().total_sessions, 3)
+
+    def test_refuses_year_with_active_sessions(self):
+        AttendanceSession.objects.create(class_instance=self.class_instance, date=date(2024, 1, 1))
+
+        with self.assertRaises(ValueError):
+            archive_academic_year('2024-25')
+
+
+class AttendanceExportTests(AttendanceTestMixin, TestCase):
+
+    def test_class_export_streams_register_matrix(self):
+        self.add_sessions(2)
+
+        response = self.teacher_client.get(f'/api/attendance/export/class/{self.class_instance.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Roll Number,Student,2024-01-01,2024-01-02,Present,Total,Percentage')
+        self.assertEqual(lines[1], 'CSE2021000,student0,P,P,2,2,100.0')
+        self.assertEqual(lines[2], 'CSE2021001,student1,A,A,0,2,0.0')
+        self.assertEqual(len(lines), 4)
+
+    def test_department_export_includes_archived_classes(self):
+        self.add_sessions(1)
+        archive_academic_year('2024-25')
+
+        response = self.teacher_client.get('/api/attendance/export/department/')
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'CSE301 - Database Systems,Section A,Batch 2021,2024-25')
+        self.assertEqual(lines[2], 'CSE2021000,student0,P,1,1,100.0')
+
+    def test_department_export_leaves_out_other_teachers_classes(self):
+        colleague = TeacherProfile.objects.create(
+            user=User.objects.create_user('colleague', password='pass', role='TEACHER'),
+            employee_id='EMP002', department='Computer Science', designation='Lecturer'
+        )
+        Class.objects.create(
+            teacher=colleague, course=self.course, section='B',
+            batch='2021', semester=5, academic_year='2024-25'
+        )
+
+        response = self.teacher_client.get('/api/attendance/export/department/')
+
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('Section A', content)
+        self.assertNotIn('Section B', content)
+
+
+class AttendanceBitmapTests(AttendanceTestMixin, TestCase):
+
+    def test_bitmaps_follow_record_changes(self):
+        self.add_sessions(3)
+        record = AttendanceRecord.objects.filter(student=self.students[2]).order_by('session__date').last()
+        record.status = 'PRESENT'
+        record.save()
+
+        heatmap = session_heatmap(self.class_instance.id)
+
+        self.assertEqual([row['present_count'] for row in heatmap], [1, 1, 2])
+        self.assertEqual(heatmap[2]['total_students'], 3)
+        self.assertEqual(heatmap[2]['present_ratio'], round(2 / 3, 4))
+
+    def test_record_change_flips_only_its_bits(self):
+        self.add_sessions(2)
+        record = AttendanceRecord.objects.filter(student=self.students[1]).order_by('session__date').last()
+        record.status = 'PRESENT'
+        queries = self.count_queries(record.save)
+        # Record, summary delta, bitmap row and roster, bitmap write, session version, savepoint
+        self.assertLessEqual(queries, 8)
+
+        incremental = list(SessionAttendanceBitmap.objects.order_by('date').values_list('present', 'recorded'))
+        rebuild_class_bitmaps(self.class_instance.id)
+        self.assertEqual(
+            list(SessionAttendanceBitmap.objects.order_by('date').values_list('present', 'recorded')), incremental
+        )
+
+    def test_recognized_frame_costs_the_same_for_any_number_of_faces(self):
+        session = AttendanceSession.objects.create(class_instance=self.class_instance, date=date(2024, 3, 1))
+        for student in self.students:
+            AttendanceRecord.objects.create(session=session, student=student, status='ABSENT')
+
+        one_face = self.count_queries(lambda: mark_present(session, [(self.students[0].id, 0.2)]))
+        two_faces = self.count_queries(lambda: mark_present(
+            session, [(self.students[1].id, 0.3), (self.students[2].id, 0.1), (self.students[2].id, 0.4)]
+        ))
+        self.assertEqual(one_face, two_faces)
+        self.assertEqual(session_heatmap(self.class_instance.id)[0]['present_count'], 3)
+        self.assertEqual(
+            AttendanceSummary.objects.filter(class_instance=self.class_instance, present_count=1).count(), 3
+        )
+
+    def test_rebuild_matches_incremental_maintenance(self):
+        self.add_sessions(4)
+        before = session_heatmap(self.class_instance.id)
+
+        rebuild_class_bitmaps(self.class_instance.id)
+
+        self.assertEqual(session_heatmap(self.class_instance.id), before)
+        self.assertEqual(SessionAttendanceBitmap.objects.count(), 4)
+
+    def test_recent_attendance_endpoint(self):
+        self.add_sessions(5)
+        record = AttendanceRecord.objects.filter(student=self.students[1]).order_by('session__date').last()
+        record.status = 'PRESENT'
+        record.save()
+
+        response = self.teacher_client.get(
+            f'/api/attendance/reports/class/{self.class_instance.id}/recent/?n=2&k=1'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['student_roll'], row['attended'], row['meets_target']) for row in response.data['students']],
+            [('CSE2021000', 2, True), ('CSE2021001', 1, True), ('CSE2021002', 0, False)]
+        )
+
+    def test_deleting_a_session_drops_its_bitmap(self):
+        self.add_sessions(2)
+        session = AttendanceSession.objects.first()
+
+        self.teacher_client.delete(f'/api/attendance/sessions/{session.id}/delete/')
+
+        self.assertFalse(SessionAttendanceBitmap.objects.filter(session_id=session.id).exists())
+        self.assertEqual(SessionAttendanceBitmap.objects.count(), 1)
+
+
+class AttendanceTimelineTests(AttendanceTestMixin, TestCase):
+
+    def test_ending_a_session_refreshes_rollups(self):
+        # 2024-01-01 is a Monday, so the eighth session starts a second week
+        self.add_sessions(8)
+        session = AttendanceSession.objects.order_by('date').last()
+        session.is_active = True
+        session.save()
+        rebuild_class_rollups(self.class_instance.id)
+        AttendanceRecord.objects.filter(session=session, student=self.students[1]).update(status='PRESENT')
+
+        response = self.teacher_client.patch(f'/api/attendance/sessions/{session.id}/end/')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.teacher_client.get(f'/api/attendance/reports/class/{self.class_instance.id}/timeline/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['daily']), 8)
+        self.assertEqual(response.data['daily'][-1]['present_count'], 2)
+        self.assertEqual(response.data['weeks'], [date(2024, 1, 1), date(2024, 1, 8)])
+        self.assertEqual(
+            [(row['student_roll'], row['weeks']) for row in response.data['students']],
+            [('CSE2021000', [1.0, 1.0]), ('CSE2021001', [0.0, 1.0]), ('CSE2021002', [0.0, 0.0])]
+        )
+
+    def test_deleting_a_session_refreshes_rollups(self):
+        self.add_sessions(10)
+        rebuild_class_rollups(self.class_instance.id)
+        session = AttendanceSession.objects.get(date=date(2024, 1, 3))
+
+        self.teacher_client.delete(f'/api/attendance/sessions/{session.id}/delete/')
+        incremental = class_timeline(self.class_instance.id)
+        rebuild_class_rollups(self.class_instance.id)
+
+        self.assertEqual(class_timeline(self.class_instance.id), incremental)
+        self.assertEqual(AttendanceDailyRollup.objects.count(), 9)
+
+
+class AttendanceQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Query counts and plans of the hot attendance endpoints on a seeded department"""
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_dataset()
+        cls.class_instance = data['classes'][3]
+        cls.session = [session for session in data['sessions'] if session.class_instance_id == cls.class_instance.id][5]
+        cls.student = data['rosters'][3][4]
+
+    def setUp(self):
+        super().setUp()
+        self.client = token_client(self.class_instance.teacher.user)
+
+    def test_session_records(self):
+        response = self.assertQueryBudget(
+            3, lambda: self.client.get(f'/api/attendance/sessions/{self.session.id}/records/')
+        )
+        self.assertEqual(len(response.data['records']), 40)
+        self.assertEqual(response.data['session']['total_present'], 20)
+
+    def test_all_sessions(self):
+        response = self.assertQueryBudget(
+            4, lambda: self.client.get(f'/api/attendance/sessions/class/{self.class_instance.id}/all/')
+        )
+        self.assertEqual(response.data['total_sessions'], 20)
+        self.assertEqual(response.data['sessions'][0]['total_enrolled'], 40)
+
+    def test_todays_session(self):
+        AttendanceSession.objects.create(class_instance=self.class_instance, date=date.today())
+        response = self.assertQueryBudget(
+            3, lambda: self.client.get(f'/api/attendance/sessions/class/{self.class_instance.id}/')
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_class_report(self):
+        response = self.assertQueryBudget(
+            5, lambda: self.client.get(f'/api/attendance/reports/class/{self.class_instance.id}/')
+        )
+        self.assertEqual(len(response.data['students']), 40)
+
+    def test_student_history_uses_composite_index(self):
+        self.assertUsesIndex(
+            AttendanceRecord.objects.filter(student=self.student).order_by('-session__date'),
+            'attendance_student_session_idx'
+        )
+
+
+class ConditionalGetTests(AttendanceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.session = AttendanceSession.objects.create(class_instance=self.class_instance, date=date.today())
+        for student in self.students:
+            AttendanceRecord.objects.create(session=self.session, student=student)
+        self.url = f'/api/attendance/sessions/{self.session.id}/records/'
+
+    def test_unchanged_poll_is_not_modified(self):
+        response = self.teacher_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.teacher_client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.teacher_client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_record_changes_move_the_etag(self):
+        etag = self.teacher_client.get(self.url)['ETag']
+
+        record = AttendanceRecord.objects.get(session=self.session, student=self.students[1])
+        record.status = 'PRESENT'
+        record.save()
+
+        response = self.teacher_client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['session']['total_present'], 1)
+
+    def test_enrolment_changes_move_todays_session_etag(self):
+        url = f'/api/attendance/sessions/class/{self.class_instance.id}/'
+        etag = self.teacher_client.get(url)['ETag']
+        self.assertEqual(self.teacher_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        enrollment = ClassEnrollment.objects.get(student=self.students[2])
+        enrollment.is_active = False
+        enrollment.save()
+
+        response = self.teacher_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['session']['total_enrolled'], 2)
+
+
+class ReplicaRoutingTests(AttendanceTestMixin, TestCase):
+    """Routing decisions with a replica alias configured and outside a transaction"""
+
+    def setUp(self):
+        super().setUp()
+        self.primary = mock.Mock(in_atomic_block=False)
+        for patcher in (
+            mock.patch('back.replica.replica_configured', return_value=True),
+            mock.patch('back.replica.connections', {'default': self.primary}),
+            mock.patch('back.replica.replica_lag', return_value=0.5),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        replica._last_check['at'] = 0.0
+        self.state = replica.RoutingState()
+        self.addCleanup(replica._state.reset, replica._state.set(self.state))
+
+    def test_reads_use_replica_only_when_opted_in(self):
+        self.assertEqual(replica.read_alias(), 'default')
+        with replica.use_replica():
+            self.assertEqual(replica.read_alias(), 'replica')
+        self.assertEqual(replica.read_alias(), 'default')
+
+    def test_reads_after_a_write_stay_on_primary(self):
+        with replica.use_replica():
+            replica.ReplicaRouter().db_for_write(AttendanceSession)
+            self.assertEqual(replica.read_alias(), 'default')
+
+    def test_transactions_read_from_primary(self):
+        self.primary.in_atomic_block = True
+        with replica.use_replica():
+            self.assertEqual(replica.read_alias(), 'default')
+
+    def test_lagging_or_unreachable_replica_is_skipped(self):
+        for lag in (30, None):
+            replica._last_check['at'] = 0.0
+            with mock.patch('back.replica.replica_lag', return_value=lag), replica.use_replica():
+                self.assertEqual(replica.read_alias(), 'default')
+
+    def test_client_that_wrote_is_pinned_to_primary(self):
+        seen = []
+
+        def write(request):
+            replica.ReplicaRouter().db_for_write(AttendanceSession)
+
+        def read(request):
+            seen.append(replica._state.get().pinned)
+
+        factory = RequestFactory()
+        replica.ReplicaRoutingMiddleware(write)(factory.post('/', HTTP_AUTHORIZATION='Token a'))
+        replica.ReplicaRoutingMiddleware(read)(factory.get('/', HTTP_AUTHORIZATION='Token a'))
+        replica.ReplicaRoutingMiddleware(read)(factory.get('/', HTTP_AUTHORIZATION='Token b'))
+        self.assertEqual(seen, [True, False])
+
+    def test_report_views_opt_in_after_authentication(self):
+        self.add_sessions(2)
+        decisions = []
+
+        def record(router, model, **hints):
+            decisions.append((model._meta.model_name, replica._state.get().replica_reads))
+            return 'default'
+
+        with mock.patch.object(replica.ReplicaRouter, 'db_for_read', autospec=True, side_effect=record):
+            response = token_client(self.teacher.user).get(
+                f'/api/attendance/reports/class/{self.class_instance.id}/'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(('token', False), decisions)
+        self.assertIn(('attendancerecord', True), decisions)
+
+        decisions.clear()
+        with mock.patch.object(replica.ReplicaRouter, 'db_for_read', autospec=True, side_effect=record):
+            self.teacher_client.get(f'/api/attendance/sessions/class/{self.class_instance.id}/')
+        self.assertNotIn(True, [opted_in for _, opted_in in decisions])
+
+
+class SyncReplicaCommandTests(TransactionTestCase):
+    """The backup needs the primary outside a test transaction"""
+
+    def test_copy_is_stamped_with_its_snapshot_time(self):
+        with tempfile.TemporaryDirectory() as directory:
+            target = os.path.join(directory, 'replica.sqlite3')
+            call_command('sync_replica', target=target, stdout=open(os.devnull, 'w'))
+
+            copy = sqlite3.connect(target)
+            try:
+                self.assertGreater(copy.execute('PRAGMA user_version').fetchone()[0], 0)
+                tables = {row[0] for row in copy.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            finally:
+                copy.close()
+        self.assertIn(AttendanceRecord._meta.db_table, tables)
+
+
+class AsyncViewTests(AttendanceTestMixin, TestCase):
+    """The async variants answer exactly as the APIViews they mirror"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = token_client(self.teacher.user)
+        self.session = AttendanceSession.objects.create(class_instance=self.class_instance, date=date.today())
+        for student in self.students:
+            AttendanceRecord.objects.create(session=self.session, student=student)
+
+    def assertSameResponse(self, sync_url, async_url):
+        sync_response = self.client.get(sync_url)
+        async_response = self.client.get(async_url)
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response.json(), sync_response.json())
+        return async_response
+
+    def test_session_and_records_match_sync_views(self):
+        self.assertSameResponse(
+            f'/api/attendance/sessions/class/{self.class_instance.id}/',
+            f'/api/attendance/async/sessions/class/{self.class_instance.id}/'
+        )
+        response = self.assertSameResponse(
+            f'/api/attendance/sessions/{self.session.id}/records/',
+            f'/api/attendance/async/sessions/{self.session.id}/records/'
+        )
+
+        response = self.client.get(
+            f'/api/attendance/async/sessions/{self.session.id}/records/', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_requires_a_token(self):
+        response = APIClient().get(f'/api/attendance/async/sessions/{self.session.id}/records/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'detail': 'Authentication credentials were not provided.'})
+
+        response = self.student_client.get(f'/api/attendance/async/sessions/{self.session.id}/records/')
+        self.assertEqual(response.status_code, 401)
+
+        response = token_client(self.students[0].user).get(f'/api/attendance/async/sessions/{self.session.id}/records/')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {'detail': 'User is not a teacher'})
+
+        response = token_client(self.students[0].user).get(f'/api/attendance/sessions/{self.session.id}/records/')
+        self.assertEqual(response.json(), {'detail': 'User is not a teacher'})
+
+    def test_recognition_marks_the_closest_student(self):
+        import io
+        from PIL import Image
+
+        encodings = [np.full(128, index / 10) for index in range(len(self.students))]
+        StudentFaceImage.objects.bulk_create([
+            StudentFaceImage(
+                student=student, image=f'student_faces/{student.id}.jpg',
+                face_encoding=base64.b64encode(encoding.tobytes()).decode('utf-8')
+            )
+            for student, encoding in zip(self.students, encodings)
+        ])
+        frame = io.BytesIO()
+        Image.new('RGB', (8, 8)).save(frame, format='PNG')
+        payload = {'image_data': base64.b64encode(frame.getvalue()).decode('ascii')}
+
+        with mock.patch('back.face_engine.face_locations', return_value=[(0, 8, 8, 0)]), \
+                mock.patch('back.face_engine.face_encodings', return_value=[encodings[1] + 0.001]):
+            response = self.client.post(
+                f'/api/attendance/async/sessions/{self.session.id}/recognize/', payload, format='json'
+            )
+            sync_response = self.client.post(
+                f'/api/attendance/sessions/{self.session.id}/recognize/', payload, format='json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), sync_response.json())
+        self.assertEqual([row['student_id'] for row in response.json()['recognized_students']], [self.students[1].id])
+        self.assertEqual(
+            AttendanceRecord.objects.get(session=self.session, student=self.students[1]).status, 'PRESENT'
+        )
+
+
+class FaceEngineTests(TestCase):
+
+    def test_startup_does_not_load_face_recognition(self):
+        from .management.commands.benchmark_startup import PROBE
+
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE, 'cold'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.split()[2], 'False')
+
+    def test_face_distance_needs_no_models(self):
+        known = np.array([[0.0, 0.0], [3.0, 4.0]])
+        self.assertEqual(face_engine.face_distance(known, np.array([0.0, 0.0])).tolist(), [0.0, 5.0])
+        self.assertEqual(len(face_engine.face_distance(np.empty((0, 2)), np.zeros(2))), 0)
+
+
+class GallerySnapshotTests(AttendanceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.encodings = {}
+        for index, student in enumerate(self.students):
+            self.encodings[student.id] = np.full(128, index / 10)
+            StudentFaceImage.objects.bulk_create([StudentFaceImage(
+                student=student, image=f'student_faces/{student.id}.jpg',
+                face_encoding=base64.b64encode(self.encodings[student.id].tobytes()).decode('utf-8')
+            )])
+
+    def snapshot(self):
+        self.class_instance.refresh_from_db()
+        return snapshot_path(self.class_instance.id, self.class_instance.gallery_version)
+
+    def test_gallery_is_mapped_from_its_snapshot(self):
+        gallery = class_gallery(self.class_instance.id)
+        self.assertTrue(os.path.exists(self.snapshot()))
+        self.assertEqual(gallery.version, self.class_instance.gallery_version)
+        self.assertEqual(gallery.student_ids.tolist(), [student.id for student in self.students])
+        np.testing.assert_array_equal(gallery.encodings[1], self.encodings[self.students[1].id])
+        # Views into the read-only mapping, not copies
+        for array in (gallery.student_ids, gallery.encodings):
+            self.assertFalse(array.flags.writeable)
+            self.assertFalse(array.flags.owndata)
+        self.assertTrue(gallery.encodings.flags.c_contiguous)
+
+        # Same version: only the version is read
+        with self.assertNumQueries(1):
+            self.assertIs(class_gallery(self.class_instance.id), gallery)
+
+    def test_changes_write_the_new_snapshot_on_commit(self):
+        class_gallery(self.class_instance.id)
+        old_snapshot = self.snapshot()
+
+        enrollment = ClassEnrollment.objects.get(student=self.students[0])
+        enrollment.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment.save()
+        self.assertFalse(os.path.exists(old_snapshot))
+        self.assertTrue(os.path.exists(self.snapshot()))
+
+        # Mapped without building from face images
+        with self.assertNumQueries(1):
+            gallery = class_gallery(self.class_instance.id)
+        self.assertEqual(gallery.student_ids.tolist(), [self.students[1].id, self.students[2].id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentFaceImage.objects.get(student=self.students[1]).delete()
+        self.assertEqual(class_gallery(self.class_instance.id).student_ids.tolist(), [self.students[2].id])
+
+    def test_missing_snapshot_is_written_on_first_use(self):
+        ClassEnrollment.objects.filter(class_instance=self.class_instance).update(is_active=False)
+        invalidate_galleries(class_ids=[self.class_instance.id])
+        gallery = class_gallery(self.class_instance.id)
+        self.assertEqual(gallery.encodings.shape, (0, 128))
+        self.assertTrue(os.path.exists(self.snapshot()))
+
+    def test_publish_galleries_writes_missing_snapshots(self):
+        self.assertEqual(publish_galleries(), 1)
+        self.assertTrue(os.path.exists(self.snapshot()))
+        self.assertEqual(publish_galleries(), 0)
+
+
+class SeedScaleCommandTests(TestCase):
+
+    def test_seeds_consistent_cohorts_and_derived_tables(self):
+        call_command(
+            'seed_scale', students=200, classes=6, class_size=8, sessions=4, images=2, stdout=io.StringIO()
+        )
+        self.assertEqual(StudentProfile.objects.count(), 200)
+        self.assertEqual(StudentFaceImage.objects.exclude(face_encoding='').count(), 400)
+        self.assertEqual(Class.objects.count(), 6)
+        self.assertEqual(ClassEnrollment.objects.count(), 6 * 8)
+        self.assertEqual(AttendanceRecord.objects.count(), 6 * 4 * 8)
+        self.assertEqual(AttendanceSummary.objects.count(), 6 * 8)
+        # Students only sit in classes of their own batch and semester
+        self.assertFalse(ClassEnrollment.objects.exclude(student__batch=F('class_instance__batch')).exists())
+        self.assertFalse(ClassEnrollment.objects.exclude(student__semester=F('class_instance__semester')).exists())
+        self.assertTrue(self.client.login(username='scale-student-0', password='password'))
+
+        with self.assertRaises(CommandError):
+            call_command('seed_scale', students=1, classes=1, stdout=io.StringIO())
+
+
+@override_settings(FACE_ENGINE='fake')
+class FakeFaceEngineTests(TestCase):
+
+    def test_frame_faces_match_their_gallery_rows(self):
+        rng = np.random.default_rng(0)
+        gallery = Gallery('test', np.arange(10, 30), rng.normal(0, 0.09, (20, 128)))
+        frame = base64.b64encode(encode_frame(gallery.encodings[[3, 7]])).decode('ascii')
+        face_count, matches = recognize(frame, gallery)
+        self.assertEqual(face_count, 2)
+        self.assertEqual([student_id for student_id, _ in matches], [13, 17])
+        self.assertTrue(all(distance < 0.1 for _, distance in matches))
+
+    def test_other_images_show_one_stable_face(self):
+        photo = np.random.default_rng(1).integers(0, 256, (60, 40, 3), dtype=np.uint8)
+        self.assertEqual(face_engine.face_locations(photo), [(0, 40, 60, 0)])
+        first, = face_engine.face_encodings(photo, [(0, 40, 60, 0)])
+        second, = face_engine.face_encodings(photo)
+        self.assertEqual(first.tolist(), second.tolist())
+
+
+class SingleThreadedLiveServerThread(LiveServerThread):
+    """
+    Serves requests one at a time: the in-memory test database is a single
+    connection, which concurrent request threads would interleave their
+    transactions on
+    """
+
+    def _create_server(self, connections_override=None):
+        return WSGIServer((self.host, self.port), QuietWSGIRequestHandler, allow_reuse_address=False)
+
+
+@override_settings(FACE_ENGINE='fake')
+class LoadTestCommandTests(LiveServerTestCase):
+    server_thread_class = SingleThreadedLiveServerThread
+
+    def setUp(self):
+        directory = tempfile.mkdtemp(prefix='galleries-')
+        self.addCleanup(shutil.rmtree, directory)
+        gallery_dir = override_settings(FACE_GALLERY_DIR=directory)
+        gallery_dir.enable()
+        self.addCleanup(gallery_dir.disable)
+        call_command('seed_scale', students=200, classes=4, class_size=8, sessions=1, stdout=io.StringIO())
+
+    def test_classrooms_mark_attendance_through_the_api(self):
+        output = io.StringIO()
+        call_command(
+            'load_test', url=self.live_server_url, classrooms=2, duration=1.5, frame_interval=0.3,
+            poll_interval=0.3, students_per_classroom=2, student_interval=0.5, end_sessions=True, stdout=output
+        )
+        report = output.getvalue()
+        for endpoint in ('login', 'start session', 'recognize', 'records', 'student attendance', 'end session'):
+            self.assertIn(endpoint, report)
+        self.assertIn('error rate 0.0%', report)
+        self.assertNotIn('No face was recognized', report)
+
+        sessions = AttendanceSession.objects.filter(date=date.today())
+        self.assertEqual(sessions.count(), 2)
+        self.assertFalse(sessions.filter(is_active=True).exists())
+        self.assertTrue(AttendanceRecord.objects.filter(session__in=sessions, status='PRESENT').exists())
@@ -3,7 +3,13 @@ from .views import (
     AttendanceSessionView, FaceRecognitionAttendanceView, 
     AttendanceRecordsView, EndAttendanceSessionView,
     DeleteAttendanceSessionView, DeleteAllAttendanceSessionsView,
-    DeleteAttendanceRecordView, GetAllAttendanceSessionsView
+    DeleteAttendanceRecordView, GetAllAttendanceSessionsView, AttendancePurgeJobView,
+    BulkAttendanceOverrideView, ClassAttendanceReportView,
+    ClassAttendanceExportView, DepartmentAttendanceExportView,
+    ClassAttendanceHeatmapView, ClassAttendanceTimelineView, RecentAttendanceView
+)
+from .async_views import (
+    AsyncAttendanceSessionView, AsyncAttendanceRecordsView, AsyncFaceRecognitionAttendanceView
 )
 
 urlpatterns = [
@@ -12,7 +18,20 @@ urlpatterns = [
     path('sessions/class/<int:class_id>/delete-all/', DeleteAllAttendanceSessionsView.as_view(), name='delete-all-sessions'),
     path('sessions/<int:session_id>/recognize/', FaceRecognitionAttendanceView.as_view(), name='face-recognition'),
     path('sessions/<int:session_id>/records/', AttendanceRecordsView.as_view(), name='attendance-records'),
+    path('sessions/<int:session_id>/records/bulk/', BulkAttendanceOverrideView.as_view(), name='bulk-attendance-override'),
     path('sessions/<int:session_id>/end/', EndAttendanceSessionView.as_view(), name='end-session'),
     path('sessions/<int:session_id>/delete/', DeleteAttendanceSessionView.as_view(), name='delete-session'),
+    path('purge-jobs/<int:job_id>/', AttendancePurgeJobView.as_view(), name='attendance-purge-job'),
     path('records/<int:record_id>/delete/', DeleteAttendanceRecordView.as_view(), name='delete-record'),
+    path('reports/class/<int:class_id>/', ClassAttendanceReportView.as_view(), name='class-attendance-report'),
+    path('reports/class/<int:class_id>/heatmap/', ClassAttendanceHeatmapView.as_view(), name='class-attendance-heatmap'),
+    path('reports/class/<int:class_id>/timeline/', ClassAttendanceTimelineView.as_view(), name='class-attendance-timeline'),
+    path('reports/class/<int:class_id>/recent/', RecentAttendanceView.as_view(), name='class-recent-attendance'),
+    path('export/class/<int:class_id>/', ClassAttendanceExportView.as_view(), name='class-attendance-export'),
+    path('export/department/', DepartmentAttendanceExportView.as_view(), name='department-attendance-export'),
+
+    # Async variants of the live-session endpoints, for ASGI deployments
+    path('async/sessions/class/<int:class_id>/', AsyncAttendanceSessionView.as_view(), name='attendance-session-async'),
+    path('async/sessions/<int:session_id>/records/', AsyncAttendanceRecordsView.as_view(), name='attendance-records-async'),
+    path('async/sessions/<int:session_id>/recognize/', AsyncFaceRecognitionAttendanceView.as_view(), name='face-recognition-async'),
 ]
@@ -1,33 +1,45 @@
 from django.shortcuts import render
+from django.http import StreamingHttpResponse, FileResponse
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from accounts.permissions import IsTeacher
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from django.utils import timezone
 from datetime import date
-import base64
-import numpy as np
-import face_recognition
-from PIL import Image
-import io
 
-from .models import AttendanceSession, AttendanceRecord
-from .serializers import AttendanceSessionSerializer, AttendanceRecordSerializer, FaceRecognitionDataSerializer
+from .models import (
+    AttendanceSession, AttendanceRecord, AttendancePurgeJob,
+    ArchivedAttendanceSession, ArchivedAttendanceRecord
+)
+from .serializers import (
+    AttendanceSessionSerializer, FaceRecognitionDataSerializer,
+    BulkAttendanceOverrideSerializer, AttendancePurgeJobSerializer
+)
+from .purge import purge_class_attendance, start_purge_job
+from .archive import records_for_class
+from .bitmaps import refresh_session_bitmap, session_heatmap, attended_recent
+from .exports import (
+    class_register_rows, department_register_rows, stream_csv, write_xlsx, XLSX_CONTENT_TYPE
+)
+from .summary import bulk_summary_update, apply_status_changes, combine_report_rows
+from .conditional import session_validators, not_modified_response, add_validators
+from .rollups import refresh_rollups, delete_class_rollups, class_timeline
+from .gallery import class_gallery
+from .recognition import recognize, mark_present
+from .payloads import todays_session, session_data, session_records, recognition_data
+from .signals import class_history_changed
+from back.replica import ReplicaReadMixin
 from teachers.models import Class, ClassEnrollment
-from students.models import StudentFaceImage
+from students.models import StudentProfile
 
 class AttendanceSessionView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
     
     def post(self, request, class_id):
         """Start a new attendance session"""
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             teacher = request.user.teacher_profile
             class_instance = get_object_or_404(Class, id=class_id, teacher=teacher)
             
@@ -44,24 +56,30 @@ class AttendanceSessionView(APIView):
                     'session': AttendanceSessionSerializer(existing_session).data
                 }, status=status.HTTP_200_OK)
             
-            # Create new session - remove start_time parameter
-            session = AttendanceSession.objects.create(
-                class_instance=class_instance,
-                date=today
-            )
-            
-            # Initialize attendance records for all enrolled students
-            enrollments = ClassEnrollment.objects.filter(
-                class_instance=class_instance,
-                is_active=True
-            )
-            
-            for enrollment in enrollments:
-                AttendanceRecord.objects.create(
-                    session=session,
-                    student=enrollment.student,
-                    status='ABSENT'  # Default to absent
+            with transaction.atomic():
+                # Create new session - remove start_time parameter
+                session = AttendanceSession.objects.create(
+                    class_instance=class_instance,
+                    date=today
                 )
+                
+                # Initialize attendance records for all enrolled students
+                student_ids = list(ClassEnrollment.objects.filter(
+                    class_instance=class_instance,
+                    is_active=True
+                ).values_list('student_id', flat=True))
+                
+                AttendanceRecord.objects.bulk_create([
+                    AttendanceRecord(
+                        session=session,
+                        student_id=student_id,
+                        status='ABSENT'  # Default to absent
+                    )
+                    for student_id in student_ids
+                ])
+                # bulk_create sends no post_save: one summary delta per student, one bitmap
+                apply_status_changes(class_instance.id, [(student_id, None, 'ABSENT') for student_id in student_ids])
+                refresh_session_bitmap(session.id)
             
             return Response({
                 'message': 'Attendance session started',
@@ -77,29 +95,28 @@ class AttendanceSessionView(APIView):
     def get(self, request, class_id):
         """Get today's attendance session"""
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             teacher = request.user.teacher_profile
-            class_instance = get_object_or_404(Class, id=class_id, teacher=teacher)
-            
             today = date.today()
-            session = AttendanceSession.objects.filter(
-                class_instance=class_instance,
+            
+            # Polls that send back the session's ETag are answered before any serializer work
+            not_modified = not_modified_response(request, AttendanceSession.objects.filter(
+                class_instance_id=class_id, 
+                class_instance__teacher=teacher, 
                 date=today
-            ).first()
+            ))
+            if not_modified is not None:
+                return not_modified
             
+            session = todays_session(teacher, class_id)
             if not session:
                 return Response({
                     'message': 'No attendance session found for today'
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            return Response({
-                'session': AttendanceSessionSerializer(session).data
-            }, status=status.HTTP_200_OK)
+            return add_validators(
+                Response(session_data(session), status=status.HTTP_200_OK), 
+                session_validators(session)
+            )
             
         except Exception as e:
             return Response(
@@ -108,17 +125,11 @@ class AttendanceSessionView(APIView):
             )
 
 class FaceRecognitionAttendanceView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
     
     def post(self, request, session_id):
         """Process face recognition for attendance"""
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             teacher = request.user.teacher_profile
             session = get_object_or_404(
                 AttendanceSession, 
@@ -131,69 +142,13 @@ class FaceRecognitionAttendanceView(APIView):
             if not serializer.is_valid():
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
             
-            # Decode image
-            image_data = serializer.validated_data['image_data']
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
-            image_array = np.array(image)
-            
-            # Find faces in the image
-            face_locations = face_recognition.face_locations(image_array)
-            face_encodings = face_recognition.face_encodings(image_array, face_locations)
-            
-            if not face_encodings:
-                return Response({
-                    'message': 'No faces detected in the image',
-                    'recognized_students': []
-                }, status=status.HTTP_200_OK)
-            
-            # Get enrolled students with face images
-            enrolled_students = ClassEnrollment.objects.filter(
-                class_instance=session.class_instance,
-                is_active=True
-            ).select_related('student')
-            
-            recognized_students = []
-            
-            for face_encoding in face_encodings:
-                best_match = None
-                best_distance = float('inf')
-                
-                for enrollment in enrolled_students:
-                    student = enrollment.student
-                    face_images = StudentFaceImage.objects.filter(student=student)
-                    
-                    for face_image in face_images:
-                        stored_encoding = face_image.get_face_encoding_array()
-                        if stored_encoding is not None:
-                            distance = face_recognition.face_distance([stored_encoding], face_encoding)[0]
-                            
-                            if distance < 0.5 and distance < best_distance:  # Threshold for recognition
-                                best_match = student
-                                best_distance = distance
-                
-                if best_match:
-                    # Mark student as present
-                    attendance_record = AttendanceRecord.objects.get(
-                        session=session,
-                        student=best_match
-                    )
-                    attendance_record.status = 'PRESENT'
-                    attendance_record.confidence_score = 1 - best_distance
-                    attendance_record.marked_at = timezone.now()
-                    attendance_record.save()
-                    
-                    recognized_students.append({
-                        'student_id': best_match.id,
-                        'student_name': best_match.user.username,
-                        'roll_number': best_match.roll_number,
-                        'confidence': 1 - best_distance
-                    })
+            face_count, matches = recognize(
+                serializer.validated_data['image_data'], 
+                class_gallery(session.class_instance_id)
+            )
+            recognized_students = mark_present(session, matches) if face_count else []
             
-            return Response({
-                'message': f'Processed {len(face_encodings)} faces, recognized {len(recognized_students)} students',
-                'recognized_students': recognized_students
-            }, status=status.HTTP_200_OK)
+            return Response(recognition_data(face_count, recognized_students), status=status.HTTP_200_OK)
             
         except Exception as e:
             return Response(
@@ -202,31 +157,25 @@ class FaceRecognitionAttendanceView(APIView):
             )
 
 class AttendanceRecordsView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
     
     def get(self, request, session_id):
         """Get attendance records for a session"""
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             teacher = request.user.teacher_profile
-            session = get_object_or_404(
-                AttendanceSession, 
+            
+            not_modified = not_modified_response(request, AttendanceSession.objects.filter(
                 id=session_id, 
                 class_instance__teacher=teacher
-            )
+            ))
+            if not_modified is not None:
+                return not_modified
             
-            records = AttendanceRecord.objects.filter(session=session).order_by('student__roll_number')
-            serializer = AttendanceRecordSerializer(records, many=True)
+            session, data = session_records(teacher, session_id)
             
-            return Response({
-                'session': AttendanceSessionSerializer(session).data,
-                'records': serializer.data
-            }, status=status.HTTP_200_OK)
+            # Validators come from the session row read before the records, so a
+            # change in between at worst makes the next poll refetch
+            return add_validators(Response(data, status=status.HTTP_200_OK), session_validators(session))
             
         except Exception as e:
             return Response(
@@ -235,17 +184,11 @@ class AttendanceRecordsView(APIView):
             )
 
 class EndAttendanceSessionView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
     
     def patch(self, request, session_id):
         """End attendance session"""
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             teacher = request.user.teacher_profile
             session = get_object_or_404(
                 AttendanceSession, 
@@ -257,6 +200,7 @@ class EndAttendanceSessionView(APIView):
             # Remove end_time parameter since it might not exist in model
             session.is_active = False
             session.save()
+            refresh_rollups(session.class_instance_id, session.date)
             
             return Response({
                 'message': 'Attendance session ended',
@@ -270,17 +214,11 @@ class EndAttendanceSessionView(APIView):
             )
 
 class DeleteAttendanceSessionView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
     
     def delete(self, request, session_id):
         """Delete an attendance session and all its records"""
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             teacher = request.user.teacher_profile
             session = get_object_or_404(
                 AttendanceSession, 
@@ -295,7 +233,9 @@ class DeleteAttendanceSessionView(APIView):
                 'records_deleted': session.attendance_records.count()
             }
             
-            session.delete()
+            with bulk_summary_update(session.class_instance_id):
+                session.delete()
+                refresh_rollups(session.class_instance_id, session_info['date'])
             
             return Response({
                 'message': 'Attendance session deleted successfully',
@@ -309,25 +249,45 @@ class DeleteAttendanceSessionView(APIView):
             )
 
 class DeleteAllAttendanceSessionsView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
     
     def delete(self, request, class_id):
         """Delete all attendance sessions for a class"""
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             teacher = request.user.teacher_profile
             class_instance = get_object_or_404(Class, id=class_id, teacher=teacher)
             
+            # Large histories can be purged in batches, optionally in the background
+            if request.query_params.get('mode') == 'purge':
+                if request.query_params.get('background') in ('1', 'true'):
+                    job = start_purge_job(class_instance)
+                    return Response({
+                        'message': f'Purge of attendance history started for class {class_instance.course.name}',
+                        'job': AttendancePurgeJobSerializer(job).data
+                    }, status=status.HTTP_202_ACCEPTED)
+                
+                sessions_count, records_count = purge_class_attendance(class_instance.id)
+                return Response({
+                    'message': f'All attendance sessions deleted for class {class_instance.course.name}',
+                    'sessions_deleted': sessions_count,
+                    'records_deleted': records_count
+                }, status=status.HTTP_200_OK)
+            
             sessions = AttendanceSession.objects.filter(class_instance=class_instance)
             sessions_count = sessions.count()
             records_count = AttendanceRecord.objects.filter(session__class_instance=class_instance).count()
             
-            sessions.delete()
+            with bulk_summary_update(class_instance.id):
+                sessions.delete()
+                
+                # Archived history of the class goes too
+                _, archived_counts = ArchivedAttendanceSession.objects.filter(
+                    class_instance=class_instance
+                ).delete()
+                sessions_count += archived_counts.get(ArchivedAttendanceSession._meta.label, 0)
+                records_count += archived_counts.get(ArchivedAttendanceRecord._meta.label, 0)
+                
+                delete_class_rollups(class_instance.id)
             
             return Response({
                 'message': f'All attendance sessions deleted for class {class_instance.course.name}',
@@ -341,18 +301,35 @@ class DeleteAllAttendanceSessionsView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class AttendancePurgeJobView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    
+    def get(self, request, job_id):
+        """Get the progress of a background attendance purge"""
+        try:
+            teacher = request.user.teacher_profile
+            job = get_object_or_404(
+                AttendancePurgeJob, 
+                id=job_id, 
+                class_instance__teacher=teacher
+            )
+            
+            return Response({
+                'job': AttendancePurgeJobSerializer(job).data
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            return Response(
+                {'error': f'Error retrieving purge job: {str(e)}'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
 class DeleteAttendanceRecordView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
     
     def delete(self, request, record_id):
         """Delete a specific attendance record"""
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             teacher = request.user.teacher_profile
             record = get_object_or_404(
                 AttendanceRecord, 
@@ -369,6 +346,9 @@ class DeleteAttendanceRecordView(APIView):
             }
             
             record.delete()
+            class_history_changed.send(sender=AttendanceRecord, class_ids=[record.session.class_instance_id])
+            if not record.session.is_active:
+                refresh_rollups(record.session.class_instance_id, record.session.date)
             
             return Response({
                 'message': 'Attendance record deleted successfully',
@@ -381,22 +361,88 @@ class DeleteAttendanceRecordView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class GetAllAttendanceSessionsView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+class BulkAttendanceOverrideView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
     
-    def get(self, request, class_id):
-        """Get all attendance sessions for a class"""
+    def patch(self, request, session_id):
+        """Manually set the status of many students in a session at once"""
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
+            teacher = request.user.teacher_profile
+            session = get_object_or_404(
+                AttendanceSession.objects.select_related('class_instance__course'), 
+                id=session_id, 
+                class_instance__teacher=teacher
+            )
+            
+            serializer = BulkAttendanceOverrideSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            
+            changes = {
+                change['student_id']: change['status'] 
+                for change in serializer.validated_data['changes']
+            }
+            
+            with transaction.atomic():
+                records = list(
+                    AttendanceRecord.objects.select_for_update().filter(
+                        session=session,
+                        student_id__in=changes.keys()
+                    )
                 )
+                
+                missing = sorted(set(changes) - {record.student_id for record in records})
+                if missing:
+                    return Response({
+                        'error': 'Some students have no attendance record in this session',
+                        'student_ids': missing
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                
+                now = timezone.now()
+                updated_records = []
+                status_changes = []
+                for record in records:
+                    if record.status == changes[record.student_id]:
+                        continue
+                    status_changes.append((record.student_id, record.status, changes[record.student_id]))
+                    record.status = changes[record.student_id]
+                    record.marked_at = now
+                    record.confidence_score = None  # Manual override, not a recognition match
+                    updated_records.append(record)
+                
+                if updated_records:
+                    AttendanceRecord.objects.bulk_update(
+                        updated_records, ['status', 'marked_at', 'confidence_score']
+                    )
+                    apply_status_changes(session.class_instance_id, status_changes)
+                    refresh_session_bitmap(session.id)
+                    AttendanceSession.objects.filter(id=session.id).touch()
+                    if not session.is_active:
+                        refresh_rollups(session.class_instance_id, session.date)
+                    class_history_changed.send(sender=AttendanceRecord, class_ids=[session.class_instance_id])
             
+            return Response({
+                'message': f'Updated {len(updated_records)} attendance records',
+                'updated_count': len(updated_records),
+                'session': AttendanceSessionSerializer(session).data
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            return Response(
+                {'error': f'Error updating records: {str(e)}'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class GetAllAttendanceSessionsView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    
+    def get(self, request, class_id):
+        """Get all attendance sessions for a class"""
+        try:
             teacher = request.user.teacher_profile
             class_instance = get_object_or_404(Class, id=class_id, teacher=teacher)
             
-            sessions = AttendanceSession.objects.filter(
+            sessions = AttendanceSession.objects.with_totals().filter(
                 class_instance=class_instance
             ).order_by('-date')
             
@@ -404,7 +450,7 @@ class GetAllAttendanceSessionsView(APIView):
             
             return Response({
                 'class_name': class_instance.course.name,
-                'total_sessions': sessions.count(),
+                'total_sessions': len(serializer.data),
                 'sessions': serializer.data
             }, status=status.HTTP_200_OK)
             
@@ -413,3 +459,229 @@ class GetAllAttendanceSessionsView(APIView):
                 {'error': f'Error retrieving sessions: {str(e)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+class ClassAttendanceReportView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    
+    def get(self, request, class_id):
+        """Get per-student attendance totals for a class, aggregated in the database"""
+        try:
+            teacher = request.user.teacher_profile
+            class_instance = get_object_or_404(
+                Class.objects.select_related('course'), 
+                id=class_id, 
+                teacher=teacher
+            )
+            
+            # Classes from archived academic years also read the archive tables
+            record_querysets = records_for_class(class_instance)
+            students = combine_report_rows(
+                ('student_id',), 
+                *(records.by_student() for records in record_querysets)
+            )
+            students.sort(key=lambda row: row['student_roll'])
+            
+            total_sessions = class_instance.attendance_sessions.count()
+            if len(record_querysets) > 1:
+                total_sessions += class_instance.archived_attendance_sessions.count()
+            
+            return Response({
+                'class_name': class_instance.course.name,
+                'course_code': class_instance.course.code,
+                'section': class_instance.section,
+                'total_sessions': total_sessions,
+                'students': students
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            return Response(
+                {'error': f'Error retrieving attendance report: {str(e)}'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class ClassAttendanceHeatmapView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    
+    def get(self, request, class_id):
+        """Get the present count and ratio of every session of a class from the attendance bitmaps"""
+        try:
+            teacher = request.user.teacher_profile
+            class_instance = get_object_or_404(Class, id=class_id, teacher=teacher)
+            
+            return Response({
+                'class_id': class_instance.id,
+                'sessions': session_heatmap(class_instance.id)
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            return Response(
+                {'error': f'Error retrieving heatmap: {str(e)}'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class ClassAttendanceTimelineView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    
+    def get(self, request, class_id):
+        """Get the daily present ratio and per-student weekly grid of a class from the attendance rollups"""
+        try:
+            weeks = request.query_params.get('weeks')
+            if weeks is not None:
+                try:
+                    weeks = int(weeks)
+                except ValueError:
+                    weeks = 0
+                if weeks < 1:
+                    return Response(
+                        {'error': 'weeks must be a positive number'}, 
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+            
+            teacher = request.user.teacher_profile
+            class_instance = get_object_or_404(Class, id=class_id, teacher=teacher)
+            
+            return Response({
+                'class_id': class_instance.id,
+                **class_timeline(class_instance.id, weeks=weeks)
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            return Response(
+                {'error': f'Error retrieving timeline: {str(e)}'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class RecentAttendanceView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    
+    def get(self, request, class_id):
+        """Get which students attended at least k of the last n sessions of a class"""
+        try:
+            try:
+                n = int(request.query_params.get('n', 10))
+                k = int(request.query_params.get('k', n))
+            except ValueError:
+                return Response(
+                    {'error': 'n and k must be numbers'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if n < 1 or k < 0 or k > n:
+                return Response(
+                    {'error': 'n must be positive and k between 0 and n'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            teacher = request.user.teacher_profile
+            class_instance = get_object_or_404(Class, id=class_id, teacher=teacher)
+            
+            students = attended_recent(class_instance.id, n, k)
+            student_info = {
+                student['id']: student 
+                for student in StudentProfile.objects.filter(
+                    id__in=[row['student_id'] for row in students]
+                ).values('id', 'roll_number', 'user__username')
+            }
+            for row in students:
+                row['student_roll'] = student_info[row['student_id']]['roll_number']
+                row['student_name'] = student_info[row['student_id']]['user__username']
+            students.sort(key=lambda row: row['student_roll'])
+            
+            return Response({
+                'n': n,
+                'k': k,
+                'students': students
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            return Response(
+                {'error': f'Error retrieving recent attendance: {str(e)}'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+def _export_response(rows, filename, export_format):
+    """Stream rows as CSV, or send them as an XLSX workbook"""
+    if export_format == 'xlsx':
+        return FileResponse(
+            write_xlsx(rows), 
+            as_attachment=True, 
+            filename=f'{filename}.xlsx', 
+            content_type=XLSX_CONTENT_TYPE
+        )
+    
+    response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+class ClassAttendanceExportView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    
+    def get(self, request, class_id):
+        """Export the attendance register of a class as CSV or XLSX"""
+        try:
+            export_format = request.query_params.get('export_format', 'csv')
+            if export_format not in ('csv', 'xlsx'):
+                return Response(
+                    {'error': 'export_format must be csv or xlsx'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            teacher = request.user.teacher_profile
+            class_instance = get_object_or_404(
+                Class.objects.select_related('course'), 
+                id=class_id, 
+                teacher=teacher
+            )
+            
+            filename = f'attendance_{class_instance.course.code}_{class_instance.section}_{class_instance.batch}'
+            return _export_response(class_register_rows(class_instance), filename, export_format)
+            
+        except ImportError:
+            return Response(
+                {'error': 'XLSX export requires openpyxl to be installed'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': f'Error exporting attendance: {str(e)}'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class DepartmentAttendanceExportView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    
+    def get(self, request):
+        """Export the attendance registers of the teacher's classes in their department"""
+        try:
+            export_format = request.query_params.get('export_format', 'csv')
+            if export_format not in ('csv', 'xlsx'):
+                return Response(
+                    {'error': 'export_format must be csv or xlsx'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            teacher = request.user.teacher_profile
+            department = teacher.department
+            # Only the teacher's own classes; registers of colleagues' classes are not theirs to export
+            classes = Class.objects.filter(
+                teacher=teacher,
+                course__department=department
+            ).select_related('course').order_by('course__code', 'section', 'batch')
+            
+            academic_year = request.query_params.get('academic_year')
+            if academic_year:
+                classes = classes.filter(academic_year=academic_year)
+            
+            filename = f'attendance_{department}'.replace(' ', '_')
+            return _export_response(department_register_rows(classes.iterator()), filename, export_format)
+            
+        except ImportError:
+            return Response(
+                {'error': 'XLSX export requires openpyxl to be installed'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': f'Error exporting attendance: {str(e)}'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'back.settings')
 
 application = get_asgi_application()
+
+if settings.FACE_ENGINE_WARM_UP:
+    # Load the face models while the worker boots, not on its first recognition
+    from back import face_engine
+    face_engine.warm_up()
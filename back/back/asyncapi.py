@@ -0,0 +1,69 @@
+"""
+Base for the async (ASGI) variants of I/O-bound API views.
+
+DRF's APIView only runs synchronously, so under ASGI Django hands every
+APIView to a single shared worker thread. AsyncAPIView is a plain Django
+view with async handlers that keeps the API's behaviour: token
+authentication through the same cache, DRF permission classes, 401 and
+403 responses shaped like DRF's, and DRF's JSON encoding.
+"""
+
+import json
+
+from django.http import JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.utils.encoders import JSONEncoder
+
+from accounts.authentication import CachedTokenAuthentication
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+def request_data(request):
+    """The JSON or form body of a request; None if the JSON cannot be parsed"""
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+    return request.POST.dict()
+
+
+class AsyncAPIView(View):
+    """
+    Subclasses define async handlers (async def get/post). Requests are
+    authenticated and checked against permission_classes before the handler
+    runs; request.user is the token's user.
+    """
+    authentication = CachedTokenAuthentication()
+    permission_classes = []
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token authentication, as DRF's APIView
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            credentials = await self.authentication.aauthenticate(request)
+        except exceptions.AuthenticationFailed as e:
+            return self.unauthorized(e.detail)
+        if credentials is None:
+            return self.unauthorized(exceptions.NotAuthenticated.default_detail)
+
+        request.user, request.auth = credentials
+        for permission in self.permission_classes:
+            permission = permission()
+            if not permission.has_permission(request, self):
+                detail = getattr(permission, 'message', None) or exceptions.PermissionDenied.default_detail
+                return json_response({'detail': str(detail)}, status=403)
+        return await super().dispatch(request, *args, **kwargs)
+
+    def unauthorized(self, detail):
+        response = json_response({'detail': str(detail)}, status=401)
+        response['WWW-Authenticate'] = self.authentication.authenticate_header(None)
+        return response
@@ -0,0 +1,117 @@
+"""
+Database profiles selected with the DB_ENGINE environment variable.
+
+sqlite (default): a single file tuned for concurrent writers. WAL lets
+readers run alongside the writer, synchronous=NORMAL drops the fsync per
+commit (safe under WAL), and writers wait on the busy timeout instead of
+failing with "database is locked". Transactions start IMMEDIATE so a
+writer takes the lock up front rather than failing on a read-to-write
+upgrade. The pragmas run on every new connection.
+
+postgres: persistent connections with health checks, or a psycopg
+connection pool when DB_POOL_MAX_SIZE is set. The pool requires
+psycopg[pool].
+
+Either profile gains a "replica" alias when DB_REPLICA_NAME (sqlite) or
+DB_REPLICA_HOST (postgres) is set. back/replica.py decides which reads
+may use it.
+"""
+
+import copy
+import os
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def sqlite_database(base_dir):
+    busy_timeout = _env_int('SQLITE_BUSY_TIMEOUT', 20)
+    config = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DB_NAME', base_dir / 'db.sqlite3'),
+    }
+    if os.environ.get('SQLITE_TUNING', '1') == '0':
+        # Stock Django settings, kept as a baseline for benchmarks
+        return config
+
+    config['OPTIONS'] = {
+        'timeout': busy_timeout,
+        'transaction_mode': 'IMMEDIATE',
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            f'PRAGMA busy_timeout={busy_timeout * 1000};'
+            f"PRAGMA mmap_size={_env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)};"
+            'PRAGMA cache_size=-20000;'
+            'PRAGMA temp_store=MEMORY;'
+        ),
+    }
+    return config
+
+
+def postgres_database():
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'attendance'),
+        'USER': os.environ.get('DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'connect_timeout': _env_int('DB_CONNECT_TIMEOUT', 5),
+        },
+    }
+
+    pool_max_size = _env_int('DB_POOL_MAX_SIZE', 0)
+    if pool_max_size:
+        from psycopg_pool import ConnectionPool
+
+        # Django hands out pooled connections per request; persistent connections must be off
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS']['pool'] = {
+            'min_size': _env_int('DB_POOL_MIN_SIZE', 2),
+            'max_size': pool_max_size,
+            'timeout': _env_int('DB_POOL_TIMEOUT', 10),
+            'max_idle': _env_int('DB_POOL_MAX_IDLE', 300),
+            'check': ConnectionPool.check_connection,
+        }
+    else:
+        config['CONN_MAX_AGE'] = _env_int('DB_CONN_MAX_AGE', 600)
+    return config
+
+
+def database_config(base_dir):
+    engine = os.environ.get('DB_ENGINE', 'sqlite')
+    if engine == 'sqlite':
+        return sqlite_database(base_dir)
+    if engine == 'postgres':
+        return postgres_database()
+    raise ValueError(f'Unknown DB_ENGINE {engine!r}; expected sqlite or postgres')
+
+
+def replica_config(primary):
+    """The primary's profile pointed at the read replica, or None if none is configured"""
+    config = copy.deepcopy(primary)
+    if primary['ENGINE'] == 'django.db.backends.sqlite3':
+        if not os.environ.get('DB_REPLICA_NAME'):
+            return None
+        config['NAME'] = os.environ['DB_REPLICA_NAME']
+    else:
+        if not os.environ.get('DB_REPLICA_HOST'):
+            return None
+        config['HOST'] = os.environ['DB_REPLICA_HOST']
+        config['PORT'] = os.environ.get('DB_REPLICA_PORT', primary['PORT'])
+
+    # Tests run against one database; the replica alias reads through to it
+    config['TEST'] = {'MIRROR': 'default'}
+    return config
+
+
+def databases_config(base_dir):
+    databases = {'default': database_config(base_dir)}
+    replica = replica_config(databases['default'])
+    if replica is not None:
+        databases['replica'] = replica
+    return databases
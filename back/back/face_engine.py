@@ -0,0 +1,68 @@
+"""
+Lazy facade over face_recognition. Importing face_recognition imports dlib
+and loads its models (HOG detector, landmark predictor, ResNet encoder),
+which costs over a second and ~100 MB per process. Modules call through
+here instead, so only processes that actually detect or encode faces pay
+for it, on first use. Recognition workers call warm_up() to pay it up
+front rather than on their first request. With FACE_ENGINE=fake every call
+goes to back/fake_face_engine.py instead.
+"""
+
+import importlib
+import threading
+
+import numpy as np
+from django.conf import settings
+
+_engine = None
+_lock = threading.Lock()
+_warm_lock = threading.Lock()
+_warm = False
+
+
+def engine():
+    """The face_recognition module, imported on first call, or the fake engine under FACE_ENGINE=fake"""
+    global _engine
+    if settings.FACE_ENGINE == 'fake':
+        return importlib.import_module('back.fake_face_engine')
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                _engine = importlib.import_module('face_recognition')
+    return _engine
+
+
+def loaded():
+    return _engine is not None
+
+
+def face_locations(image, *args, **kwargs):
+    return engine().face_locations(image, *args, **kwargs)
+
+
+def face_encodings(image, *args, **kwargs):
+    return engine().face_encodings(image, *args, **kwargs)
+
+
+def face_distance(face_encodings, face_to_compare):
+    """Euclidean distance of each known encoding to face_to_compare; plain numpy, no models needed"""
+    if len(face_encodings) == 0:
+        return np.empty(0)
+    return np.linalg.norm(face_encodings - face_to_compare, axis=1)
+
+
+def warm_up():
+    """
+    Load the models and run detection and encoding once on a blank frame,
+    so the first real request does not pay for either. Safe to call from
+    every worker thread: the first call does the work and the others wait for it.
+    """
+    global _warm
+    with _warm_lock:
+        if _warm:
+            return
+        module = engine()
+        frame = np.zeros((64, 64, 3), dtype=np.uint8)
+        module.face_locations(frame)
+        module.face_encodings(frame, [(0, 64, 64, 0)])
+        _warm = True
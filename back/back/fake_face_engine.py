@@ -0,0 +1,69 @@
+"""
+Stand-in for face_recognition, selected with FACE_ENGINE=fake, so load
+tests and demos run through the real API without cameras or the models.
+
+A frame exactly ENCODING_SIZE pixels wide carries the encodings of the
+faces it shows, one face per pixel row, each value quantized to a byte
+(see encode_frame); recognition matches them against the class gallery like
+real ones. Any other image shows one face whose encoding is derived from
+its pixels, so uploads work too. Detection and encoding burn
+FACE_ENGINE_FAKE_DETECT_SECONDS per image and FACE_ENGINE_FAKE_ENCODE_SECONDS
+per face of CPU, standing in for the work the models would do.
+"""
+
+import hashlib
+import io
+import time
+
+import numpy as np
+from PIL import Image
+from django.conf import settings
+
+ENCODING_SIZE = 128
+# Encoding values are clipped to +-RANGE before quantizing
+RANGE = 1.0
+
+
+def _burn(seconds):
+    """Keep the CPU busy for seconds, holding the GIL as the models do"""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _pixels(image):
+    image = np.asarray(image)
+    return image if image.ndim == 2 else image[..., 0]
+
+
+def encode_frame(encodings):
+    """PNG bytes of a frame showing one face per encoding"""
+    encodings = np.clip(np.asarray(encodings, dtype=np.float64).reshape(-1, ENCODING_SIZE), -RANGE, RANGE)
+    pixels = np.rint((encodings + RANGE) / (2 * RANGE) * 255).astype(np.uint8)
+    frame = io.BytesIO()
+    Image.fromarray(pixels, mode='L').save(frame, format='PNG')
+    return frame.getvalue()
+
+
+def face_locations(image, *args, **kwargs):
+    _burn(settings.FACE_ENGINE_FAKE_DETECT_SECONDS)
+    height, width = _pixels(image).shape
+    if width == ENCODING_SIZE:
+        return [(row, ENCODING_SIZE, row + 1, 0) for row in range(height)]
+    return [(0, width, height, 0)]
+
+
+def face_encodings(image, known_face_locations=None, *args, **kwargs):
+    pixels = _pixels(image)
+    if known_face_locations is None:
+        known_face_locations = face_locations(image)
+
+    encodings = []
+    for top, right, bottom, left in known_face_locations:
+        _burn(settings.FACE_ENGINE_FAKE_ENCODE_SECONDS)
+        if pixels.shape[1] == ENCODING_SIZE:
+            encodings.append(pixels[top].astype(np.float64) / 255 * (2 * RANGE) - RANGE)
+        else:
+            seed = int.from_bytes(hashlib.sha256(pixels[top:bottom, left:right].tobytes()).digest()[:8], 'little')
+            encodings.append(np.random.default_rng(seed).normal(0, 0.09, ENCODING_SIZE))
+    return encodings
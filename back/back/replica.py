@@ -0,0 +1,216 @@
+"""
+Read-replica routing.
+
+Reads go to the primary unless a view opts in with ReplicaReadMixin, or
+code runs inside use_replica(). Even then a read stays on the primary
+when:
+
+- no "replica" alias is configured,
+- the request has already written (read-your-writes),
+- the same client wrote within the last DB_REPLICA_MAX_LAG seconds,
+- the read runs inside a transaction on the primary,
+- the replica is further behind than DB_REPLICA_MAX_LAG, or its lag
+  cannot be measured.
+
+Writes always go to the primary. Raw cursor writes bypass the router and
+so do not mark the request as having written.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import sha256
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+
+# Seconds a lag measurement is reused before the replica is asked again
+LAG_CHECK_INTERVAL = 1
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        self.replica_reads = False
+        self.wrote = False
+        self.pinned = pinned
+
+
+_state = ContextVar('replica_routing_state', default=None)
+
+
+def _current_state():
+    state = _state.get()
+    if state is None:
+        state = RoutingState()
+        _state.set(state)
+    return state
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def max_lag():
+    return getattr(settings, 'DB_REPLICA_MAX_LAG', 5)
+
+
+def replica_lag(alias=REPLICA):
+    """
+    Seconds the replica is behind the primary, or None if it cannot tell.
+
+    postgres: time since the last replayed transaction, or 0 when every
+    received WAL record has been replayed. sqlite: time since the copy was
+    taken by sync_replica, which stamps it in PRAGMA user_version.
+    """
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT CASE '
+                    'WHEN NOT pg_is_in_recovery() THEN 0 '
+                    'WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+                    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+                )
+                lag = cursor.fetchone()[0]
+                return None if lag is None else float(lag)
+            if connection.vendor == 'sqlite':
+                cursor.execute('PRAGMA user_version')
+                synced_at = cursor.fetchone()[0]
+                return time.time() - synced_at if synced_at else None
+    except Exception:
+        return None
+    return None
+
+
+_last_check = {'at': 0.0, 'lag': None}
+
+
+def replica_fresh():
+    """Whether the replica is within DB_REPLICA_MAX_LAG, measured at most once per LAG_CHECK_INTERVAL"""
+    now = time.monotonic()
+    if now - _last_check['at'] >= LAG_CHECK_INTERVAL:
+        _last_check['lag'] = replica_lag()
+        _last_check['at'] = now
+    lag = _last_check['lag']
+    return lag is not None and lag <= max_lag()
+
+
+def read_alias():
+    """The alias a read in the current context should use"""
+    if not replica_configured():
+        return DEFAULT_DB_ALIAS
+
+    state = _current_state()
+    if not state.replica_reads or state.wrote or state.pinned:
+        return DEFAULT_DB_ALIAS
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    if not replica_fresh():
+        return DEFAULT_DB_ALIAS
+    return REPLICA
+
+
+@contextmanager
+def use_replica():
+    """Let reads in the block use the replica, subject to the guards above"""
+    state = _current_state()
+    previous = state.replica_reads
+    state.replica_reads = True
+    try:
+        yield
+    finally:
+        state.replica_reads = previous
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        _current_state().wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA:
+            return False
+        return None
+
+
+def _pin_timeout():
+    return max(1, int(max_lag() + 0.5))
+
+
+def _client_key(request):
+    identity = request.META.get('HTTP_AUTHORIZATION') or request.META.get('REMOTE_ADDR', '')
+    return f"replica-pin:{sha256(identity.encode()).hexdigest()}"
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Give every request fresh routing state. A client that wrote is pinned
+    to the primary for DB_REPLICA_MAX_LAG seconds so that its next reads
+    see its own writes.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        pin_key = _client_key(request) if replica_configured() else None
+        state = RoutingState(pinned=bool(pin_key and cache.get(pin_key)))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        if pin_key and state.wrote:
+            cache.set(pin_key, True, timeout=_pin_timeout())
+        return response
+
+    async def __acall__(self, request):
+        pin_key = _client_key(request) if replica_configured() else None
+        state = RoutingState(pinned=bool(pin_key and await cache.aget(pin_key)))
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        if pin_key and state.wrote:
+            await cache.aset(pin_key, True, timeout=_pin_timeout())
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    For read-only report APIViews: once the request is authenticated and
+    permitted on the primary, GET and HEAD reads may use the replica.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            _current_state().replica_reads = True
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        _current_state().replica_reads = False
+        return super().finalize_response(request, response, *args, **kwargs)
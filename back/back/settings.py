@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from .database import databases_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -59,7 +61,7 @@ AUTH_USER_MODEL = 'accounts.User'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -73,6 +75,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'back.replica.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -101,13 +104,37 @@ WSGI_APPLICATION = 'back.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# Profile chosen by DB_ENGINE (sqlite or postgres), see back/database.py
+
+DATABASES = databases_config(BASE_DIR)
+
+# Designated report views read from the replica alias when one is configured
+# and no further behind than DB_REPLICA_MAX_LAG seconds, see back/replica.py
+DATABASE_ROUTERS = ['back.replica.ReplicaRouter']
+DB_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 5))
+
+
+# Cache
+# Local memory is per process, so logout, profile and catalogue invalidations
+# would only reach one worker. With more than one worker (WEB_CONCURRENCY, set
+# by gunicorn.conf.py) the shared file backend is the default.
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'file' if WEB_CONCURRENCY > 1 else 'locmem')
+
+if CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', BASE_DIR / 'cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
-}
 
 
 # Password validation
@@ -150,6 +177,26 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Face uploads are stored upright, without metadata, capped in size and
+# re-encoded (JPEG or WEBP), with a thumbnail for list views. See students/images.py
+FACE_IMAGE_FORMAT = os.environ.get('FACE_IMAGE_FORMAT', 'JPEG')
+FACE_IMAGE_MAX_SIZE = 1024
+FACE_IMAGE_QUALITY = 85
+FACE_THUMBNAIL_SIZE = 160
+FACE_THUMBNAIL_QUALITY = 75
+# face_recognition is imported on first use (back/face_engine.py). Set
+# FACE_ENGINE_WARM_UP=1 on recognition workers to load it while they boot
+FACE_ENGINE_WARM_UP = os.environ.get('FACE_ENGINE_WARM_UP', '') == '1'
+# FACE_ENGINE=fake swaps in back/fake_face_engine.py for load tests (load_test
+# command); it burns these seconds of CPU per image and per face
+FACE_ENGINE = os.environ.get('FACE_ENGINE', 'face_recognition')
+FACE_ENGINE_FAKE_DETECT_SECONDS = float(os.environ.get('FACE_ENGINE_FAKE_DETECT_SECONDS', '0'))
+FACE_ENGINE_FAKE_ENCODE_SECONDS = float(os.environ.get('FACE_ENGINE_FAKE_ENCODE_SECONDS', '0'))
+# Per-class face gallery snapshots that workers map read-only (attendance/gallery.py)
+FACE_GALLERY_DIR = os.environ.get('FACE_GALLERY_DIR', BASE_DIR / 'galleries')
+# Perceptual hashes this many bits apart or fewer count as the same photo
+FACE_IMAGE_DUPLICATE_DISTANCE = 4
+
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
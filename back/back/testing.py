@@ -0,0 +1,160 @@
+"""
+Shared test helpers: a seeded multi-class dataset and assertions that keep
+endpoint query counts and query plans from regressing.
+"""
+
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from attendance.bitmaps import rebuild_class_bitmaps
+from attendance.models import AttendanceSession, AttendanceRecord
+from attendance.rollups import rebuild_class_rollups
+from attendance.summary import rebuild_class_summaries
+from students.models import StudentProfile, StudentFaceImage
+from teachers.models import TeacherProfile, Course, Class, ClassEnrollment
+
+# Tables large enough in production that a full scan is a regression
+GUARDED_TABLES = [
+    AttendanceRecord._meta.db_table,
+    AttendanceSession._meta.db_table,
+    ClassEnrollment._meta.db_table,
+    StudentFaceImage._meta.db_table,
+]
+
+
+def seed_dataset(classes=8, students_per_class=40, sessions_per_class=20, images_per_student=2):
+    """
+    Bulk-create a department with one teacher per class, a separate roster
+    per class, ended sessions where every other student is present, and
+    face image rows (without files) for every student. Derived summary,
+    bitmap and rollup tables are rebuilt as the management commands would.
+    """
+    password = make_password(None)
+    department = 'Computer Science'
+
+    teacher_users = User.objects.bulk_create([
+        User(username=f'seed-teacher-{index}', password=password, role='TEACHER')
+        for index in range(classes)
+    ])
+    teachers = TeacherProfile.objects.bulk_create([
+        TeacherProfile(user=user, employee_id=f'SEED{index:04d}', department=department, designation='Lecturer')
+        for index, user in enumerate(teacher_users)
+    ])
+    courses = Course.objects.bulk_create([
+        Course(code=f'SEED{index:03d}', name=f'Seeded Course {index}', department=department, semester=5)
+        for index in range(classes)
+    ])
+    class_instances = Class.objects.bulk_create([
+        Class(teacher=teacher, course=course, section='A', batch='2021', semester=5, academic_year='2024-25')
+        for teacher, course in zip(teachers, courses)
+    ])
+
+    student_users = User.objects.bulk_create([
+        User(username=f'seed-student-{index}', password=password, role='STUDENT')
+        for index in range(classes * students_per_class)
+    ])
+    students = StudentProfile.objects.bulk_create([
+        StudentProfile(user=user, roll_number=f'SEED{index:06d}', department=department, semester=5, batch='2021')
+        for index, user in enumerate(student_users)
+    ])
+    rosters = [
+        students[index * students_per_class:(index + 1) * students_per_class]
+        for index in range(classes)
+    ]
+
+    ClassEnrollment.objects.bulk_create([
+        ClassEnrollment(student=student, class_instance=class_instance)
+        for class_instance, roster in zip(class_instances, rosters)
+        for student in roster
+    ], batch_size=1000)
+    StudentFaceImage.objects.bulk_create([
+        StudentFaceImage(student=student, image=f'student_faces/seed-{student.id}-{index}.jpg', is_primary=index == 0)
+        for student in students
+        for index in range(images_per_student)
+    ], batch_size=1000)
+
+    sessions = AttendanceSession.objects.bulk_create([
+        AttendanceSession(class_instance=class_instance, date=date(2024, 1, 1) + timedelta(days=offset), is_active=False)
+        for class_instance in class_instances
+        for offset in range(sessions_per_class)
+    ], batch_size=1000)
+    roster_by_class = {class_instance.id: roster for class_instance, roster in zip(class_instances, rosters)}
+    AttendanceRecord.objects.bulk_create([
+        AttendanceRecord(session=session, student=student, status='PRESENT' if index % 2 == 0 else 'ABSENT')
+        for session in sessions
+        for index, student in enumerate(roster_by_class[session.class_instance_id])
+    ], batch_size=2000)
+
+    for class_instance in class_instances:
+        rebuild_class_summaries(class_instance.id)
+        rebuild_class_bitmaps(class_instance.id)
+        rebuild_class_rollups(class_instance.id)
+
+    return {
+        'teachers': teachers,
+        'classes': class_instances,
+        'rosters': rosters,
+        'sessions': sessions,
+    }
+
+
+def token_client(user):
+    """APIClient authenticated the way the frontend is, so auth queries count towards the budget"""
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.get_or_create(user=user)[0].key}')
+    return client
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class QueryBudgetMixin:
+    """Assertions for TestCase classes guarding query counts and index usage"""
+
+    def setUp(self):
+        super().setUp()
+        # Cached responses from earlier tests can carry this test's (reused) ids
+        cache.clear()
+
+    def assertQueryBudget(self, max_queries, func):
+        """
+        Run func, fail if it takes more than max_queries queries or if any
+        SELECT fully scans a guarded table. Returns func's result.
+        """
+        with CaptureQueriesContext(connection) as context:
+            result = func()
+
+        queries = [query['sql'] for query in context.captured_queries]
+        self.assertLessEqual(
+            len(queries), max_queries,
+            f'{len(queries)} queries over a budget of {max_queries}:\n' + '\n'.join(queries)
+        )
+
+        if connection.vendor == 'sqlite':
+            for sql in queries:
+                if not sql.startswith('SELECT'):
+                    continue
+                for step in query_plan(sql):
+                    for table in GUARDED_TABLES:
+                        self.assertFalse(
+                            step == f'SCAN {table}' or step.startswith(f'SCAN {table} '),
+                            f'Full scan of {table} ({step}) in:\n{sql}'
+                        )
+        return result
+
+    def assertUsesIndex(self, queryset, index_name):
+        """Fail unless the query plan of queryset reads through index_name"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plan checks are written against SQLite')
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f'{index_name} not used by:\n{queryset.query}\n{plan}')
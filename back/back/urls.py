@@ -25,6 +25,7 @@ urlpatterns = [
     path('api/students/', include('students.urls')),
     path('api/teachers/', include('teachers.urls')),
     path('api/attendance/', include('attendance.urls')),
+    path('api/admin-dashboard/', include('admin_dashboard.urls')),
 ]
 
 # Serve media files during development
@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'back.settings')
 
 application = get_wsgi_application()
+
+if settings.FACE_ENGINE_WARM_UP:
+    # Load the face models while the worker boots, not on its first recognition
+    from back import face_engine
+    face_engine.warm_up()
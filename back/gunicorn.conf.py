@@ -0,0 +1,35 @@
+"""
+Gunicorn settings, picked up when gunicorn starts in this directory:
+
+    gunicorn back.wsgi
+    gunicorn back.asgi -k uvicorn.workers.UvicornWorker
+
+The app is loaded in the master before workers are forked (preload_app),
+with the face models warmed up and gallery snapshots published. Workers
+inherit the loaded models copy-on-write and map the snapshots read-only,
+so adding workers does not add a copy of either.
+"""
+
+import gc
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+preload_app = True
+
+# Read by back/wsgi.py and back/asgi.py while the master imports them
+os.environ.setdefault('FACE_ENGINE_WARM_UP', '1')
+# Read by back/settings.py, which picks a cache shared by all workers when there are several
+os.environ.setdefault('WEB_CONCURRENCY', str(workers))
+
+
+def when_ready(server):
+    from django.db import connections
+
+    from attendance.gallery import publish_galleries
+
+    server.log.info('Published %d gallery snapshots', publish_galleries())
+    # Workers must open their own database connections
+    connections.close_all()
+    # Keep the collector from writing to every preloaded object in each worker
+    gc.freeze()
@@ -0,0 +1,69 @@
+"""
+Async variants of the student dashboard endpoints for ASGI deployments.
+They share their queries and payloads with the APIViews in views.py
+through payloads.py.
+"""
+
+from asgiref.sync import sync_to_async
+from rest_framework import status, permissions
+
+from accounts.permissions import IsStudent
+from back.asyncapi import AsyncAPIView, json_response
+from back.replica import use_replica
+from teachers.models import ClassEnrollment
+from .payloads import enrolled_classes_data, attendance_records_data, class_attendance_data
+
+
+class AsyncStudentEnrollmentView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
+    
+    async def get(self, request):
+        """Get student's enrolled classes"""
+        try:
+            return json_response(await sync_to_async(enrolled_classes_data)(request.user.student_profile))
+        
+        except Exception as e:
+            return json_response(
+                {'error': f'Error retrieving enrolled classes: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class AsyncStudentAttendanceRecordsView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
+    
+    async def get(self, request):
+        """Get all attendance records for the authenticated student"""
+        try:
+            with use_replica():
+                data = await sync_to_async(attendance_records_data)(request.user.student_profile)
+            
+            return json_response(data)
+        
+        except Exception as e:
+            return json_response(
+                {'error': f'Error retrieving attendance records: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class AsyncStudentClassAttendanceView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
+    
+    async def get(self, request, class_id):
+        """Get attendance records for a specific class"""
+        try:
+            try:
+                with use_replica():
+                    data = await sync_to_async(class_attendance_data)(request.user.student_profile, class_id)
+            except ClassEnrollment.DoesNotExist:
+                return json_response(
+                    {'error': 'You are not enrolled in this class'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            
+            return json_response(data)
+        
+        except Exception as e:
+            return json_response(
+                {'error': f'Error retrieving class attendance: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
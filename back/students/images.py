@@ -0,0 +1,102 @@
+"""
+Face image normalisation. Uploads are stored as a canonical image: EXIF
+orientation applied, metadata dropped, RGB, longest side capped and
+re-encoded as JPEG or WebP. List views use a small thumbnail instead.
+
+Stored files are content addressed: each is named after the sha256 of its
+bytes, so the same photo uploaded twice is one blob on disk. Rows share
+blobs, so deleting a row leaves its files for gc_face_images to collect.
+"""
+
+import hashlib
+import io
+import os
+
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+
+def image_format():
+    return settings.FACE_IMAGE_FORMAT.upper()
+
+
+def normalize(file):
+    """The upright RGB image in file, no larger than FACE_IMAGE_MAX_SIZE on its longest side"""
+    image = Image.open(file)
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    image.thumbnail((settings.FACE_IMAGE_MAX_SIZE, settings.FACE_IMAGE_MAX_SIZE), Image.LANCZOS)
+    return image
+
+
+def _encode(image, quality):
+    # Only pixels are written: no EXIF, ICC profile or comments carry over
+    clean = Image.new('RGB', image.size)
+    clean.paste(image)
+    output = io.BytesIO()
+    clean.save(output, format=image_format(), quality=quality, optimize=True)
+
+    content = output.getvalue()
+    return ContentFile(content, name=content_name(content_hash(content), f'.{EXTENSIONS[image_format()]}'))
+
+
+def canonical_file(image):
+    return _encode(image, settings.FACE_IMAGE_QUALITY)
+
+
+def thumbnail_file(image):
+    thumbnail = image.copy()
+    thumbnail.thumbnail((settings.FACE_THUMBNAIL_SIZE, settings.FACE_THUMBNAIL_SIZE), Image.LANCZOS)
+    return _encode(thumbnail, settings.FACE_THUMBNAIL_QUALITY)
+
+
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def content_name(digest, extension):
+    """Storage name for content with this hash, sharded by its first two digits"""
+    return f'{digest[:2]}/{digest}{extension.lower()}'
+
+
+def perceptual_hash(image):
+    """
+    64-bit difference hash as 16 hex digits: one bit per neighbouring pixel
+    pair of a 9x8 greyscale copy. Re-encoding, resizing or recompressing a
+    photo flips few bits, unlike its content hash.
+    """
+    pixels = list(image.convert('L').resize((9, 8), Image.LANCZOS).getdata())
+    bits = 0
+    for row in range(8):
+        for column in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + column] > pixels[row * 9 + column + 1])
+    return f'{bits:016x}'
+
+
+def hash_distance(a, b):
+    """Number of differing bits between two perceptual hashes"""
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File storage where a name already taken holds the same bytes, so it is reused rather than rewritten"""
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            # Fresh mtime keeps gc_face_images' grace period covering the row about to refer to it
+            os.utime(self.path(name))
+            return name
+        return super()._save(name, content)
+
+
+_storage = ContentAddressedStorage()
+
+
+def face_storage():
+    return _storage
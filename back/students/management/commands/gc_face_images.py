@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from students.images import face_storage
+from students.models import StudentFaceImage
+
+ROOT = 'student_faces'
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete face image blobs and thumbnails under student_faces/ that no face image refers to. '
+        'Rows share content-addressed blobs, so deleting a row leaves its files for this command.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+        parser.add_argument(
+            '--grace', type=int, default=3600,
+            help='Keep files modified in the last this many seconds; an upload writes its blob before its row (default: 3600)'
+        )
+
+    def handle(self, *args, **options):
+        storage = face_storage()
+        referenced = set()
+        for image, thumbnail in StudentFaceImage.objects.values_list('image', 'thumbnail').iterator():
+            referenced.update((image, thumbnail))
+
+        cutoff = timezone.now() - timedelta(seconds=options['grace'])
+        removed = kept = freed = 0
+        for name in self.walk(storage, ROOT):
+            if name in referenced:
+                kept += 1
+                continue
+            if storage.get_modified_time(name) > cutoff:
+                continue
+
+            freed += storage.size(name)
+            removed += 1
+            if not options['dry_run']:
+                storage.delete(name)
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {removed} unreferenced face image files ({freed / 1024:.0f} KiB), {kept} in use'
+        ))
+
+    def walk(self, storage, path):
+        if not storage.exists(path):
+            return
+        directories, files = storage.listdir(path)
+        for file_name in files:
+            yield f'{path}/{file_name}'
+        for directory in directories:
+            yield from self.walk(storage, f'{path}/{directory}')
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from students.images import normalize, canonical_file, thumbnail_file, content_hash, perceptual_hash
+from students.models import StudentFaceImage
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-encode face images stored before upload normalisation into canonical images with '
+        'thumbnails under content-hash names, and report the storage saved. Images that already '
+        'have a thumbnail and a content hash are skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Also re-encode images that were already normalised')
+
+    def handle(self, *args, **options):
+        face_images = StudentFaceImage.objects.exclude(image='').order_by('id')
+        if not options['force']:
+            face_images = face_images.filter(Q(thumbnail='') | Q(content_hash=''))
+
+        converted = missing = 0
+        bytes_before = bytes_after = 0
+        for face_image in face_images.iterator():
+            storage = face_image.image.storage
+            old_name = face_image.image.name
+            if not storage.exists(old_name):
+                missing += 1
+                continue
+
+            bytes_before += storage.size(old_name)
+            with storage.open(old_name) as file:
+                image = normalize(file)
+
+            old_names = {old_name, face_image.thumbnail.name} - {''}
+            canonical = canonical_file(image)
+            digest = content_hash(canonical.read())
+            canonical.seek(0)
+            thumbnail = thumbnail_file(image)
+            face_image.image.save(canonical.name, canonical, save=False)
+            face_image.thumbnail.save(thumbnail.name, thumbnail, save=False)
+            bytes_after += storage.size(face_image.image.name) + storage.size(face_image.thumbnail.name)
+
+            # update() keeps the stored encoding; save() would detect the face again
+            StudentFaceImage.objects.filter(id=face_image.id).update(
+                image=face_image.image.name, thumbnail=face_image.thumbnail.name,
+                content_hash=digest, perceptual_hash=perceptual_hash(image)
+            )
+            # Blobs are shared: only delete old files no other row still refers to
+            old_names -= {face_image.image.name, face_image.thumbnail.name}
+            for name in old_names:
+                if not StudentFaceImage.objects.filter(Q(image=name) | Q(thumbnail=name)).exists():
+                    storage.delete(name)
+            converted += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Normalised {converted} face images ({missing} files missing): '
+            f'{bytes_before / 1024:.0f} KiB before, {bytes_after / 1024:.0f} KiB after including thumbnails'
+        ))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0004_alter_studentfaceimage_unique_together'),
+    ]
+
+    operations = [
+        # Add the composite index before dropping the single-column one it replaces
+        migrations.AddIndex(
+            model_name='studentfaceimage',
+            index=models.Index(fields=['student', 'is_primary'], name='faceimage_student_primary_idx'),
+        ),
+        migrations.AlterField(
+            model_name='studentfaceimage',
+            name='student',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='face_images', to='students.studentprofile'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentfaceimage',
+            name='thumbnail',
+            field=models.ImageField(blank=True, upload_to='student_faces/thumbnails/'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:48
+
+import students.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0006_face_image_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentfaceimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='studentfaceimage',
+            name='perceptual_hash',
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AlterField(
+            model_name='studentfaceimage',
+            name='image',
+            field=models.ImageField(storage=students.images.face_storage, upload_to='student_faces/'),
+        ),
+        migrations.AlterField(
+            model_name='studentfaceimage',
+            name='thumbnail',
+            field=models.ImageField(blank=True, storage=students.images.face_storage, upload_to='student_faces/thumbnails/'),
+        ),
+    ]
@@ -1,10 +1,13 @@
 from django.db import models
 from accounts.models import User
-import face_recognition
+from back import face_engine
 import numpy as np
 from PIL import Image
 import io
+import os
 import base64
+from django.conf import settings
+from .images import normalize, thumbnail_file, content_hash, content_name, perceptual_hash, hash_distance, face_storage
 
 class StudentProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='student_profile')
@@ -17,15 +20,23 @@ class StudentProfile(models.Model):
         return f"{self.user.username} - {self.roll_number}"
 
 class StudentFaceImage(models.Model):
-    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='face_images')
-    image = models.ImageField(upload_to='student_faces/')
+    # Indexed through faceimage_student_primary_idx
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='face_images', db_index=False)
+    # Named by content hash and shared between rows with the same bytes
+    image = models.ImageField(upload_to='student_faces/', storage=face_storage)
+    # Small copy of image for list views, made on save
+    thumbnail = models.ImageField(upload_to='student_faces/thumbnails/', storage=face_storage, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)  # sha256 of the stored image
+    perceptual_hash = models.CharField(max_length=16, blank=True)  # dHash, close for near-identical photos
     face_encoding = models.TextField(blank=True, null=True)  # Store face encoding as base64 string
     is_primary = models.BooleanField(default=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        # Remove the problematic unique constraint
-        pass
+        indexes = [
+            # A student's images, primary first
+            models.Index(fields=['student', 'is_primary'], name='faceimage_student_primary_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         # If this is being set as primary, remove primary from other images
@@ -35,11 +46,57 @@ class StudentFaceImage(models.Model):
                 is_primary=True
             ).exclude(id=self.id).update(is_primary=False)
         
-        if self.image:
-            # Process the image and extract face encoding
+        if self.image and not self.image._committed:
+            # A new file: reuse an earlier upload of the same bytes, or detect the face
+            self.record_hashes()
+            self.thumbnail = None
+            if not self.reuse_earlier_upload():
+                self.extract_face_encoding()
+        elif self.image and not self.face_encoding:
             self.extract_face_encoding()
+        
+        if self.image and not self.thumbnail:
+            self.make_thumbnail()
         super().save(*args, **kwargs)
     
+    def record_hashes(self):
+        """Hash the newly assigned image and name it after its content"""
+        self.image.seek(0)
+        self.content_hash = content_hash(self.image.read())
+        self.image.seek(0)
+        self.perceptual_hash = perceptual_hash(normalize(self.image))
+        self.image.seek(0)
+        self.image.name = content_name(self.content_hash, os.path.splitext(self.image.name)[1])
+    
+    def reuse_earlier_upload(self):
+        """Point at the stored blob, thumbnail and encoding of an earlier image with the same content hash"""
+        earlier = StudentFaceImage.objects.filter(
+            content_hash=self.content_hash,
+            face_encoding__isnull=False
+        ).exclude(face_encoding='').exclude(pk=self.pk).first()
+        if earlier is None:
+            return False
+        
+        self.image = earlier.image.name
+        self.thumbnail = earlier.thumbnail.name
+        self.face_encoding = earlier.face_encoding
+        return True
+    
+    @classmethod
+    def find_duplicate(cls, student, content_hash, perceptual_hash):
+        """The student's image with the same content, or within FACE_IMAGE_DUPLICATE_DISTANCE bits of perceptual_hash"""
+        for face_image in cls.objects.filter(student=student).exclude(perceptual_hash=''):
+            if face_image.content_hash == content_hash:
+                return face_image
+            if hash_distance(face_image.perceptual_hash, perceptual_hash) <= settings.FACE_IMAGE_DUPLICATE_DISTANCE:
+                return face_image
+        return None
+    
+    def make_thumbnail(self):
+        self.image.seek(0)
+        self.thumbnail = thumbnail_file(normalize(self.image))
+        self.image.seek(0)
+    
     def extract_face_encoding(self):
         """Extract face encoding from the uploaded image"""
         try:
@@ -48,11 +105,11 @@ class StudentFaceImage(models.Model):
             image_array = np.array(image)
             
             # Find face locations and encodings
-            face_locations = face_recognition.face_locations(image_array)
+            face_locations = face_engine.face_locations(image_array)
             
             if face_locations:
                 # Get the first face encoding
-                face_encodings = face_recognition.face_encodings(image_array, face_locations)
+                face_encodings = face_engine.face_encodings(image_array, face_locations)
                 if face_encodings:
                     # Convert numpy array to base64 string for storage
                     encoding_bytes = face_encodings[0].tobytes()
@@ -0,0 +1,128 @@
+"""
+Queries and response bodies of the student dashboard endpoints, shared by
+the APIViews in views.py and their async variants in async_views.py (which
+run them through sync_to_async).
+"""
+
+from attendance.models import AttendanceRecord, ArchivedAttendanceRecord
+from attendance.summary import combine_report_rows
+from teachers.models import Class, ClassEnrollment
+from teachers.serializers import ClassSerializer
+
+
+def enrolled_classes_data(student):
+    enrolled_classes = Class.objects.with_enrolled_count().filter(
+        enrollments__student=student,
+        enrollments__is_active=True
+    ).order_by('enrollments__enrolled_at')
+
+    return {'enrolled_classes': ClassSerializer(enrolled_classes, many=True).data}
+
+
+def attendance_records_data(student):
+    """The student's records grouped by class, with each class's counters"""
+    # Counters come from the report layer over the live and archive tables;
+    # classes from archived academic years keep their records in the archive
+    live_rows = AttendanceRecord.objects.filter(student=student).by_class()
+    archived_rows = list(ArchivedAttendanceRecord.objects.filter(student=student).by_class())
+    rows = sorted(
+        combine_report_rows(('class_id',), live_rows, archived_rows),
+        key=lambda row: (row['course_code'], row['section'])
+    )
+
+    records_by_class = {
+        row['class_id']: {
+            'class_id': row['class_id'],
+            'class_name': row['class_name'],
+            'course_code': row['course_code'],
+            'section': row['section'],
+            'total_sessions': row['total_sessions'],
+            'present_count': row['present_count'],
+            'absent_count': row['absent_count'],
+            'attendance_percentage': row['attendance_percentage'],
+            'records': []
+        }
+        for row in rows
+    }
+
+    attendance_records = list(AttendanceRecord.objects.filter(
+        student=student
+    ).select_related('session').order_by('-session__date'))
+    if archived_rows:
+        attendance_records += ArchivedAttendanceRecord.objects.filter(
+            student=student
+        ).select_related('session').order_by('-session__date')
+
+    for record in attendance_records:
+        records_by_class[record.session.class_instance_id]['records'].append({
+            'id': record.id,
+            'date': record.session.date,
+            'status': record.status,
+            'marked_at': record.marked_at,
+            'confidence_score': record.confidence_score
+        })
+
+    return {
+        'total_classes': len(records_by_class),
+        'attendance_by_class': list(records_by_class.values())
+    }
+
+
+def class_attendance_data(student, class_id):
+    """
+    The student's records and counters for one class. Raises
+    ClassEnrollment.DoesNotExist if the student is not enrolled in it.
+    """
+    enrollment = ClassEnrollment.objects.select_related(
+        'class_instance__course', 'class_instance__teacher__user'
+    ).get(
+        student=student,
+        class_instance__id=class_id,
+        is_active=True
+    )
+    class_instance = enrollment.class_instance
+
+    # Records of closed academic years are in the archive
+    row_lists = {
+        record_model: list(record_model.objects.filter(
+            student=student,
+            session__class_instance=class_instance
+        ).report('student_id'))
+        for record_model in (AttendanceRecord, ArchivedAttendanceRecord)
+    }
+    rows = combine_report_rows(('student_id',), *row_lists.values())
+    summary = rows[0] if rows else {
+        'total_sessions': 0, 'present_count': 0, 'absent_count': 0, 'attendance_percentage': 0
+    }
+
+    attendance_records = []
+    for record_model, report_rows in row_lists.items():
+        if report_rows:
+            attendance_records += record_model.objects.filter(
+                student=student,
+                session__class_instance=class_instance
+            ).select_related('session').order_by('-session__date')
+
+    return {
+        'class_info': {
+            'id': class_instance.id,
+            'course_name': class_instance.course.name,
+            'course_code': class_instance.course.code,
+            'section': class_instance.section,
+            'teacher': class_instance.teacher.user.username
+        },
+        'attendance_summary': {
+            'total_sessions': summary['total_sessions'],
+            'present_count': summary['present_count'],
+            'absent_count': summary['absent_count'],
+            'attendance_percentage': summary['attendance_percentage']
+        },
+        'records': [{
+            'id': record.id,
+            'date': record.session.date,
+            'status': record.status,
+            'marked_at': record.marked_at,
+            'confidence_score': record.confidence_score,
+            'session_id': record.session.id
+        } for record in attendance_records]
+    }
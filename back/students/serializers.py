@@ -1,9 +1,9 @@
 from rest_framework import serializers
 from .models import StudentProfile, StudentFaceImage
 from django.core.files.uploadedfile import InMemoryUploadedFile
-import face_recognition
+from back import face_engine
 import numpy as np
-from PIL import Image
+from .images import normalize, canonical_file, content_hash, perceptual_hash
 
 class StudentProfileSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
@@ -30,6 +30,9 @@ class StudentProfileSerializer(serializers.ModelSerializer):
         return value
 
 class StudentFaceImageSerializer(serializers.ModelSerializer):
+    # The student's stored image that the upload repeats, set by validate_image
+    duplicate = None
+    
     class Meta:
         model = StudentFaceImage
         fields = ['id', 'image', 'is_primary', 'uploaded_at']
@@ -49,12 +52,26 @@ class StudentFaceImageSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("File must be an image.")
         
         try:
-            # Open and process the image to check for faces
-            image = Image.open(value)
+            # Detect on the upright, size-capped image that will be stored
+            image = normalize(value)
+            canonical = canonical_file(image)
+            digest = content_hash(canonical.read())
+            canonical.seek(0)
+            
+            self.duplicate = StudentFaceImage.find_duplicate(
+                self.context['request'].user.student_profile, digest, perceptual_hash(image)
+            )
+            seen = StudentFaceImage.objects.filter(
+                content_hash=digest, face_encoding__isnull=False
+            ).exclude(face_encoding='').exists()
+            if self.duplicate is not None or seen:
+                # An earlier upload of this photo already passed face detection
+                return canonical
+            
             image_array = np.array(image)
             
             # Find face locations
-            face_locations = face_recognition.face_locations(image_array)
+            face_locations = face_engine.face_locations(image_array)
             
             if not face_locations:
                 raise serializers.ValidationError("No face detected in the image. Please upload a clear image with your face visible.")
@@ -67,9 +84,8 @@ class StudentFaceImageSerializer(serializers.ModelSerializer):
                 raise e
             raise serializers.ValidationError(f"Error processing image: {str(e)}")
         
-        # Reset file pointer
-        value.seek(0)
-        return value
+        # Store the canonical re-encoding instead of the upload
+        return canonical
     
     def create(self, validated_data):
         # Get the student from the request user
@@ -87,14 +103,22 @@ class StudentFaceImageSerializer(serializers.ModelSerializer):
 
 class StudentFaceImageListSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
     
     class Meta:
         model = StudentFaceImage
-        fields = ['id', 'image_url', 'is_primary', 'uploaded_at']
+        fields = ['id', 'image_url', 'thumbnail_url', 'is_primary', 'uploaded_at']
     
     def get_image_url(self, obj):
-        if obj.image:
+        return self._absolute_url(obj.image)
+    
+    def get_thumbnail_url(self, obj):
+        # Images saved before thumbnails existed fall back to the full image
+        return self._absolute_url(obj.thumbnail or obj.image)
+    
+    def _absolute_url(self, field_file):
+        if field_file:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(obj.image.url)
+                return request.build_absolute_uri(field_file.url)
         return None
\ No newline at end of file
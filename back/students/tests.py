@@ -1,3 +1,234 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from PIL import Image, ImageDraw
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from accounts.models import User
+from back.testing import QueryBudgetMixin, seed_dataset, token_client
+from .models import StudentProfile, StudentFaceImage
+
+
+class StudentQueryBudgetTests(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_dataset()
+        cls.class_instance = data['classes'][3]
+        cls.student = data['rosters'][3][4]
+
+    def setUp(self):
+        super().setUp()
+        self.client = token_client(self.student.user)
+
+    def test_face_images(self):
+        response = self.assertQueryBudget(3, lambda: self.client.get('/api/students/face-images/'))
+        self.assertEqual(response.data['count'], 2)
+
+    def test_attendance_records(self):
+        response = self.assertQueryBudget(4, lambda: self.client.get('/api/students/attendance/'))
+        self.assertEqual(len(response.data['attendance_by_class'][0]['records']), 20)
+
+    def test_class_attendance(self):
+        response = self.assertQueryBudget(
+            5, lambda: self.client.get(f'/api/students/attendance/class/{self.class_instance.id}/')
+        )
+        self.assertEqual(len(response.data['records']), 20)
+
+    def test_primary_image_lookup_uses_composite_index(self):
+        self.assertUsesIndex(
+            StudentFaceImage.objects.filter(student=self.student, is_primary=True),
+            'faceimage_student_primary_idx'
+        )
+
+
+class AsyncDashboardTests(TestCase):
+
+    def setUp(self):
+        dataset = seed_dataset(classes=2, students_per_class=5, sessions_per_class=3)
+        self.class_instance = dataset['classes'][0]
+        self.client = token_client(dataset['rosters'][0][0].user)
+        self.authorization = f"Token {Token.objects.get(user=dataset['rosters'][0][0].user).key}"
+
+    def test_dashboards_match_sync_views(self):
+        for path in ('enrollments/', 'attendance/', f'attendance/class/{self.class_instance.id}/'):
+            sync_response = self.client.get(f'/api/students/{path}')
+            async_response = self.client.get(f'/api/students/async/{path}')
+            self.assertEqual(async_response.status_code, 200, path)
+            self.assertEqual(async_response.json(), sync_response.json(), path)
+
+    async def test_serves_under_the_async_client(self):
+        from django.test import AsyncClient
+
+        response = await AsyncClient().get('/api/students/async/attendance/', headers={'Authorization': self.authorization})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['attendance_by_class']), 1)
+
+
+class FaceImagePipelineTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.media_root = media_root
+
+        self.engine = {}
+        for target, value in (
+            ('back.face_engine.face_locations', [(0, 10, 10, 0)]),
+            ('back.face_engine.face_encodings', [np.zeros(128)]),
+        ):
+            patcher = mock.patch(target, return_value=value)
+            self.engine[target.rsplit('.', 1)[1]] = patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.student = self.make_student('student', 'CSE2021001')
+        self.client = token_client(self.student.user)
+
+    def make_student(self, username, roll_number):
+        user = User.objects.create_user(username, password='pass', role='STUDENT')
+        return StudentProfile.objects.create(
+            user=user, roll_number=roll_number, department='Computer Science', semester=5, batch='2021'
+        )
+
+    def phone_photo(self):
+        """A noisy 3000x1500 JPEG of a face shot sideways: EXIF says rotate 90 degrees, plus a camera model"""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x0110] = 'Phone'
+        picture = Image.linear_gradient('L').resize((3000, 1500)).convert('RGB')
+        draw = ImageDraw.Draw(picture)
+        draw.ellipse((800, 400, 1900, 1100), fill=(200, 160, 140))
+        draw.ellipse((1100, 550, 1200, 650), fill=(20, 20, 20))
+        draw.ellipse((1100, 850, 1200, 950), fill=(20, 20, 20))
+        picture = Image.blend(picture, Image.effect_noise((3000, 1500), 64).convert('RGB'), 0.3)
+
+        output = io.BytesIO()
+        picture.save(output, format='JPEG', quality=95, exif=exif.tobytes())
+        return output.getvalue()
+
+    def upload(self, client, content):
+        return client.post('/api/students/face-images/', {
+            'image': SimpleUploadedFile('selfie.jpg', content, content_type='image/jpeg')
+        })
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), self.media_root)
+            for directory, _, names in os.walk(self.media_root) for name in names
+        )
+
+    def test_upload_stores_upright_capped_image_without_metadata(self):
+        original = self.phone_photo()
+        response = self.client.post('/api/students/face-images/', {
+            'image': SimpleUploadedFile('selfie.png', original, content_type='image/jpeg')
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+
+        face_image = StudentFaceImage.objects.get(student=self.student)
+        self.assertTrue(face_image.image.name.endswith('.jpg'))
+        with Image.open(face_image.image.path) as stored:
+            self.assertEqual(stored.format, 'JPEG')
+            self.assertEqual(stored.size, (512, 1024))
+            self.assertEqual(dict(stored.getexif()), {})
+        self.assertLess(face_image.image.size, len(original) / 2)
+
+        with Image.open(face_image.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (80, 160))
+
+        images = self.client.get('/api/students/face-images/').data['images']
+        self.assertTrue(images[0]['thumbnail_url'].endswith(face_image.thumbnail.url))
+        self.assertTrue(images[0]['image_url'].endswith(face_image.image.url))
+
+    @override_settings(FACE_IMAGE_FORMAT='WEBP')
+    def test_webp_format(self):
+        self.client.post('/api/students/face-images/', {
+            'image': SimpleUploadedFile('selfie.jpg', self.phone_photo(), content_type='image/jpeg')
+        })
+        face_image = StudentFaceImage.objects.get(student=self.student)
+        with Image.open(face_image.image.path) as stored:
+            self.assertEqual(stored.format, 'WEBP')
+
+    def test_backfill_normalises_existing_images(self):
+        face_image = StudentFaceImage(student=self.student, face_encoding='kept')
+        face_image.image.save('old.jpg', ContentFile(self.phone_photo()), save=False)
+        StudentFaceImage.objects.bulk_create([face_image])
+        old_path = face_image.image.path
+
+        call_command('normalize_face_images', stdout=io.StringIO())
+
+        face_image = StudentFaceImage.objects.get(student=self.student)
+        self.assertFalse(os.path.exists(old_path))
+        self.assertEqual(face_image.face_encoding, 'kept')
+        with Image.open(face_image.image.path) as stored:
+            self.assertEqual(stored.size, (512, 1024))
+        self.assertTrue(face_image.thumbnail)
+
+    def test_repeated_upload_returns_the_stored_image(self):
+        photo = self.phone_photo()
+        first = self.upload(self.client, photo)
+        self.assertEqual(first.status_code, 201)
+
+        second = self.upload(self.client, photo)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data['message'], 'Face image already uploaded')
+        self.assertEqual(second.data['data']['id'], first.data['data']['id'])
+        self.assertEqual(StudentFaceImage.objects.filter(student=self.student).count(), 1)
+        self.assertEqual(self.engine['face_locations'].call_count, 2)  # once in validation, once on save
+
+    def test_re_encoded_photo_is_a_near_duplicate(self):
+        photo = self.phone_photo()
+        self.upload(self.client, photo)
+
+        with Image.open(io.BytesIO(photo)) as image:
+            output = io.BytesIO()
+            image.resize((2400, 1200)).save(output, format='JPEG', quality=60, exif=image.getexif().tobytes())
+
+        response = self.upload(self.client, output.getvalue())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(StudentFaceImage.objects.filter(student=self.student).count(), 1)
+
+    def test_same_photo_from_another_student_shares_blob_and_encoding(self):
+        photo = self.phone_photo()
+        self.upload(self.client, photo)
+        other = self.make_student('other', 'CSE2021002')
+        response = self.upload(token_client(other.user), photo)
+        self.assertEqual(response.status_code, 201)
+
+        mine = StudentFaceImage.objects.get(student=self.student)
+        theirs = StudentFaceImage.objects.get(student=other)
+        self.assertEqual(theirs.image.name, mine.image.name)
+        self.assertEqual(theirs.thumbnail.name, mine.thumbnail.name)
+        self.assertEqual(theirs.face_encoding, mine.face_encoding)
+        self.assertEqual(theirs.image.name, f'student_faces/{mine.content_hash[:2]}/{mine.content_hash}.jpg')
+        self.assertEqual(self.engine['face_encodings'].call_count, 1)
+        self.assertEqual(len(self.stored_files()), 2)
+
+    def test_gc_deletes_only_unreferenced_blobs(self):
+        self.upload(self.client, self.phone_photo())
+        other = self.make_student('other', 'CSE2021002')
+        other_client = token_client(other.user)
+        self.upload(other_client, self.phone_photo())
+        kept = StudentFaceImage.objects.get(student=self.student)
+        dropped = StudentFaceImage.objects.get(student=other)
+        dropped_id = dropped.id
+        self.assertEqual(other_client.delete(f'/api/students/face-images/{dropped_id}/').status_code, 200)
+        self.assertEqual(len(self.stored_files()), 4)
+
+        call_command('gc_face_images', '--grace', '0', '--dry-run', stdout=io.StringIO())
+        self.assertEqual(len(self.stored_files()), 4)
+        call_command('gc_face_images', stdout=io.StringIO())
+        self.assertEqual(len(self.stored_files()), 4)
+
+        call_command('gc_face_images', '--grace', '0', stdout=io.StringIO())
+        self.assertEqual(self.stored_files(), sorted([kept.image.name, kept.thumbnail.name]))
@@ -4,6 +4,9 @@ from .views import (
     StudentClassListView, StudentEnrollmentView, StudentAttendanceRecordsView, 
     StudentClassAttendanceView
 )
+from .async_views import (
+    AsyncStudentEnrollmentView, AsyncStudentAttendanceRecordsView, AsyncStudentClassAttendanceView
+)
 
 urlpatterns = [
     path('profile/', StudentProfileView.as_view(), name='student-profile'),
@@ -13,4 +16,9 @@ urlpatterns = [
     path('enrollments/', StudentEnrollmentView.as_view(), name='student-enrollments'),
     path('attendance/', StudentAttendanceRecordsView.as_view(), name='student-attendance-records'),
     path('attendance/class/<int:class_id>/', StudentClassAttendanceView.as_view(), name='student-class-attendance'),
-]
\ No newline at end of file
+
+    # Async variants of the dashboard endpoints, for ASGI deployments
+    path('async/enrollments/', AsyncStudentEnrollmentView.as_view(), name='student-enrollments-async'),
+    path('async/attendance/', AsyncStudentAttendanceRecordsView.as_view(), name='student-attendance-records-async'),
+    path('async/attendance/class/<int:class_id>/', AsyncStudentClassAttendanceView.as_view(), name='student-class-attendance-async'),
+]
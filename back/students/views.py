@@ -4,23 +4,21 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.views import APIView
+from accounts.permissions import IsStudent
 from .models import StudentProfile, StudentFaceImage
 from .serializers import StudentFaceImageSerializer, StudentFaceImageListSerializer, StudentProfileSerializer
 from teachers.models import Class, ClassEnrollment
 from teachers.serializers import StudentEnrollmentSerializer, ClassSerializer
+from teachers.cache import cached, BATCH
+from .payloads import enrolled_classes_data, attendance_records_data, class_attendance_data
+from back.replica import ReplicaReadMixin
 
 class StudentProfileView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
     
     def get(self, request):
         """Get the authenticated student's profile data"""
         try:
-            if not hasattr(request.user, 'student_profile'):
-                return Response(
-                    {'error': 'User is not a student'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             student_profile = request.user.student_profile
             serializer = StudentProfileSerializer(student_profile)
             
@@ -38,12 +36,6 @@ class StudentProfileView(APIView):
     def put(self, request):
         """Update the authenticated student's profile data"""
         try:
-            if not hasattr(request.user, 'student_profile'):
-                return Response(
-                    {'error': 'User is not a student'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             student_profile = request.user.student_profile
             serializer = StudentProfileSerializer(
                 student_profile, 
@@ -69,12 +61,6 @@ class StudentProfileView(APIView):
     def patch(self, request):
         """Partially update the authenticated student's profile data"""
         try:
-            if not hasattr(request.user, 'student_profile'):
-                return Response(
-                    {'error': 'User is not a student'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             student_profile = request.user.student_profile
             serializer = StudentProfileSerializer(
                 student_profile, 
@@ -98,19 +84,13 @@ class StudentProfileView(APIView):
             )
 
 class StudentFaceImageUploadView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
     parser_classes = [MultiPartParser, FormParser]
     
     def post(self, request):
         """Upload a new face image for the authenticated student"""
         try:
             # Check if user has a student profile
-            if not hasattr(request.user, 'student_profile'):
-                return Response(
-                    {'error': 'User is not a student'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             # Check if student already has maximum number of images (limit to 3)
             student = request.user.student_profile
             existing_images_count = StudentFaceImage.objects.filter(student=student).count()
@@ -134,6 +114,16 @@ class StudentFaceImageUploadView(APIView):
             )
             
             if serializer.is_valid():
+                if serializer.duplicate is not None:
+                    # Same photo (or a re-encoding of it) as one already stored
+                    return Response(
+                        {
+                            'message': 'Face image already uploaded',
+                            'data': StudentFaceImageListSerializer(serializer.duplicate, context={'request': request}).data
+                        },
+                        status=status.HTTP_200_OK
+                    )
+                
                 face_image = serializer.save()
                 return Response(
                     {
@@ -154,12 +144,6 @@ class StudentFaceImageUploadView(APIView):
     def get(self, request):
         """Get all face images for the authenticated student"""
         try:
-            if not hasattr(request.user, 'student_profile'):
-                return Response(
-                    {'error': 'User is not a student'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             student = request.user.student_profile
             face_images = StudentFaceImage.objects.filter(student=student).order_by('-is_primary', '-uploaded_at')
             
@@ -181,17 +165,11 @@ class StudentFaceImageUploadView(APIView):
             )
 
 class StudentFaceImageDetailView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
     
     def delete(self, request, image_id):
         """Delete a specific face image"""
         try:
-            if not hasattr(request.user, 'student_profile'):
-                return Response(
-                    {'error': 'User is not a student'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             student = request.user.student_profile
             face_image = get_object_or_404(
                 StudentFaceImage, 
@@ -225,12 +203,6 @@ class StudentFaceImageDetailView(APIView):
     def patch(self, request, image_id):
         """Update image properties (e.g., set as primary)"""
         try:
-            if not hasattr(request.user, 'student_profile'):
-                return Response(
-                    {'error': 'User is not a student'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             student = request.user.student_profile
             face_image = get_object_or_404(
                 StudentFaceImage, 
@@ -264,30 +236,28 @@ class StudentFaceImageDetailView(APIView):
             )
 
 class StudentClassListView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
     
     def get(self, request):
         """Get available classes for student enrollment"""
         try:
-            if not hasattr(request.user, 'student_profile'):
-                return Response(
-                    {'error': 'User is not a student'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             student = request.user.student_profile
-            available_classes = Class.objects.filter(
-                batch=student.batch,
-                semester=student.semester
-            ).exclude(
-                enrollments__student=student,
-                enrollments__is_active=True
+            available_classes = cached(
+                f'available-classes:{student.id}:{student.batch}:{student.semester}', BATCH, student.batch,
+                lambda: ClassSerializer(
+                    Class.objects.with_enrolled_count().filter(
+                        batch=student.batch,
+                        semester=student.semester
+                    ).exclude(
+                        enrollments__student=student,
+                        enrollments__is_active=True
+                    ), 
+                    many=True
+                ).data
             )
             
-            serializer = ClassSerializer(available_classes, many=True)
-            
             return Response({
-                'available_classes': serializer.data
+                'available_classes': available_classes
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -297,17 +267,11 @@ class StudentClassListView(APIView):
             )
 
 class StudentEnrollmentView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
     
     def post(self, request):
         """Enroll student in a class"""
         try:
-            if not hasattr(request.user, 'student_profile'):
-                return Response(
-                    {'error': 'User is not a student'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             serializer = StudentEnrollmentSerializer(
                 data=request.data, 
                 context={'request': request}
@@ -338,24 +302,7 @@ class StudentEnrollmentView(APIView):
     def get(self, request):
         """Get student's enrolled classes"""
         try:
-            if not hasattr(request.user, 'student_profile'):
-                return Response(
-                    {'error': 'User is not a student'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
-            student = request.user.student_profile
-            enrollments = ClassEnrollment.objects.filter(
-                student=student, 
-                is_active=True
-            ).select_related('class_instance__course')
-            
-            enrolled_classes = [enrollment.class_instance for enrollment in enrollments]
-            serializer = ClassSerializer(enrolled_classes, many=True)
-            
-            return Response({
-                'enrolled_classes': serializer.data
-            }, status=status.HTTP_200_OK)
+            return Response(enrolled_classes_data(request.user.student_profile), status=status.HTTP_200_OK)
             
         except Exception as e:
             return Response(
@@ -363,72 +310,13 @@ class StudentEnrollmentView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class StudentAttendanceRecordsView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+class StudentAttendanceRecordsView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
     
     def get(self, request):
         """Get all attendance records for the authenticated student"""
         try:
-            if not hasattr(request.user, 'student_profile'):
-                return Response(
-                    {'error': 'User is not a student'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
-            from attendance.models import AttendanceRecord
-            from attendance.serializers import AttendanceRecordSerializer
-            
-            student = request.user.student_profile
-            attendance_records = AttendanceRecord.objects.filter(
-                student=student
-            ).select_related('session', 'session__class_instance', 'session__class_instance__course').order_by('-session__date')
-            
-            # Group records by class
-            records_by_class = {}
-            for record in attendance_records:
-                class_id = record.session.class_instance.id
-                class_name = record.session.class_instance.course.name
-                course_code = record.session.class_instance.course.code
-                section = record.session.class_instance.section
-                
-                if class_id not in records_by_class:
-                    records_by_class[class_id] = {
-                        'class_id': class_id,
-                        'class_name': class_name,
-                        'course_code': course_code,
-                        'section': section,
-                        'total_sessions': 0,
-                        'present_count': 0,
-                        'absent_count': 0,
-                        'attendance_percentage': 0,
-                        'records': []
-                    }
-                
-                records_by_class[class_id]['total_sessions'] += 1
-                if record.status == 'PRESENT':
-                    records_by_class[class_id]['present_count'] += 1
-                else:
-                    records_by_class[class_id]['absent_count'] += 1
-                
-                records_by_class[class_id]['records'].append({
-                    'id': record.id,
-                    'date': record.session.date,
-                    'status': record.status,
-                    'marked_at': record.marked_at,
-                    'confidence_score': record.confidence_score
-                })
-            
-            # Calculate attendance percentage for each class
-            for class_data in records_by_class.values():
-                if class_data['total_sessions'] > 0:
-                    class_data['attendance_percentage'] = round(
-                        (class_data['present_count'] / class_data['total_sessions']) * 100, 2
-                    )
-            
-            return Response({
-                'total_classes': len(records_by_class),
-                'attendance_by_class': list(records_by_class.values())
-            }, status=status.HTTP_200_OK)
+            return Response(attendance_records_data(request.user.student_profile), status=status.HTTP_200_OK)
             
         except Exception as e:
             return Response(
@@ -436,80 +324,21 @@ class StudentAttendanceRecordsView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class StudentClassAttendanceView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+class StudentClassAttendanceView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
     
     def get(self, request, class_id):
         """Get attendance records for a specific class"""
         try:
-            if not hasattr(request.user, 'student_profile'):
-                return Response(
-                    {'error': 'User is not a student'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
-            from attendance.models import AttendanceRecord
-            from teachers.models import Class, ClassEnrollment
-            
-            student = request.user.student_profile
-            
-            # Verify student is enrolled in this class
             try:
-                enrollment = ClassEnrollment.objects.get(
-                    student=student,
-                    class_instance__id=class_id,
-                    is_active=True
-                )
-                class_instance = enrollment.class_instance
+                data = class_attendance_data(request.user.student_profile, class_id)
             except ClassEnrollment.DoesNotExist:
                 return Response(
                     {'error': 'You are not enrolled in this class'}, 
                     status=status.HTTP_403_FORBIDDEN
                 )
             
-            # Get attendance records for this class
-            attendance_records = AttendanceRecord.objects.filter(
-                student=student,
-                session__class_instance=class_instance
-            ).select_related('session').order_by('-session__date')
-            
-            records_data = []
-            present_count = 0
-            total_sessions = attendance_records.count()
-            
-            for record in attendance_records:
-                if record.status == 'PRESENT':
-                    present_count += 1
-                
-                records_data.append({
-                    'id': record.id,
-                    'date': record.session.date,
-                    'status': record.status,
-                    'marked_at': record.marked_at,
-                    'confidence_score': record.confidence_score,
-                    'session_id': record.session.id
-                })
-            
-            attendance_percentage = 0
-            if total_sessions > 0:
-                attendance_percentage = round((present_count / total_sessions) * 100, 2)
-            
-            return Response({
-                'class_info': {
-                    'id': class_instance.id,
-                    'course_name': class_instance.course.name,
-                    'course_code': class_instance.course.code,
-                    'section': class_instance.section,
-                    'teacher': class_instance.teacher.user.username
-                },
-                'attendance_summary': {
-                    'total_sessions': total_sessions,
-                    'present_count': present_count,
-                    'absent_count': total_sessions - present_count,
-                    'attendance_percentage': attendance_percentage
-                },
-                'records': records_data
-            }, status=status.HTTP_200_OK)
+            return Response(data, status=status.HTTP_200_OK)
             
         except Exception as e:
             return Response(
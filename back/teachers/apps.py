@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TeachersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'teachers'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,27 @@
+"""
+Async variants of teacher endpoints for ASGI deployments. They share their
+queries and payloads with the APIViews in views.py through payloads.py.
+"""
+
+from asgiref.sync import sync_to_async
+from rest_framework import status, permissions
+
+from accounts.permissions import IsTeacher
+from back.asyncapi import AsyncAPIView, json_response
+from .payloads import class_enrollments_data
+
+
+class AsyncClassEnrollmentListView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    
+    async def get(self, request, class_id):
+        try:
+            return json_response(
+                await sync_to_async(class_enrollments_data)(request.user.teacher_profile, class_id)
+            )
+        
+        except Exception as e:
+            return json_response(
+                {'error': f'Error retrieving enrollments: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -0,0 +1,57 @@
+from urllib.parse import quote
+
+from django.core.cache import cache
+
+CACHE_TIMEOUT = 60 * 60
+
+# Each cached catalogue response depends on one of these scopes; bumping a
+# scope's version makes every key under it unreachable at once.
+DEPARTMENT = 'department'
+TEACHER = 'teacher'
+BATCH = 'batch'
+
+
+def _version_key(scope, value):
+    return f'catalogue-version:{scope}:{quote(str(value))}'
+
+
+def catalogue_version(scope, value):
+    return cache.get_or_set(_version_key(scope, value), 1, timeout=None)
+
+
+def invalidate(scope, value):
+    try:
+        cache.incr(_version_key(scope, value))
+    except ValueError:
+        cache.set(_version_key(scope, value), 2, timeout=None)
+
+
+def invalidate_catalogue(departments=(), teacher_ids=(), batches=()):
+    """Move every given department, teacher and batch to a new cache version"""
+    for department in set(departments):
+        invalidate(DEPARTMENT, department)
+    for teacher_id in set(teacher_ids):
+        invalidate(TEACHER, teacher_id)
+    for batch in set(batches):
+        invalidate(BATCH, batch)
+
+
+def invalidate_classes(classes):
+    """Invalidate the teachers and batches of classes (a Class queryset or list)"""
+    classes = list(classes)
+    invalidate_catalogue(
+        teacher_ids=[class_instance.teacher_id for class_instance in classes],
+        batches=[class_instance.batch for class_instance in classes]
+    )
+
+
+def cached(key, scope, value, build):
+    """Return build() cached under key, within the current version of scope=value"""
+    key = f'catalogue:{quote(key, safe=":")}'
+    version = catalogue_version(scope, value)
+
+    data = cache.get(key, version=version)
+    if data is None:
+        data = build()
+        cache.set(key, data, timeout=CACHE_TIMEOUT, version=version)
+    return data
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0005_hot_query_indexes'),
+        ('teachers', '0002_course_class_classenrollment'),
+    ]
+
+    operations = [
+        # Add the composite index before dropping the single-column one it replaces
+        migrations.AddIndex(
+            model_name='classenrollment',
+            index=models.Index(fields=['class_instance', 'is_active'], name='enrollment_class_active_idx'),
+        ),
+        migrations.AlterField(
+            model_name='classenrollment',
+            name='class_instance',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='teachers.class'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:58
+
+import teachers.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachers', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='class',
+            name='gallery_version',
+            field=models.CharField(default=teachers.models.new_gallery_version, editable=False, max_length=32),
+        ),
+    ]
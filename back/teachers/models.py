@@ -1,4 +1,8 @@
+import uuid
+
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from accounts.models import User
 
 class TeacherProfile(models.Model):
@@ -20,6 +24,21 @@ class Course(models.Model):
     def __str__(self):
         return f"{self.code} - {self.name}"
 
+class ClassQuerySet(models.QuerySet):
+    
+    def with_enrolled_count(self):
+        """Annotate active enrolments and load what ClassSerializer reads, so a list costs one query"""
+        enrolled = ClassEnrollment.objects.filter(
+            class_instance=OuterRef('pk'), 
+            is_active=True
+        ).order_by().values('class_instance').annotate(count=Count('id')).values('count')
+        return self.select_related('course', 'teacher__user').annotate(
+            active_enrollment_count=Coalesce(Subquery(enrolled), 0)
+        )
+
+def new_gallery_version():
+    return uuid.uuid4().hex
+
 class Class(models.Model):
     teacher = models.ForeignKey(TeacherProfile, on_delete=models.CASCADE, related_name='classes')
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='classes')
@@ -28,6 +47,10 @@ class Class(models.Model):
     semester = models.PositiveIntegerField()
     academic_year = models.CharField(max_length=10)  # e.g., "2024-25"
     created_at = models.DateTimeField(auto_now_add=True)
+    # Names the face gallery snapshot (attendance/gallery.py); replaced on enrolment or face image changes
+    gallery_version = models.CharField(max_length=32, default=new_gallery_version, editable=False)
+    
+    objects = ClassQuerySet.as_manager()
     
     class Meta:
         unique_together = ['course', 'section', 'batch', 'academic_year']
@@ -35,18 +58,33 @@ class Class(models.Model):
     def __str__(self):
         return f"{self.course.code} - {self.section} - {self.batch}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        class_instance = super().from_db(db, field_names, values)
+        # Teacher and batch as stored, so a move also invalidates the catalogues it leaves
+        if 'teacher_id' in class_instance.__dict__ and 'batch' in class_instance.__dict__:
+            class_instance._stored_scope = (class_instance.teacher_id, class_instance.batch)
+        return class_instance
+    
     @property
     def enrolled_count(self):
+        if hasattr(self, 'active_enrollment_count'):
+            return self.active_enrollment_count
         return self.enrollments.filter(is_active=True).count()
 
 class ClassEnrollment(models.Model):
     student = models.ForeignKey('students.StudentProfile', on_delete=models.CASCADE, related_name='enrollments')
-    class_instance = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='enrollments')
+    # Indexed through enrollment_class_active_idx
+    class_instance = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='enrollments', db_index=False)
     enrolled_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     
     class Meta:
         unique_together = ['student', 'class_instance']
+        indexes = [
+            # Active roster of a class
+            models.Index(fields=['class_instance', 'is_active'], name='enrollment_class_active_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.user.username} - {self.class_instance}"
\ No newline at end of file
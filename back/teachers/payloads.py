@@ -0,0 +1,25 @@
+"""
+Queries and response bodies of teacher endpoints, shared by the APIViews
+in views.py and their async variants in async_views.py (which run them
+through sync_to_async).
+"""
+
+from django.shortcuts import get_object_or_404
+
+from .models import Class, ClassEnrollment
+from .serializers import ClassEnrollmentSerializer
+
+
+def class_enrollments_data(teacher, class_id):
+    """Active enrollments of one of the teacher's classes, ordered by roll number"""
+    class_instance = get_object_or_404(Class, id=class_id, teacher=teacher)
+    enrollments = ClassEnrollment.objects.filter(
+        class_instance=class_instance,
+        is_active=True
+    ).select_related('student__user', 'class_instance__course').order_by('student__roll_number')
+
+    serializer = ClassEnrollmentSerializer(enrollments, many=True)
+    return {
+        'enrollments': serializer.data,
+        'total_enrolled': len(serializer.data)
+    }
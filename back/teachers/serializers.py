@@ -89,3 +89,20 @@ class StudentEnrollmentSerializer(serializers.Serializer):
             raise serializers.ValidationError("Class is full")
         
         return value
+
+class BulkEnrollmentSerializer(serializers.Serializer):
+    roll_numbers = serializers.ListField(
+        child=serializers.CharField(max_length=20), required=False, allow_empty=False
+    )
+    # Every student of the class's batch and semester, optionally of one department
+    cohort = serializers.BooleanField(required=False, default=False)
+    department = serializers.CharField(max_length=100, required=False)
+    
+    def validate(self, data):
+        if ('roll_numbers' in data) == data['cohort']:
+            raise serializers.ValidationError("Give either roll_numbers or cohort")
+        
+        if 'department' in data and not data['cohort']:
+            raise serializers.ValidationError("department can only be given with cohort")
+        
+        return data
@@ -0,0 +1,44 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import invalidate_catalogue, invalidate_classes
+from .models import Course, Class, ClassEnrollment
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_catalogue(sender, instance, **kwargs):
+    """Course lists are per department; class lists embed the course"""
+    invalidate_catalogue(departments=[instance.department])
+    if kwargs.get('signal') is post_save and not kwargs.get('created'):
+        invalidate_classes(Class.objects.filter(course=instance).only('teacher_id', 'batch'))
+
+
+@receiver(pre_save, sender=Class)
+def remember_class_scope(sender, instance, **kwargs):
+    """Classes not loaded with their teacher and batch look them up before they change"""
+    if instance._state.adding or hasattr(instance, '_stored_scope'):
+        return
+    stored = Class.objects.filter(id=instance.id).values_list('teacher_id', 'batch').first()
+    if stored is not None:
+        instance._stored_scope = stored
+
+
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+def invalidate_class_catalogue(sender, instance, **kwargs):
+    """A class that moves to another teacher or batch also leaves the old one's lists"""
+    invalidate_classes([instance])
+    stored_teacher_id, stored_batch = getattr(instance, '_stored_scope', (instance.teacher_id, instance.batch))
+    if (stored_teacher_id, stored_batch) != (instance.teacher_id, instance.batch):
+        invalidate_catalogue(teacher_ids=[stored_teacher_id], batches=[stored_batch])
+    instance._stored_scope = (instance.teacher_id, instance.batch)
+
+
+@receiver(post_save, sender=ClassEnrollment)
+@receiver(post_delete, sender=ClassEnrollment)
+def invalidate_enrollment_catalogue(sender, instance, **kwargs):
+    """Enrolment changes move enrolled counts and which classes a student can still join"""
+    class_instance = Class.objects.filter(id=instance.class_instance_id).only('teacher_id', 'batch').first()
+    if class_instance is not None:
+        invalidate_classes([class_instance])
@@ -1,3 +1,197 @@
 from django.test import TestCase
 
-# Create your tests here.
+from attendance.models import AttendanceSession
+from back.testing import QueryBudgetMixin, seed_dataset, token_client
+from students.models import StudentProfile
+from .models import Class, ClassEnrollment
+
+
+class TeacherQueryBudgetTests(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_dataset()
+        cls.class_instance = data['classes'][3]
+        cls.student = data['rosters'][3][0]
+
+    def test_class_enrollments(self):
+        client = token_client(self.class_instance.teacher.user)
+        response = self.assertQueryBudget(
+            3, lambda: client.get(f'/api/teachers/classes/{self.class_instance.id}/enrollments/')
+        )
+        self.assertEqual(response.data['total_enrolled'], 40)
+
+    def test_active_roster_uses_composite_index(self):
+        self.assertUsesIndex(
+            ClassEnrollment.objects.filter(class_instance=self.class_instance, is_active=True),
+            'enrollment_class_active_idx'
+        )
+
+
+class CatalogueCacheTests(QueryBudgetMixin, TestCase):
+    """Catalogue endpoints are served from the cache until a Course, Class or enrolment changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_dataset(classes=4, students_per_class=10, sessions_per_class=1)
+        cls.class_instance = data['classes'][1]
+        cls.student = data['rosters'][0][0]
+
+    def setUp(self):
+        super().setUp()
+        self.teacher_client = token_client(self.class_instance.teacher.user)
+        self.student_client = token_client(self.student.user)
+
+    def test_class_list_is_cached_until_enrolments_change(self):
+        url = '/api/teachers/classes/'
+        response = self.assertQueryBudget(2, lambda: self.teacher_client.get(url))
+        self.assertEqual(response.data['classes'][0]['enrolled_count'], 10)
+
+        # Authentication is cached too
+        self.assertQueryBudget(0, lambda: self.teacher_client.get(url))
+
+        ClassEnrollment.objects.filter(class_instance=self.class_instance).first().delete()
+        response = self.teacher_client.get(url)
+        self.assertEqual(response.data['classes'][0]['enrolled_count'], 9)
+
+    def test_class_detail_and_courses_are_cached(self):
+        detail_url = f'/api/teachers/classes/{self.class_instance.id}/'
+        self.teacher_client.get(detail_url)
+        self.teacher_client.get('/api/teachers/courses/')
+
+        self.assertQueryBudget(0, lambda: self.teacher_client.get(detail_url))
+        self.assertQueryBudget(0, lambda: self.teacher_client.get('/api/teachers/courses/'))
+
+        course = self.class_instance.course
+        course.name = 'Renamed Course'
+        course.save()
+        self.assertEqual(self.teacher_client.get(detail_url).data['class']['course']['name'], 'Renamed Course')
+        self.assertIn(
+            'Renamed Course', 
+            [course['name'] for course in self.teacher_client.get('/api/teachers/courses/').data['courses']]
+        )
+
+    def test_other_teachers_cannot_read_a_cached_class(self):
+        detail_url = f'/api/teachers/classes/{self.class_instance.id}/'
+        self.teacher_client.get(detail_url)
+
+        other_teacher = Class.objects.exclude(id=self.class_instance.id).first().teacher
+        response = token_client(other_teacher.user).get(detail_url)
+        self.assertNotEqual(response.status_code, 200)
+        self.assertNotIn('class', response.data)
+
+    def test_class_moved_to_another_teacher_leaves_the_old_list(self):
+        url = '/api/teachers/classes/'
+        self.teacher_client.get(url)
+
+        class_instance = Class.objects.get(id=self.class_instance.id)
+        class_instance.teacher = Class.objects.exclude(teacher=class_instance.teacher).first().teacher
+        class_instance.save()
+
+        response = self.teacher_client.get(url)
+        self.assertNotIn(class_instance.id, [listed['id'] for listed in response.data['classes']])
+
+    def test_available_classes_follow_enrolments(self):
+        url = '/api/students/classes/'
+        response = self.assertQueryBudget(2, lambda: self.student_client.get(url))
+        self.assertEqual(len(response.data['available_classes']), 3)
+        self.assertQueryBudget(0, lambda: self.student_client.get(url))
+
+        ClassEnrollment.objects.create(student=self.student, class_instance=self.class_instance)
+        response = self.student_client.get(url)
+        self.assertEqual(len(response.data['available_classes']), 2)
+
+
+class AsyncEnrollmentListTests(TestCase):
+
+    def test_matches_sync_view(self):
+        dataset = seed_dataset(classes=2, students_per_class=5, sessions_per_class=1)
+        class_instance = dataset['classes'][0]
+        client = token_client(class_instance.teacher.user)
+
+        sync_response = client.get(f'/api/teachers/classes/{class_instance.id}/enrollments/')
+        async_response = client.get(f'/api/teachers/async/classes/{class_instance.id}/enrollments/')
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(async_response.json(), sync_response.json())
+        self.assertEqual(async_response.json()['total_enrolled'], 5)
+
+        other_class = dataset['classes'][1]
+        self.assertNotEqual(client.get(f'/api/teachers/async/classes/{other_class.id}/enrollments/').status_code, 200)
+
+
+class BulkEnrollmentTests(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_dataset(classes=2, students_per_class=5, sessions_per_class=1)
+        cls.class_instance = data['classes'][0]
+        cls.roster = data['rosters'][0]
+        cls.others = data['rosters'][1]
+        cls.url = f'/api/teachers/classes/{cls.class_instance.id}/enrollments/bulk/'
+
+    def setUp(self):
+        super().setUp()
+        self.client = token_client(self.class_instance.teacher.user)
+
+    def test_enrolls_roll_numbers_set_wise(self):
+        ClassEnrollment.objects.filter(student=self.roster[1], class_instance=self.class_instance).update(is_active=False)
+        version = self.class_instance.gallery_version
+        roll_numbers = [student.roll_number for student in self.others[:3]]
+        roll_numbers += [self.roster[0].roll_number, self.roster[1].roll_number, self.others[0].roll_number]
+
+        response = self.assertQueryBudget(12, lambda: self.client.post(
+            self.url, {'roll_numbers': roll_numbers}, format='json'
+        ))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['enrolled_count'], 3)
+        self.assertEqual(response.data['reactivated_count'], 1)
+        self.assertEqual(response.data['already_enrolled_count'], 1)
+        self.assertEqual(response.data['total_enrolled'], 8)
+        self.class_instance.refresh_from_db()
+        self.assertNotEqual(self.class_instance.gallery_version, version)
+
+        # Nothing left to do: no writes, no new gallery version
+        version = self.class_instance.gallery_version
+        response = self.client.post(self.url, {'roll_numbers': roll_numbers}, format='json')
+        self.assertEqual(response.data['already_enrolled_count'], 5)
+        self.class_instance.refresh_from_db()
+        self.assertEqual(self.class_instance.gallery_version, version)
+
+    def test_rejects_unknown_and_ineligible_students(self):
+        senior = self.others[4]
+        StudentProfile.objects.filter(id=senior.id).update(batch='2020')
+
+        response = self.client.post(
+            self.url, {'roll_numbers': [self.others[0].roll_number, 'NOPE']}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['roll_numbers'], ['NOPE'])
+
+        response = self.client.post(
+            self.url, {'roll_numbers': [self.others[0].roll_number, senior.roll_number]}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['roll_numbers'], [senior.roll_number])
+        self.assertEqual(ClassEnrollment.objects.filter(class_instance=self.class_instance).count(), 5)
+
+    def test_enrolls_whole_cohort(self):
+        session = AttendanceSession.objects.create(class_instance=self.class_instance, date='2024-06-03')
+        response = self.client.post(self.url, {'cohort': True, 'department': 'Physics'}, format='json')
+        self.assertEqual(response.data['enrolled_count'], 0)
+
+        response = self.client.post(self.url, {'cohort': True, 'department': 'Computer Science'}, format='json')
+        self.assertEqual(response.data['enrolled_count'], 5)
+        self.assertEqual(response.data['total_enrolled'], 10)
+        session.refresh_from_db()
+        self.assertEqual(session.version, 2)
+
+    def test_validation_and_ownership(self):
+        for payload in ({}, {'cohort': True, 'roll_numbers': ['SEED000000']}, {'roll_numbers': []},
+                        {'roll_numbers': ['SEED000000'], 'department': 'Computer Science'}):
+            self.assertEqual(self.client.post(self.url, payload, format='json').status_code, 400)
+
+        other_teacher = token_client(Class.objects.exclude(id=self.class_instance.id).get().teacher.user)
+        self.assertNotEqual(other_teacher.post(self.url, {'cohort': True}, format='json').status_code, 200)
+        self.assertEqual(ClassEnrollment.objects.filter(class_instance=self.class_instance).count(), 5)
+        student = token_client(self.roster[0].user)
+        self.assertEqual(student.post(self.url, {'cohort': True}, format='json').status_code, 403)
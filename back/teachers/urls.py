@@ -1,8 +1,9 @@
 from django.urls import path
 from .views import (
     TeacherProfileView, CourseListView, ClassListCreateView, 
-    ClassDetailView, ClassEnrollmentListView
+    ClassDetailView, ClassEnrollmentListView, BulkClassEnrollmentView
 )
+from .async_views import AsyncClassEnrollmentListView
 
 urlpatterns = [
     path('profile/', TeacherProfileView.as_view(), name='teacher-profile'),
@@ -10,4 +11,8 @@ urlpatterns = [
     path('classes/', ClassListCreateView.as_view(), name='class-list-create'),
     path('classes/<int:class_id>/', ClassDetailView.as_view(), name='class-detail'),
     path('classes/<int:class_id>/enrollments/', ClassEnrollmentListView.as_view(), name='class-enrollments'),
+    path('classes/<int:class_id>/enrollments/bulk/', BulkClassEnrollmentView.as_view(), name='bulk-class-enrollments'),
+
+    # Async variant for ASGI deployments
+    path('async/classes/<int:class_id>/enrollments/', AsyncClassEnrollmentListView.as_view(), name='class-enrollments-async'),
 ]
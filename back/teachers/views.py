@@ -1,26 +1,27 @@
+from django.db import transaction
 from django.shortcuts import render, get_object_or_404
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from accounts.permissions import IsTeacher
+from attendance.gallery import invalidate_galleries
+from attendance.models import AttendanceSession
+from students.models import StudentProfile
 from .models import TeacherProfile, Course, Class, ClassEnrollment
+from .cache import cached, invalidate_classes, DEPARTMENT, TEACHER
+from .payloads import class_enrollments_data
 from .serializers import (
     TeacherProfileSerializer, CourseSerializer, ClassSerializer, 
-    ClassEnrollmentSerializer
+    BulkEnrollmentSerializer
 )
 
 # Create your views here.
 
 class TeacherProfileView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
     
     def get(self, request):
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             teacher_profile = request.user.teacher_profile
             serializer = TeacherProfileSerializer(teacher_profile)
             
@@ -37,12 +38,6 @@ class TeacherProfileView(APIView):
 
     def put(self, request):
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             teacher_profile = request.user.teacher_profile
             serializer = TeacherProfileSerializer(teacher_profile, data=request.data)
             
@@ -63,12 +58,6 @@ class TeacherProfileView(APIView):
     
     def patch(self, request):
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             teacher_profile = request.user.teacher_profile
             serializer = TeacherProfileSerializer(teacher_profile, data=request.data, partial=True)
             
@@ -88,22 +77,20 @@ class TeacherProfileView(APIView):
             )
 
 class CourseListView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
     
     def get(self, request):
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             teacher = request.user.teacher_profile
-            courses = Course.objects.filter(department=teacher.department)
-            serializer = CourseSerializer(courses, many=True)
+            courses = cached(
+                f'courses:{teacher.department}', DEPARTMENT, teacher.department,
+                lambda: CourseSerializer(
+                    Course.objects.filter(department=teacher.department), many=True
+                ).data
+            )
             
             return Response({
-                'courses': serializer.data
+                'courses': courses
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -114,12 +101,6 @@ class CourseListView(APIView):
     
     def post(self, request):
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             # Set department to teacher's department
             data = request.data.copy()
             data['department'] = request.user.teacher_profile.department
@@ -142,22 +123,21 @@ class CourseListView(APIView):
             )
 
 class ClassListCreateView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
     
     def get(self, request):
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             teacher = request.user.teacher_profile
-            classes = Class.objects.filter(teacher=teacher).order_by('-created_at')
-            serializer = ClassSerializer(classes, many=True)
+            classes = cached(
+                f'classes:{teacher.id}', TEACHER, teacher.id,
+                lambda: ClassSerializer(
+                    Class.objects.with_enrolled_count().filter(teacher=teacher).order_by('-created_at'), 
+                    many=True
+                ).data
+            )
             
             return Response({
-                'classes': serializer.data
+                'classes': classes
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -168,12 +148,6 @@ class ClassListCreateView(APIView):
     
     def post(self, request):
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             serializer = ClassSerializer(data=request.data, context={'request': request})
             
             if serializer.is_valid():
@@ -192,22 +166,22 @@ class ClassListCreateView(APIView):
             )
 
 class ClassDetailView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
     
     def get(self, request, class_id):
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             teacher = request.user.teacher_profile
-            class_instance = get_object_or_404(Class, id=class_id, teacher=teacher)
-            serializer = ClassSerializer(class_instance)
+            
+            # The key is per teacher, so a hit also proves ownership
+            class_data = cached(
+                f'class:{teacher.id}:{class_id}', TEACHER, teacher.id,
+                lambda: ClassSerializer(
+                    get_object_or_404(Class.objects.with_enrolled_count(), id=class_id, teacher=teacher)
+                ).data
+            )
             
             return Response({
-                'class': serializer.data
+                'class': class_data
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -217,32 +191,105 @@ class ClassDetailView(APIView):
             )
 
 class ClassEnrollmentListView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
     
     def get(self, request, class_id):
         try:
-            if not hasattr(request.user, 'teacher_profile'):
-                return Response(
-                    {'error': 'User is not a teacher'}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
+            return Response(
+                class_enrollments_data(request.user.teacher_profile, class_id), 
+                status=status.HTTP_200_OK
+            )
             
+        except Exception as e:
+            return Response(
+                {'error': f'Error retrieving enrollments: {str(e)}'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class BulkClassEnrollmentView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    
+    def post(self, request, class_id):
+        """Enroll a list of roll numbers, or the class's whole batch/semester cohort, at once"""
+        try:
             teacher = request.user.teacher_profile
             class_instance = get_object_or_404(Class, id=class_id, teacher=teacher)
-            enrollments = ClassEnrollment.objects.filter(
-                class_instance=class_instance, 
-                is_active=True
-            ).order_by('student__roll_number')
             
-            serializer = ClassEnrollmentSerializer(enrollments, many=True)
+            serializer = BulkEnrollmentSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            
+            data = serializer.validated_data
+            if data['cohort']:
+                students = StudentProfile.objects.filter(
+                    batch=class_instance.batch, 
+                    semester=class_instance.semester
+                )
+                if 'department' in data:
+                    students = students.filter(department=data['department'])
+                students = list(students.values_list('id', 'roll_number', 'batch', 'semester'))
+            else:
+                roll_numbers = set(data['roll_numbers'])
+                students = list(StudentProfile.objects.filter(
+                    roll_number__in=roll_numbers
+                ).values_list('id', 'roll_number', 'batch', 'semester'))
+                
+                missing = sorted(roll_numbers - {roll_number for _, roll_number, _, _ in students})
+                if missing:
+                    return Response({
+                        'error': 'Some roll numbers do not exist',
+                        'roll_numbers': missing
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                
+                # Same rule as self-service enrolment
+                ineligible = sorted(
+                    roll_number for _, roll_number, batch, semester in students
+                    if batch != class_instance.batch or semester != class_instance.semester
+                )
+                if ineligible:
+                    return Response({
+                        'error': 'Students can only enroll in classes for their batch and semester',
+                        'roll_numbers': ineligible
+                    }, status=status.HTTP_400_BAD_REQUEST)
+            
+            student_ids = {student_id for student_id, _, _, _ in students}
+            existing = dict(ClassEnrollment.objects.filter(
+                class_instance=class_instance, 
+                student_id__in=student_ids
+            ).values_list('student_id', 'is_active'))
+            inactive = [student_id for student_id, is_active in existing.items() if not is_active]
+            new = student_ids - existing.keys()
+            
+            if new or inactive:
+                # bulk_create and update() send no signals, so the gallery,
+                # catalogue cache and live sessions are refreshed once here
+                with transaction.atomic():
+                    # Rows enrolled by a concurrent request since the lookup above are skipped
+                    ClassEnrollment.objects.bulk_create([
+                        ClassEnrollment(student_id=student_id, class_instance=class_instance)
+                        for student_id in sorted(new)
+                    ], batch_size=1000, ignore_conflicts=True)
+                    ClassEnrollment.objects.filter(
+                        class_instance=class_instance, 
+                        student_id__in=inactive
+                    ).update(is_active=True)
+                    invalidate_galleries(class_ids=[class_instance.id])
+                invalidate_classes([class_instance])
+                AttendanceSession.objects.filter(class_instance=class_instance, is_active=True).touch()
             
             return Response({
-                'enrollments': serializer.data,
-                'total_enrolled': enrollments.count()
+                'message': f'Enrolled {len(new) + len(inactive)} students',
+                'enrolled_count': len(new),
+                'reactivated_count': len(inactive),
+                'already_enrolled_count': len(existing) - len(inactive),
+                'total_enrolled': ClassEnrollment.objects.filter(
+                    class_instance=class_instance, 
+                    is_active=True
+                ).count()
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
             return Response(
-                {'error': f'Error retrieving enrollments: {str(e)}'}, 
+                {'error': f'Error enrolling students: {str(e)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )